@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""Record EXPLAIN ANALYZE timings for the hot data_access queries.
+
+Run it once before and once after applying a migration, then compare:
+
+    python explain_hot_queries.py --label before
+    psql ... -f ../migrations/004_lookup_indexes.sql
+    python explain_hot_queries.py --label after
+    python explain_hot_queries.py --compare before after
+
+Results are stored per label in results.json next to this script (or
+--output), with the --note given for the run (say, the dataset and host).
+Connection settings come from the same DB_* environment variables as
+data_access.
+"""
+import argparse
+import json
+import os
+import statistics
+
+import psycopg2
+
+RESULTS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results.json")
+
+# name -> query. %(...)s values are filled in from the command line
+# and from sample_params() so the queries hit real rows.
+QUERIES = {
+    "largest_company_jobs": (
+        "SELECT job_id, company, title, description, location, company_id, med_salary "
+        "FROM jobs WHERE company_id = %(company_id)s AND job_id > -1 ORDER BY job_id LIMIT 1000"
+    ),
+    "best_paying_companies": (
+        "SELECT company, AVG(max_salary) AS average_salary FROM jobs "
+        "WHERE title = %(title)s AND pay_period = 'YEARLY' "
+        "GROUP BY company ORDER BY average_salary DESC"
+    ),
+    "companies_by_employees": (
+        "SELECT * FROM ("
+        "SELECT DISTINCT ON (company_id) company_id, employee_count, follower_count "
+        "FROM employee WHERE company_id <> 0 "
+        "ORDER BY company_id, employee_count DESC NULLS LAST"
+        ") AS company ORDER BY employee_count DESC NULLS LAST, company_id LIMIT 10"
+    ),
+    "reviews_with_title_and_city": (
+        "SELECT * FROM reviews WHERE TRIM(job_title) LIKE %(title_pattern)s "
+        "AND TRIM(location) LIKE %(city_pattern)s"
+    ),
+    "jobs_with_title_and_city": (
+        "SELECT * FROM jobs WHERE title LIKE %(title_pattern)s "
+        "AND location LIKE %(city_pattern)s LIMIT 10"
+    ),
+    "remote_keyword_search": (
+        "SELECT job_id, title, company, description, location, views, remote_allowed "
+        "FROM jobs WHERE remote_allowed = TRUE "
+        "AND search_vector @@ websearch_to_tsquery('english', %(keyword)s)"
+    ),
+}
+
+
+def connect():
+    return psycopg2.connect(
+        dbname=os.environ.get("DB_NAME"),
+        user=os.environ.get("DB_USER"),
+        password=os.environ.get("DB_PASSWORD"),
+        host=os.environ.get("DB_HOST"),
+        port=int(os.environ.get("DB_PORT", 5432)),
+    )
+
+
+def sample_params(cursor, args):
+    cursor.execute(
+        "SELECT company_id FROM employee WHERE company_id IS NOT NULL "
+        "ORDER BY employee_count DESC NULLS LAST LIMIT 1"
+    )
+    row = cursor.fetchone()
+    return {
+        "company_id": args.company_id if args.company_id is not None else (row[0] if row else 0),
+        "title": args.title,
+        "title_pattern": f"%{args.title}%",
+        "city_pattern": f"%{args.city}%",
+        "keyword": args.keyword,
+    }
+
+
+def explain(cursor, query, params, runs):
+    """Return the median execution/planning time and the root plan node."""
+    execution, planning = [], []
+    plan = None
+    for _ in range(runs):
+        cursor.execute("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + query, params)
+        result = cursor.fetchone()[0][0]
+        execution.append(result["Execution Time"])
+        planning.append(result["Planning Time"])
+        plan = result["Plan"]
+    return {
+        "execution_ms": statistics.median(execution),
+        "planning_ms": statistics.median(planning),
+        "node": plan["Node Type"],
+        "scans": sorted(scan_nodes(plan)),
+    }
+
+
+def scan_nodes(plan):
+    """Collect 'Node Type on relation[ using index]' for every scan in a plan."""
+    found = set()
+    if "Relation Name" in plan:
+        scan = f"{plan['Node Type']} on {plan['Relation Name']}"
+        if "Index Name" in plan:
+            scan += f" using {plan['Index Name']}"
+        found.add(scan)
+    for child in plan.get("Plans", []):
+        found |= scan_nodes(child)
+    return found
+
+
+def load_results(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def record(args):
+    conn = connect()
+    try:
+        with conn.cursor() as cursor:
+            params = sample_params(cursor, args)
+            results = {}
+            for name, query in QUERIES.items():
+                if args.only and name not in args.only:
+                    continue
+                try:
+                    results[name] = explain(cursor, query, params, args.runs)
+                except psycopg2.Error as e:
+                    # e.g. search_vector before 003_search_indexes.sql
+                    conn.rollback()
+                    results[name] = {"error": str(e).strip()}
+                print(name, json.dumps(results[name]))
+        conn.rollback()
+    finally:
+        conn.close()
+
+    stored = load_results(args.output)
+    stored[args.label] = {"params": params, "queries": results}
+    if args.note:
+        stored[args.label]["note"] = args.note
+    with open(args.output, "w") as f:
+        json.dump(stored, f, indent=2, sort_keys=True, default=str)
+    print(f"Saved '{args.label}' to {args.output}")
+
+
+def compare(args):
+    stored = load_results(args.output)
+    before, after = (stored[label]["queries"] for label in args.compare)
+    for label in args.compare:
+        if "note" in stored[label]:
+            print(f"{label}: {stored[label]['note']}")
+    print(f"{'query':32} {args.compare[0]:>12} {args.compare[1]:>12} {'speedup':>9}")
+    for name in QUERIES:
+        if name not in before or name not in after:
+            continue
+        old = before[name].get("execution_ms")
+        new = after[name].get("execution_ms")
+        if old is None or new is None:
+            print(f"{name:32} {'error' if old is None else f'{old:.2f}':>12} {'error' if new is None else f'{new:.2f}':>12}")
+            continue
+        speedup = old / new if new else float("inf")
+        print(f"{name:32} {old:>10.2f}ms {new:>10.2f}ms {speedup:>8.1f}x")
+        for scan in after[name]["scans"]:
+            print(f"    {scan}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--label", help="name to store this run under, e.g. before/after")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="compare two stored labels")
+    parser.add_argument("--output", default=RESULTS_FILE)
+    parser.add_argument("--runs", type=int, default=5, help="EXPLAIN ANALYZE runs per query (median is kept)")
+    parser.add_argument("--only", nargs="*", help="limit to these query names")
+    parser.add_argument("--note", help="stored with the run, e.g. what data it ran on")
+    parser.add_argument("--title", default="Software Engineer")
+    parser.add_argument("--city", default="New York")
+    parser.add_argument("--keyword", default="python")
+    parser.add_argument("--company-id", type=int)
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(args)
+    elif args.label:
+        record(args)
+    else:
+        parser.error("either --label or --compare is required")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""Time the api_interface JSON encoding per route: field plans vs dicts + jsonify.
+
+Needs Flask and the generated protobuf modules, as in the api_interface
+image. From a checkout:
+
+    cd microservices/api_interface
+    python -m grpc_tools.protoc -I../job_postings/protobuf -I../job_reviews/protobuf \\
+        -I../data_access/protobuf --python_out=. --grpc_python_out=. \\
+        jobpostings.proto jobreviews.proto data-access.proto
+    python ../../datasets/benchmarks/serialization_bench.py --rows 1000
+
+Each route's response message is filled with --rows synthetic items. The
+"dicts" column is the previous code path (one dict per message, then
+jsonify); "plan" is the route's FieldPlan plus json_body. Both bodies are
+checked to be identical before timing.
+"""
+import argparse
+import os
+import sys
+import timeit
+from operator import attrgetter
+
+API_INTERFACE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "microservices", "api_interface")
+sys.path.insert(0, os.getcwd())
+sys.path.insert(0, API_INTERFACE)
+
+import api_interface
+import jobpostings_pb2
+import jobreviews_pb2
+from flask import jsonify
+from serialization import json_body
+
+TEXT = "Senior Software Engineer, Platform — Lisbon (hybrid) " * 4
+
+
+def best_cities(n):
+    return jobreviews_pb2.BestCityResponse(city=[
+        jobreviews_pb2.BestRatingCity(city=f"City {i}", average_rating=3.5 + i % 7 / 10) for i in range(n)
+    ]).city
+
+
+def best_companies(n):
+    return jobreviews_pb2.BestCompaniesResponse(companyReview=[
+        jobreviews_pb2.CompanyReview(firm=f"Firm {i}", overall_rating=i % 5, work_life_balance=3.2,
+                                     culture_values=3.9, diversity_inclusion=4.1, career_opp=2.8)
+        for i in range(n)
+    ]).companyReview
+
+
+def jobs_with_rating(n):
+    return jobpostings_pb2.JobsWithRatingResponse(jobs=[
+        jobpostings_pb2.JobWithRating(rating=i % 5, job=jobpostings_pb2.Job(
+            title=f"Engineer {i}", company_name="Acme", salary=50000 + i, location="Lisbon",
+            views=i, description=TEXT))
+        for i in range(n)
+    ]).jobs
+
+
+def largest_company_jobs(n):
+    return jobpostings_pb2.JobPostingsForLargestCompaniesResponse(job=[
+        jobpostings_pb2.JobForLargestCompany(company="Acme", title=f"Engineer {i}", description=TEXT,
+                                             location="Lisbon", company_id=1234, med_salary=61234.5)
+        for i in range(n)
+    ]).job
+
+
+def remote_jobs(n):
+    return jobpostings_pb2.RemoteJobSearchResponse(jobs=[
+        jobpostings_pb2.JobForRemote(id=str(i), company="Acme", title=f"Engineer {i}", description=TEXT,
+                                     location="Remote", remote_allowed=True)
+        for i in range(n)
+    ]).jobs
+
+
+def best_paying(n):
+    return jobpostings_pb2.BestPayingCompaniesResponse(companies=[
+        jobpostings_pb2.BestCompany(company_name=f"Company {i}", average_salary=80000.5 + i) for i in range(n)
+    ]).companies
+
+
+# route -> (top-level key, field plan, message builder)
+ROUTES = {
+    "/jobs/search/best-cities": ("cities", api_interface.BEST_CITY_JSON, best_cities),
+    "/jobs/search/best-companies": ("bestCompanies", api_interface.COMPANY_REVIEW_JSON, best_companies),
+    "/jobs/search/jobs-with-rating": ("jobs", api_interface.JOB_WITH_RATING_JSON, jobs_with_rating),
+    "/jobs/search/jobs-in-biggest-companies": ("jobs", api_interface.LARGEST_COMPANY_JOB_JSON, largest_company_jobs),
+    "/jobs/search/remote": ("jobs", api_interface.REMOTE_JOB_JSON, remote_jobs),
+    "/jobs/search/best-paying-companies": ("best_paying_companies", api_interface.BEST_COMPANY_JSON, best_paying),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1000, help="items per response")
+    parser.add_argument("--repeat", type=int, default=10, help="timing runs per route; the best is reported")
+    args = parser.parse_args()
+
+    app = api_interface.app
+    print(f"{'route':42} {'dicts ms':>10} {'plan ms':>10} {'speedup':>8}")
+    with app.app_context():
+        for route, (key, plan, build) in ROUTES.items():
+            messages = build(args.rows)
+            getters = [(name, attrgetter(path)) for name, path in zip(plan.keys, plan.paths)]
+
+            def dicts():
+                items = [{name: get(message) for name, get in getters} for message in messages]
+                return jsonify({key: items}).get_data()
+
+            def fields():
+                return app.response_class(json_body({key: plan.array(messages)}), mimetype="application/json").get_data()
+
+            if dicts() != fields():
+                sys.exit(f"{route}: bodies differ")
+
+            # Alternate the two so drift in machine load hits both alike.
+            number = max(1, 20000 // max(args.rows, 1))
+            timings = {dicts: [], fields: []}
+            for _ in range(args.repeat):
+                for encode, runs in timings.items():
+                    runs.append(timeit.timeit(encode, number=number) / number * 1000)
+            before, after = min(timings[dicts]), min(timings[fields])
+            print(f"{route:42} {before:10.3f} {after:10.3f} {before / after:7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""Export the jobs, reviews and employee tables to columnar files.
+
+    python export_columnar.py --output ./columnar
+    python export_columnar.py --output ./columnar --tables reviews
+
+Each table becomes a directory <output>/<table>/ holding schema.json and
+one or more files per column, all little-endian and meant to be mmap'd
+read-only (see microservices/job_reviews/columnar.py):
+
+    schema.json       {"format": "columnar-v1", "table", "rows",
+                       "exported_at", "columns": [{"name", "type", "nullable"}]}
+    <col>.data        int32 / int64 / float64 / bool (1 byte) values, one
+                      per row; or, for "string" columns, the UTF-8 bytes
+                      of every row back to back
+    <col>.offsets     "string" columns only: rows + 1 int64 offsets into
+                      <col>.data; row i is data[offsets[i]:offsets[i + 1]]
+    <col>.nulls       only if the column has NULLs: one byte per row, 1
+                      for NULL (stored as 0, NaN or "" in .data)
+
+All tables are read in one REPEATABLE READ transaction, ordered by their
+primary key, and streamed through a server-side cursor, so memory use
+does not grow with the table. A table directory is replaced only once it
+has been written completely. Connection settings come from the same DB_*
+environment variables as data_access.
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+from array import array
+from datetime import datetime, timezone
+
+import psycopg2
+
+FORMAT = "columnar-v1"
+
+# table -> primary key to order by (None: unordered)
+TABLES = {
+    "jobs": "job_id",
+    "reviews": "id",
+    "employee": None,
+}
+
+# Postgres data_type -> (column type, array typecode, cast)
+NUMERIC_TYPES = {
+    "smallint": ("int32", "i", None),
+    "integer": ("int32", "i", None),
+    "bigint": ("int64", "q", None),
+    "real": ("float64", "d", None),
+    "double precision": ("float64", "d", None),
+    "numeric": ("float64", "d", "float8"),
+    "boolean": ("bool", "B", None),
+}
+
+# Derived columns that are rebuilt by the database, not exported.
+SKIPPED_TYPES = {"tsvector"}
+
+ITERSIZE = 10000
+
+
+def connect():
+    return psycopg2.connect(
+        dbname=os.environ.get("DB_NAME"),
+        user=os.environ.get("DB_USER"),
+        password=os.environ.get("DB_PASSWORD"),
+        host=os.environ.get("DB_HOST"),
+        port=int(os.environ.get("DB_PORT", 5432)),
+    )
+
+
+def table_columns(cursor, table):
+    """[(name, column type, typecode, select expression)] in table order."""
+    cursor.execute(
+        "SELECT column_name, data_type FROM information_schema.columns "
+        "WHERE table_schema = current_schema() AND table_name = %s ORDER BY ordinal_position",
+        (table,),
+    )
+    columns = []
+    for name, data_type in cursor.fetchall():
+        if data_type in SKIPPED_TYPES:
+            continue
+        quoted = '"' + name.replace('"', '""') + '"'
+        if data_type in NUMERIC_TYPES:
+            kind, typecode, cast = NUMERIC_TYPES[data_type]
+            columns.append((name, kind, typecode, f"{quoted}::{cast}" if cast else quoted))
+        else:
+            columns.append((name, "string", None, f"{quoted}::text"))
+    return columns
+
+
+class ColumnWriter:
+    """Appends one column's values to its files, a chunk at a time."""
+
+    def __init__(self, directory, name, kind, typecode):
+        self.name = name
+        self.kind = kind
+        self.typecode = typecode
+        self.has_nulls = False
+        self.offset = 0
+        self.data = open(os.path.join(directory, f"{name}.data"), "wb")
+        self.nulls = open(os.path.join(directory, f"{name}.nulls"), "wb")
+        self.offsets = None
+        if kind == "string":
+            self.offsets = open(os.path.join(directory, f"{name}.offsets"), "wb")
+            self._write(self.offsets, array("q", [0]))
+
+    @staticmethod
+    def _write(f, values):
+        if sys.byteorder == "big":
+            values.byteswap()
+        values.tofile(f)
+
+    def append(self, values):
+        nulls = bytes(value is None for value in values)
+        self.has_nulls = self.has_nulls or any(nulls)
+        self.nulls.write(nulls)
+        if self.kind == "string":
+            offsets = array("q")
+            for value in values:
+                encoded = value.encode("utf-8") if value is not None else b""
+                self.data.write(encoded)
+                self.offset += len(encoded)
+                offsets.append(self.offset)
+            self._write(self.offsets, offsets)
+        else:
+            missing = float("nan") if self.kind == "float64" else 0
+            self._write(self.data, array(self.typecode, (missing if v is None else v for v in values)))
+
+    def close(self):
+        for f in (self.data, self.nulls, self.offsets):
+            if f is not None:
+                f.close()
+        if not self.has_nulls:
+            os.remove(self.nulls.name)
+        return {"name": self.name, "type": self.kind, "nullable": self.has_nulls}
+
+
+def export_table(conn, table, key, output):
+    with conn.cursor() as cursor:
+        columns = table_columns(cursor, table)
+    if not columns:
+        raise ValueError(f"table {table} not found")
+
+    final = os.path.join(output, table)
+    staging = final + ".tmp"
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+
+    writers = [ColumnWriter(staging, name, kind, typecode) for name, kind, typecode, _ in columns]
+    query = f"SELECT {', '.join(expr for *_, expr in columns)} FROM {table}"
+    if key:
+        query += f" ORDER BY {key}"
+
+    rows = 0
+    with conn.cursor(name=f"export_{table}") as cursor:
+        cursor.itersize = ITERSIZE
+        cursor.execute(query)
+        while True:
+            chunk = cursor.fetchmany(ITERSIZE)
+            if not chunk:
+                break
+            for i, writer in enumerate(writers):
+                writer.append([row[i] for row in chunk])
+            rows += len(chunk)
+
+    schema = {
+        "format": FORMAT,
+        "table": table,
+        "rows": rows,
+        "exported_at": datetime.now(timezone.utc).isoformat(),
+        "columns": [writer.close() for writer in writers],
+    }
+    with open(os.path.join(staging, "schema.json"), "w") as f:
+        json.dump(schema, f, indent=2)
+
+    shutil.rmtree(final, ignore_errors=True)
+    os.rename(staging, final)
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", default="columnar", help="directory to write the table directories to")
+    parser.add_argument("--tables", nargs="*", choices=sorted(TABLES), default=list(TABLES))
+    args = parser.parse_args()
+
+    os.makedirs(args.output, exist_ok=True)
+    conn = connect()
+    try:
+        # One snapshot for every table, so they are consistent with each other.
+        conn.set_session(isolation_level="REPEATABLE READ", readonly=True)
+        for table in args.tables:
+            rows = export_table(conn, table, TABLES[table], args.output)
+            print(f"{table}: {rows} rows -> {os.path.join(args.output, table)}")
+        conn.rollback()
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -103,3 +103,106 @@ FROM '/docker-entrypoint-initdb.d/employee_counts.csv'
 DELIMITER ',' CSV HEADER;
 
 
+-- Per-firm rating totals read by GetCompanyRatingAggregates and kept
+-- up to date by data_access on every review write.
+-- (Same as migrations/001_company_rating_summary.sql.)
+CREATE TABLE company_rating_summary (
+    firm TEXT PRIMARY KEY,
+    review_count BIGINT NOT NULL DEFAULT 0,
+    overall_rating_sum FLOAT NOT NULL DEFAULT 0,
+    overall_rating_count BIGINT NOT NULL DEFAULT 0,
+    work_life_balance_sum FLOAT NOT NULL DEFAULT 0,
+    work_life_balance_count BIGINT NOT NULL DEFAULT 0,
+    culture_values_sum FLOAT NOT NULL DEFAULT 0,
+    culture_values_count BIGINT NOT NULL DEFAULT 0,
+    diversity_inclusion_sum FLOAT NOT NULL DEFAULT 0,
+    diversity_inclusion_count BIGINT NOT NULL DEFAULT 0,
+    career_opp_sum FLOAT NOT NULL DEFAULT 0,
+    career_opp_count BIGINT NOT NULL DEFAULT 0
+);
+
+INSERT INTO company_rating_summary
+SELECT
+    COALESCE(firm, ''),
+    COUNT(*),
+    COALESCE(SUM(overall_rating), 0), COUNT(overall_rating),
+    COALESCE(SUM(work_life_balance), 0), COUNT(work_life_balance),
+    COALESCE(SUM(culture_values), 0), COUNT(culture_values),
+    COALESCE(SUM(diversity_inclusion), 0), COUNT(diversity_inclusion),
+    COALESCE(SUM(career_opp), 0), COUNT(career_opp)
+FROM reviews
+GROUP BY COALESCE(firm, '');
+
+-- Per-location rating totals read by GetBestCities and kept up to date
+-- by data_access on every review write.
+-- (Same as migrations/002_location_rating_summary.sql.)
+CREATE TABLE location_rating_summary (
+    location TEXT PRIMARY KEY,
+    review_count BIGINT NOT NULL DEFAULT 0,
+    overall_rating_sum FLOAT NOT NULL DEFAULT 0,
+    overall_rating_count BIGINT NOT NULL DEFAULT 0,
+    work_life_balance_sum FLOAT NOT NULL DEFAULT 0,
+    work_life_balance_count BIGINT NOT NULL DEFAULT 0,
+    culture_values_sum FLOAT NOT NULL DEFAULT 0,
+    culture_values_count BIGINT NOT NULL DEFAULT 0,
+    diversity_inclusion_sum FLOAT NOT NULL DEFAULT 0,
+    diversity_inclusion_count BIGINT NOT NULL DEFAULT 0,
+    career_opp_sum FLOAT NOT NULL DEFAULT 0,
+    career_opp_count BIGINT NOT NULL DEFAULT 0,
+    comp_benefits_sum FLOAT NOT NULL DEFAULT 0,
+    comp_benefits_count BIGINT NOT NULL DEFAULT 0,
+    senior_mgmt_sum FLOAT NOT NULL DEFAULT 0,
+    senior_mgmt_count BIGINT NOT NULL DEFAULT 0
+);
+
+INSERT INTO location_rating_summary
+SELECT
+    COALESCE(location, ''),
+    COUNT(*),
+    COALESCE(SUM(overall_rating), 0), COUNT(overall_rating),
+    COALESCE(SUM(work_life_balance), 0), COUNT(work_life_balance),
+    COALESCE(SUM(culture_values), 0), COUNT(culture_values),
+    COALESCE(SUM(diversity_inclusion), 0), COUNT(diversity_inclusion),
+    COALESCE(SUM(career_opp), 0), COUNT(career_opp),
+    COALESCE(SUM(comp_benefits), 0), COUNT(comp_benefits),
+    COALESCE(SUM(senior_mgmt), 0), COUNT(senior_mgmt)
+FROM reviews
+GROUP BY COALESCE(location, '');
+
+-- Trigram and full-text indexes for the job searches.
+-- (Same as migrations/003_search_indexes.sql.)
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX jobs_title_trgm_idx ON jobs USING gin (title gin_trgm_ops);
+CREATE INDEX jobs_location_trgm_idx ON jobs USING gin (location gin_trgm_ops);
+CREATE INDEX jobs_company_trgm_idx ON jobs USING gin (company gin_trgm_ops);
+
+ALTER TABLE jobs ADD COLUMN search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(description, '')), 'B')
+    ) STORED;
+CREATE INDEX jobs_remote_search_idx ON jobs USING gin (search_vector) WHERE remote_allowed = TRUE;
+
+-- Lookup indexes and integer company_id for the hot equality/TRIM lookups.
+-- (Same as migrations/004_lookup_indexes.sql.)
+ALTER TABLE jobs ALTER COLUMN company_id TYPE BIGINT USING company_id::BIGINT;
+
+CREATE INDEX jobs_company_id_job_id_idx ON jobs (company_id, job_id);
+CREATE INDEX jobs_title_pay_period_idx ON jobs (title, pay_period);
+CREATE INDEX employee_employee_count_idx ON employee (employee_count DESC);
+CREATE INDEX employee_company_id_idx ON employee (company_id);
+CREATE INDEX reviews_trim_job_title_trgm_idx ON reviews USING gin (TRIM(job_title) gin_trgm_ops);
+CREATE INDEX reviews_trim_location_trgm_idx ON reviews USING gin (TRIM(location) gin_trgm_ops);
+
+ANALYZE jobs;
+ANALYZE employee;
+ANALYZE reviews;
+
+-- Database-assigned ids for new reviews and jobs, continuing after the
+-- imported rows. (Same as migrations/005_id_identity.sql.)
+ALTER TABLE reviews ALTER COLUMN id ADD GENERATED BY DEFAULT AS IDENTITY;
+SELECT setval(pg_get_serial_sequence('reviews', 'id'), COALESCE(MAX(id), 0) + 1, false) FROM reviews;
+
+ALTER TABLE jobs ALTER COLUMN job_id ADD GENERATED BY DEFAULT AS IDENTITY;
+SELECT setval(pg_get_serial_sequence('jobs', 'job_id'), COALESCE(MAX(job_id), 0) + 1, false) FROM jobs;
@@ -0,0 +1,36 @@
+-- Per-firm rating totals read by GetCompanyRatingAggregates.
+-- data_access keeps this table in step with CreateReview, UpdateJobReview
+-- and DeleteReview inside the same transaction as the review write.
+-- Sums and counts skip NULL ratings; review_count includes every review.
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS company_rating_summary (
+    firm TEXT PRIMARY KEY,
+    review_count BIGINT NOT NULL DEFAULT 0,
+    overall_rating_sum FLOAT NOT NULL DEFAULT 0,
+    overall_rating_count BIGINT NOT NULL DEFAULT 0,
+    work_life_balance_sum FLOAT NOT NULL DEFAULT 0,
+    work_life_balance_count BIGINT NOT NULL DEFAULT 0,
+    culture_values_sum FLOAT NOT NULL DEFAULT 0,
+    culture_values_count BIGINT NOT NULL DEFAULT 0,
+    diversity_inclusion_sum FLOAT NOT NULL DEFAULT 0,
+    diversity_inclusion_count BIGINT NOT NULL DEFAULT 0,
+    career_opp_sum FLOAT NOT NULL DEFAULT 0,
+    career_opp_count BIGINT NOT NULL DEFAULT 0
+);
+
+TRUNCATE company_rating_summary;
+
+INSERT INTO company_rating_summary
+SELECT
+    COALESCE(firm, ''),
+    COUNT(*),
+    COALESCE(SUM(overall_rating), 0), COUNT(overall_rating),
+    COALESCE(SUM(work_life_balance), 0), COUNT(work_life_balance),
+    COALESCE(SUM(culture_values), 0), COUNT(culture_values),
+    COALESCE(SUM(diversity_inclusion), 0), COUNT(diversity_inclusion),
+    COALESCE(SUM(career_opp), 0), COUNT(career_opp)
+FROM reviews
+GROUP BY COALESCE(firm, '');
+
+COMMIT;
@@ -0,0 +1,24 @@
+-- Indexes for the title/location/company substring searches and the
+-- remote-jobs keyword search in data_access.
+BEGIN;
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- LIKE/ILIKE '%x%' on these columns can use trigram indexes instead of
+-- scanning the whole jobs table.
+CREATE INDEX IF NOT EXISTS jobs_title_trgm_idx ON jobs USING gin (title gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS jobs_location_trgm_idx ON jobs USING gin (location gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS jobs_company_trgm_idx ON jobs USING gin (company gin_trgm_ops);
+
+-- Full-text vector for GetRemoteJobs keyword search, title weighted above
+-- description for ranking. Only remote jobs are ever searched this way.
+ALTER TABLE jobs ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(description, '')), 'B')
+    ) STORED;
+CREATE INDEX IF NOT EXISTS jobs_remote_search_idx ON jobs USING gin (search_vector) WHERE remote_allowed = TRUE;
+
+COMMIT;
+
+ANALYZE jobs;
@@ -0,0 +1,31 @@
+-- B-tree and expression indexes for the equality and TRIM lookups used by
+-- the hot data_access RPCs, plus an integer type for jobs.company_id.
+-- Run datasets/benchmarks/explain_hot_queries.py with --label before and
+-- --label after around this migration to record the plan changes.
+BEGIN;
+
+-- company_id only ever holds whole numbers; FLOAT made every comparison a
+-- float comparison and the column awkward to index.
+ALTER TABLE jobs ALTER COLUMN company_id TYPE BIGINT USING company_id::BIGINT;
+
+-- GetJobPostingsForLargestCompanies: company_id = ? [AND job_id > ?] ORDER BY job_id
+CREATE INDEX IF NOT EXISTS jobs_company_id_job_id_idx ON jobs (company_id, job_id);
+
+-- GetBestPayingCompanies: title = ? AND pay_period = 'YEARLY'
+CREATE INDEX IF NOT EXISTS jobs_title_pay_period_idx ON jobs (title, pay_period);
+
+-- GetCompaniesWithEmployees: companies by size
+CREATE INDEX IF NOT EXISTS employee_employee_count_idx ON employee (employee_count DESC);
+CREATE INDEX IF NOT EXISTS employee_company_id_idx ON employee (company_id);
+
+-- GetJobReviewsWithTitleAndCity / GetJobReviewRatingsForTitlesAndCities:
+-- TRIM(job_title) LIKE '%x%' AND TRIM(location) LIKE '%x%'. Infix patterns
+-- need trigram expression indexes (pg_trgm is created by 003).
+CREATE INDEX IF NOT EXISTS reviews_trim_job_title_trgm_idx ON reviews USING gin (TRIM(job_title) gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS reviews_trim_location_trgm_idx ON reviews USING gin (TRIM(location) gin_trgm_ops);
+
+COMMIT;
+
+ANALYZE jobs;
+ANALYZE employee;
+ANALYZE reviews;
@@ -0,0 +1,12 @@
+-- Let the database assign review and job ids so CreateReview and
+-- PostJobInDB can insert with a single INSERT ... RETURNING instead of
+-- MAX(id) + 1 (racy) or random ids probed one SELECT at a time.
+BEGIN;
+
+ALTER TABLE reviews ALTER COLUMN id ADD GENERATED BY DEFAULT AS IDENTITY;
+SELECT setval(pg_get_serial_sequence('reviews', 'id'), COALESCE(MAX(id), 0) + 1, false) FROM reviews;
+
+ALTER TABLE jobs ALTER COLUMN job_id ADD GENERATED BY DEFAULT AS IDENTITY;
+SELECT setval(pg_get_serial_sequence('jobs', 'job_id'), COALESCE(MAX(job_id), 0) + 1, false) FROM jobs;
+
+COMMIT;
@@ -1,28 +1,362 @@
-import os
+import os, json, threading, time
+from functools import wraps
+from itertools import chain
 import grpc
-from flask import Flask, request, jsonify
-from jobreviews_pb2 import BestCompaniesRequest, UpdateJobReviewRequest,DeleteReviewRequest,CreateReviewRequest, ReviewinJob, BestCityRequest
-from jobpostings_pb2 import AverageSalaryRequest, BestPayingCompaniesRequest,  JobPostingsForLargestCompaniesRequest, JobsWithRatingRequest, JobAddRequest, RemoteJobSearchRequest
+import telemetry
+from flask import Flask, g, request, jsonify, make_response, stream_with_context
+from jobreviews_pb2 import BestCompaniesRequest, UpdateJobReviewRequest,DeleteReviewRequest,CreateReviewRequest, ReviewinJob, BestCityRequest, BestRatingCity, CompanyReview
+from jobpostings_pb2 import AverageSalaryRequest, BestPayingCompaniesRequest,  JobPostingsForLargestCompaniesRequest, JobsWithRatingRequest, JobAddRequest, RemoteJobSearchRequest, JobAddResponse, JobWithRating, JobForLargestCompany, JobForRemote, BestCompany
 from jobpostings_pb2_grpc import JobPostingServiceStub
 from jobreviews_pb2_grpc import JobReviewServiceStub
+from data_access_pb2 import InvalidationRequest
+from data_access_pb2_grpc import DataAccessServiceStub
+from invalidation_relay import DATA_ACCESS_TARGET, relayed_events
+from response_cache import ResponseCache
+from serialization import FieldPlan, json_body
 
 app = Flask(__name__)
+telemetry.set_service("api_interface")
 
 jobreviews_host = os.getenv("JOBREVIEWSHOST", "job-reviews-service")
 jobpostings_host = os.getenv("JOBPOSTINSHOST", "job-postings-service")
 
-# Create gRPC channels and stubs.
-jobpostings_channel = grpc.insecure_channel(f"{jobpostings_host}:50051", options=[
+CHANNEL_OPTIONS = [
     ('grpc.max_send_message_length', 10 * 1024 * 1024),
     ('grpc.max_receive_message_length', 10 * 1024 * 1024)
-])
-job_postings_client = JobPostingServiceStub(jobpostings_channel)
+]
+
+class LazyStub:
+    """A gRPC stub whose channel is opened on first use in each process.
+
+    gRPC channels do not survive a fork, so under a pre-forking server
+    (gunicorn.conf.py) every worker must open its own. Calls are forwarded
+    to a stub on this process's channel, which passes the request's trace
+    id on and times the call.
+    """
+
+    def __init__(self, stub_class, target, options=None):
+        self.stub_class = stub_class
+        self.target = target
+        self.options = options
+        self._lock = threading.Lock()
+        self._pid = None
+        self._stub = None
+
+    def stub(self):
+        pid = os.getpid()
+        if self._pid != pid:
+            with self._lock:
+                if self._pid != pid:
+                    channel = telemetry.intercept_channel(grpc.insecure_channel(self.target, options=self.options))
+                    self._stub = self.stub_class(channel)
+                    self._pid = pid
+        return self._stub
+
+    def __getattr__(self, name):
+        return getattr(self.stub(), name)
+
+# gRPC stubs, each on its own channel.
+job_postings_client = LazyStub(JobPostingServiceStub, f"{jobpostings_host}:50051", CHANNEL_OPTIONS)
+job_reviews_client = LazyStub(JobReviewServiceStub, f"{jobreviews_host}:50051", CHANNEL_OPTIONS)
+# Only used for the invalidation stream when no relay is running (flask run).
+data_access_client = LazyStub(DataAccessServiceStub, DATA_ACCESS_TARGET)
+
+# Read-through cache for the aggregate search endpoints. Entries are whole
+# 200 responses keyed on path plus sorted query args; RESPONSE_CACHE_TTL_SCALE
+# stretches or shrinks every route's TTL (0 disables caching).
+response_cache = ResponseCache(max_entries=int(os.getenv("RESPONSE_CACHE_SIZE", 512)))
+RESPONSE_CACHE_TTL_SCALE = float(os.getenv("RESPONSE_CACHE_TTL_SCALE", 1))
+
+# Set while the data_access invalidation stream is up. Entries then live
+# for the route's subscribed_ttl, since writes evict them; otherwise the
+# shorter ttl bounds how stale they can get.
+invalidations_active = threading.Event()
+
+def cached(ttl, subscribed_ttl=None, tags=lambda: ()):
+    ttl = ttl * RESPONSE_CACHE_TTL_SCALE
+    subscribed_ttl = (subscribed_ttl or 0) * RESPONSE_CACHE_TTL_SCALE
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            key = (request.path, tuple(sorted(request.args.items(multi=True))))
+
+            def load():
+                response = make_response(view(*args, **kwargs))
+                return response.get_data(), response.status_code, response.content_type
+
+            entry_ttl = max(ttl, subscribed_ttl) if invalidations_active.is_set() else ttl
+            body, status, content_type = response_cache.get_or_load(
+                key, entry_ttl, load, cacheable=lambda value: value[1] == 200, tags=tags()
+            )
+            return app.response_class(body, status=status, content_type=content_type)
+        return wrapper
+    return decorator
+
+# Cache tags and the invalidation events that evict them:
+#   ("reviews",)                any review write (firm and city rankings)
+#   ("job-title", title)        a job with exactly this title
+def tag_affected(tag, event):
+    if event.table == "reviews":
+        return tag[0] == "reviews"
+    if event.table == "jobs":
+        if tag[0] == "job-title":
+            return tag[1] in event.titles
+    return False
+
+def apply_invalidation(event):
+    if event.reset:
+        response_cache.clear()
+        invalidations_active.set()
+    else:
+        response_cache.invalidate(lambda tag: tag_affected(tag, event))
+
+def invalidations_lost():
+    # Events may be missed until we resubscribe.
+    invalidations_active.clear()
+    response_cache.clear()
+
+def follow_invalidations(retry_interval=5):
+    while True:
+        try:
+            for event in data_access_client.SubscribeInvalidations(InvalidationRequest()):
+                apply_invalidation(event)
+        except grpc.RpcError as e:
+            print(f"Invalidation stream lost: {e}")
+        invalidations_lost()
+        time.sleep(retry_interval)
+
+def follow_relay(path, retry_interval=1):
+    """Take invalidation events from the relay gunicorn.conf.py runs, instead of subscribing."""
+    while True:
+        try:
+            for event in relayed_events(path):
+                apply_invalidation(event)
+        except OSError as e:
+            print(f"Invalidation relay unavailable: {e}")
+        invalidations_lost()
+        time.sleep(retry_interval)
+
+_follower_pid = None
+_follower_lock = threading.Lock()
+
+def start_invalidation_follower():
+    """Start this process's invalidation thread, once; threads do not survive a fork.
+
+    Under gunicorn, INVALIDATION_RELAY_SOCKET names the relay that shares
+    one data_access subscription among the workers.
+    """
+    global _follower_pid
+    if _follower_pid == os.getpid():
+        return
+    with _follower_lock:
+        if _follower_pid != os.getpid():
+            _follower_pid = os.getpid()
+            relay_socket = os.getenv("INVALIDATION_RELAY_SOCKET")
+            if relay_socket:
+                threading.Thread(target=follow_relay, args=(relay_socket,), daemon=True).start()
+            else:
+                threading.Thread(target=follow_invalidations, daemon=True).start()
+
+# Started on the first request of each process; gunicorn workers start it
+# as soon as they are forked.
+app.before_request(start_invalidation_follower)
+
+# Every request is timed per route until its body has been sent (for
+# streamed responses, the teardown runs after the last chunk). The client's
+# X-Trace-Id, or a new id, goes to the services with each gRPC call and
+# back in the response.
+@app.before_request
+def start_request_timing():
+    route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+    g.request_timing = telemetry.begin(route, request.headers.get(telemetry.TRACE_HEADER))
+
+@app.after_request
+def add_trace_header(response):
+    timing = g.get("request_timing")
+    if timing is not None:
+        response.headers[telemetry.TRACE_HEADER] = timing.trace_id
+        g.response_status = response.status_code
+    return response
+
+@app.teardown_request
+def record_request_timing(error=None):
+    timing = g.pop("request_timing", None)
+    if timing is not None:
+        status = 500 if error is not None else g.get("response_status", 500)
+        telemetry.end_http(timing, request.method, status)
+
+REVIEW_REQUIRED_FIELDS = ["firm", "job_title", "location", "overall_rating", "pros", "cons"]
+JOB_REQUIRED_FIELDS = ["title", "normalized_salary", "company_name", "description", "location"]
+
+def review_from_json(data):
+    return ReviewinJob(
+        firm=data["firm"],
+        job_title=data["job_title"],
+        location=data["location"],
+        overall_rating=data["overall_rating"],
+        pros=data["pros"],
+        cons=data["cons"],
 
-jobreviews_channel = grpc.insecure_channel(f"{jobreviews_host}:50051", options=[
-    ('grpc.max_send_message_length', 10 * 1024 * 1024),
-    ('grpc.max_receive_message_length', 10 * 1024 * 1024)
-])
-job_reviews_client = JobReviewServiceStub(jobreviews_channel)
+        current=data.get("current", ""),
+        work_life_balance=data.get("work_life_balance", 0.0),
+        culture_values=data.get("culture_values", 0.0),
+        diversity_inclusion=data.get("diversity_inclusion", 0.0),
+        career_opp=data.get("career_opp", 0.0),
+        comp_benefits=data.get("comp_benefits", 0.0),
+        senior_mgmt=data.get("senior_mgmt", 0.0),
+        recommend=data.get("recommend", ""),
+        ceo_approv=data.get("ceo_approv", ""),
+        outlook=data.get("outlook", ""),
+        headline=data.get("headline", ""),
+    )
+
+def job_from_json(data):
+    return JobAddRequest(
+        title=data["title"],
+        normalized_salary=data["normalized_salary"],
+        company_name=data["company_name"],
+        description=data["description"],
+        location=data["location"]
+    )
+
+def messages_from_ndjson(stream, required_fields, to_message, invalid_lines):
+    # Yields one message per valid line of a newline-delimited JSON body.
+    # Lines that do not parse or lack required fields are recorded in
+    # invalid_lines (by line number) and skipped.
+    for line_number, line in enumerate(stream, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            data = json.loads(line)
+            if not isinstance(data, dict) or not all(field in data for field in required_fields):
+                raise ValueError("missing required fields")
+            message = to_message(data)
+        except Exception:
+            invalid_lines.append(line_number)
+            continue
+        yield message
+
+def bulk_response_json(bulk_response, invalid_lines):
+    return {
+        "accepted": bulk_response.accepted,
+        "rejected": bulk_response.rejected + len(invalid_lines),
+        "invalid_lines": invalid_lines,
+        "batches": [
+            {"batch": b.batch, "accepted": b.accepted, "rejected": b.rejected, "error": b.error}
+            for b in bulk_response.batch
+        ]
+    }
+
+# The job search routes can stream instead of building the whole list:
+# "Accept: application/x-ndjson" sends one job per line, ?stream=true sends
+# the usual {"jobs": [...]} body in chunks. Both pull from a streaming RPC.
+NDJSON_MIMETYPE = "application/x-ndjson"
+
+def wants_ndjson():
+    return request.accept_mimetypes.best_match(["application/json", NDJSON_MIMETYPE]) == NDJSON_MIMETYPE
+
+def wants_stream():
+    return wants_ndjson() or request.args.get("stream", "").lower() in ("1", "true", "yes")
+
+def streamed_jobs_response(pages):
+    """Stream pages (lists of JSON-encoded jobs) as NDJSON or as one {"jobs": [...]} body.
+
+    The body is what jsonify would produce for the whole list. The first
+    page is fetched before the response starts, so a failing call still
+    gets an error status; a failure after that ends the body early.
+    """
+    pages = iter(pages)
+    first = next(pages, [])
+    ndjson = wants_ndjson()
+
+    def generate():
+        try:
+            if ndjson:
+                for page in chain([first], pages):
+                    # An empty chunk would end a chunked response.
+                    if page:
+                        yield "".join(job + "\n" for job in page)
+                return
+            yield '{"jobs":['
+            separator = ""
+            for page in chain([first], pages):
+                if page:
+                    yield separator + ",".join(page)
+                    separator = ","
+            yield "]}\n"
+        except grpc.RpcError as e:
+            # Too late for an error status; the truncated body shows the failure.
+            print(f"Job stream failed: {e}")
+
+    return app.response_class(
+        stream_with_context(generate()),
+        mimetype=NDJSON_MIMETYPE if ndjson else "application/json"
+    )
+
+# JSON field plans for the messages the routes return: JSON key -> message
+# field. Output is byte-identical to building the dicts and calling jsonify.
+BEST_CITY_JSON = FieldPlan(BestRatingCity, {
+    "name": "city",
+    "average_rating": "average_rating"
+})
+COMPANY_REVIEW_JSON = FieldPlan(CompanyReview, {
+    "firm": "firm",
+    "overall_rating": "overall_rating",
+    "work_life_balance": "work_life_balance",
+    "culture_values": "culture_values",
+    "diversity_inclusion": "diversity_inclusion",
+    "career_opp": "career_opp"
+})
+JOB_ADD_REQUEST_JSON = FieldPlan(JobAddRequest, {
+    "title": "title",
+    "normalized_salary": "normalized_salary",
+    "company_name": "company_name",
+    "description": "description",
+    "location": "location"
+})
+JOB_ADD_RESPONSE_JSON = FieldPlan(JobAddResponse, {
+    "message": "message",
+    "status": "status",
+    "job_id": "job_id"
+})
+JOB_WITH_RATING_JSON = FieldPlan(JobWithRating, {
+    "title": "job.title",
+    "company": "job.company_name",
+    "salary": "job.salary",
+    "location": "job.location",
+    "views": "job.views",
+    "rating": "rating",
+    "description": "job.description"
+})
+LARGEST_COMPANY_JOB_JSON = FieldPlan(JobForLargestCompany, {
+    "company": "company",
+    "title": "title",
+    "description": "description",
+    "location": "location",
+    "company_id": "company_id",
+    "med_salary": "med_salary"
+})
+REMOTE_JOB_JSON = FieldPlan(JobForRemote, {
+    "id": "id",
+    "company": "company",
+    "title": "title",
+    "description": "description",
+    "location": "location",
+    "remote_allowed": "remote_allowed"
+})
+BEST_COMPANY_JSON = FieldPlan(BestCompany, {
+    "company_name": "company_name",
+    "average_salary": "average_salary"
+})
+
+def json_response(members, status=200):
+    # What jsonify(members) would return, built from FieldPlan output.
+    return app.response_class(json_body(members), status=status, mimetype="application/json")
+
+def ingest_metadata():
+    batch_size = request.args.get("batch_size")
+    return [("batch-size", batch_size)] if batch_size else []
 
 @app.route("/readyz") # Or /healthz
 def readiness():
@@ -32,41 +366,54 @@ def readiness():
 def liveness():
   return "OK", 200
 
+@app.route("/cache/stats", methods=["GET"])
+def render_cacheStats():
+    return jsonify(response_cache.stats()), 200
+
+@app.route("/metrics", methods=["GET"])
+def render_metrics():
+    # Latency histograms in the Prometheus text format; see telemetry.
+    body, content_type = telemetry.metrics_exposition()
+    return app.response_class(body, content_type=content_type)
+
 @app.route("/jobs/search/average-salary", methods=["GET"])
+@cached(ttl=60, subscribed_ttl=3600, tags=lambda: [("job-title", request.args.get("title", ""))])
 def render_homepage():
     title = request.args.get("title", "")
+    percentiles = request.args.get("percentiles", "false").lower() == "true"
     
     if not title:
         return jsonify({"error": "Title is required"}), 400
 
 
     averageSalary_request = AverageSalaryRequest(
-        title=title
+        title=title,
+        percentiles=percentiles
     )
 
     averageSalary_response = job_postings_client.AverageSalary(
         averageSalary_request
     )
 
-    return jsonify({"averageSalary": averageSalary_response.averageSalary}), 200
+    result = {
+        "averageSalary": averageSalary_response.averageSalary,
+        "count": averageSalary_response.count
+    }
+    if percentiles:
+        for field in ("p25", "p50", "p75"):
+            result[field] = getattr(averageSalary_response, field) if averageSalary_response.HasField(field) else None
+
+    return jsonify(result), 200
 
 
 
 @app.route("/jobs/search/best-cities", methods=["GET"])
+@cached(ttl=300, subscribed_ttl=3600, tags=lambda: [("reviews",)])
 def render_location():
     cities_request = BestCityRequest()
     cities_response = job_reviews_client.BestCity(cities_request)
     
-    # Convert Protobuf message objects to dictionaries
-    city_list = []
-    for city in cities_response.city:
-        city_dict = {
-            "name": city.city,
-            "average_rating": city.average_rating
-        }
-        city_list.append(city_dict)
-    
-    return jsonify({"cities": city_list}), 200
+    return json_response({"cities": BEST_CITY_JSON.array(cities_response.city)})
     
     
 @app.route("/jobs/post/job-posting", methods=["POST"])
@@ -74,20 +421,14 @@ def render_AddJob():
     
     data = request.get_json()
     
-    if not data or not all(key in data for key in ["title", "normalized_salary", "company_name", "description", "location"]):
+    if not data or not all(key in data for key in JOB_REQUIRED_FIELDS):
         return jsonify({
             "message": "Invalid request: missing required fields.",
             "status": 400
         }), 400
 
     try:
-        job_request = JobAddRequest(
-            title=data["title"],
-            normalized_salary=data["normalized_salary"],
-            company_name=data["company_name"],
-            description=data["description"],
-            location=data["location"]
-        )
+        job_request = job_from_json(data)
     except Exception as e:
         return jsonify({
             "message": f"Error creating JobAddRequest: {e}",
@@ -102,20 +443,10 @@ def render_AddJob():
             "status": 500
         }), 500
 
-    return jsonify({
-        "job_request": {
-            "title": job_request.title,
-            "normalized_salary": job_request.normalized_salary,
-            "company_name": job_request.company_name,
-            "description": job_request.description,
-            "location": job_request.location
-        },
-        "job_response": {
-            "message": job_response.message,
-            "status": job_response.status,
-            "job_id": job_response.job_id
-        }
-    }), job_response.status
+    return json_response({
+        "job_request": JOB_ADD_REQUEST_JSON.object(job_request),
+        "job_response": JOB_ADD_RESPONSE_JSON.object(job_response)
+    }, status=job_response.status)
     
 @app.route("/jobs/search/jobs-with-rating", methods=["GET"])
 def render_jobsWithRating():
@@ -133,42 +464,16 @@ def render_jobsWithRating():
         jobsWithRating_request
     )   
     
-    jobs = [
-        {"title": job.job.title, "company": job.job.company_name, "salary": job.job.salary, "location": job.job.location, "views": job.job.views, "rating": job.rating, "description": job.job.description,}
-        for job in jobsWithRating_response.jobs
-    ]
-    
-    return jsonify({"jobs": jobs}), 200
+    return json_response({"jobs": JOB_WITH_RATING_JSON.array(jobsWithRating_response.jobs)})
     
 @app.route("/jobs/post/review-posting", methods=["POST"])
 def render_addJobReview():
     data = request.get_json()
 
-    required_fields = ["firm", "job_title", "location", "overall_rating", "pros", "cons"]
-    
-    if not all(field in data for field in required_fields):
+    if not all(field in data for field in REVIEW_REQUIRED_FIELDS):
         return jsonify({"error": "Missing required fields"}), 400
 
-    review = ReviewinJob(
-        firm=data["firm"],
-        job_title=data["job_title"],
-        location=data["location"],
-        overall_rating=data["overall_rating"],
-        pros=data["pros"],
-        cons=data["cons"],
-
-        current=data.get("current", ""),
-        work_life_balance=data.get("work_life_balance", 0.0),
-        culture_values=data.get("culture_values", 0.0),
-        diversity_inclusion=data.get("diversity_inclusion", 0.0),
-        career_opp=data.get("career_opp", 0.0),
-        comp_benefits=data.get("comp_benefits", 0.0),
-        senior_mgmt=data.get("senior_mgmt", 0.0),
-        recommend=data.get("recommend", ""),
-        ceo_approv=data.get("ceo_approv", ""),
-        outlook=data.get("outlook", ""),
-        headline=data.get("headline", ""),
-    )
+    review = review_from_json(data)
 
     createJobReview_request = CreateReviewRequest(
         review=review
@@ -180,47 +485,58 @@ def render_addJobReview():
     
     return jsonify({"success": createJobReview_response.success}), 200
 
+@app.route("/jobs/post/review-postings/bulk", methods=["POST"])
+def render_bulkAddJobReviews():
+    # Body is newline-delimited JSON, one review per line. The body is read
+    # as the gRPC call consumes it, so it is never held in memory whole.
+    invalid_lines = []
+    reviews = messages_from_ndjson(request.stream, REVIEW_REQUIRED_FIELDS, review_from_json, invalid_lines)
+
+    try:
+        bulk_response = job_reviews_client.BulkCreateReviews(reviews, metadata=ingest_metadata())
+    except Exception as e:
+        return jsonify({"error": f"Error creating reviews: {str(e)}"}), 500
+
+    return jsonify(bulk_response_json(bulk_response, invalid_lines)), 200
+
+@app.route("/jobs/post/job-postings/bulk", methods=["POST"])
+def render_bulkAddJobs():
+    # Body is newline-delimited JSON, one job posting per line.
+    invalid_lines = []
+    jobs = messages_from_ndjson(request.stream, JOB_REQUIRED_FIELDS, job_from_json, invalid_lines)
+
+    try:
+        bulk_response = job_postings_client.BulkAddJobs(jobs, metadata=ingest_metadata())
+    except Exception as e:
+        return jsonify({"error": f"Error adding jobs: {str(e)}"}), 500
+
+    return jsonify(bulk_response_json(bulk_response, invalid_lines)), 200
+
 @app.route("/jobs/search/best-companies", methods=["GET"])
+@cached(ttl=300, subscribed_ttl=3600, tags=lambda: [("reviews",)])
 def render_bestCompanies():
     bestCompanies_request = BestCompaniesRequest()
     bestCompanies_response = job_reviews_client.GetBestCompanies(bestCompanies_request)
     
-    # Convert protobuf message to Python list for JSON serialization
-    companies = []
-    for company in bestCompanies_response.companyReview:
-        companies.append({
-            "firm": company.firm,
-            "overall_rating": company.overall_rating,
-            "work_life_balance": company.work_life_balance,
-            "culture_values": company.culture_values,
-            "diversity_inclusion": company.diversity_inclusion,
-            "career_opp": company.career_opp
-        })
-    
-    return jsonify({
-        "bestCompanies": companies
-    }),200
+    return json_response({
+        "bestCompanies": COMPANY_REVIEW_JSON.array(bestCompanies_response.companyReview)
+    })
 
 @app.route("/jobs/search/jobs-in-biggest-companies", methods=["GET"])
 def render_jobsForLargestCompanies():
     jobsForLargestCompanies_request = JobPostingsForLargestCompaniesRequest()
+
+    if wants_stream():
+        chunks = job_postings_client.StreamJobPostingsForLargestCompanies(jobsForLargestCompanies_request)
+        return streamed_jobs_response(
+            LARGEST_COMPANY_JOB_JSON.encode_all(chunk.job) for chunk in chunks
+        )
+
     jobsForLargestCompanies_response = job_postings_client.GetJobPostingsForLargestCompanies(jobsForLargestCompanies_request)
     
-    # Convert protobuf message to Python list for JSON serialization
-    jobs = []
-    for job in jobsForLargestCompanies_response.job:
-        jobs.append({
-            "company": job.company,
-            "title": job.title,
-            "description": job.description,
-            "location": job.location,
-            "company_id": job.company_id,
-            "med_salary": job.med_salary
-        })
-    
-    return jsonify({
-        "jobs": jobs
-    }),200
+    return json_response({
+        "jobs": LARGEST_COMPANY_JOB_JSON.array(jobsForLargestCompanies_response.job)
+    })
 
 @app.route("/reviews/<string:review_id>", methods=["PUT"])
 def update_review(review_id):
@@ -273,29 +589,46 @@ def render_remoteJobs():
     company = request.args.get("company", "")
     city = request.args.get("city", "")
     keyword = request.args.get("keyword", "")
+    sort = request.args.get("sort", "")
 
     if not company and not city and not keyword:
         return jsonify({"error": "Keyword, city or company are required"}), 400
 
-    remoteJobsRequest = RemoteJobSearchRequest(company=company, city=city, keyword=keyword)
-    remoteJobsResponse = job_postings_client.GetRemoteJobs(remoteJobsRequest)
+    try:
+        page_size = int(request.args.get("page_size", 0))
+    except ValueError:
+        return jsonify({"error": "page_size must be an integer"}), 400
+
+    remoteJobsRequest = RemoteJobSearchRequest(
+        company=company, city=city, keyword=keyword,
+        rank_by_relevance=(sort == "relevance"),
+        page_size=page_size,
+        page_token=request.args.get("page_token", ""),
+        include_total=request.args.get("total", "").lower() in ("1", "true", "yes")
+    )
+
+    if wants_stream():
+        chunks = job_postings_client.StreamRemoteJobs(remoteJobsRequest)
+        return streamed_jobs_response(REMOTE_JOB_JSON.encode_all(chunk.jobs) for chunk in chunks)
+
+    try:
+        remoteJobsResponse = job_postings_client.GetRemoteJobs(remoteJobsRequest)
+    except grpc.RpcError as e:
+        if e.code() == grpc.StatusCode.INVALID_ARGUMENT:
+            return jsonify({"error": e.details()}), 400
+        raise
     
-    jobs = []
-    for job in remoteJobsResponse.jobs:
-        jobs.append({
-            "id": job.id,
-            "company": job.company,
-            "title": job.title,
-            "description": job.description,
-            "location": job.location,
-            "remote_allowed": job.remote_allowed
-        })
+    result = {
+        "jobs": REMOTE_JOB_JSON.array(remoteJobsResponse.jobs),
+        "next_page_token": remoteJobsResponse.next_page_token or None
+    }
+    if remoteJobsResponse.HasField("approximate_total"):
+        result["approximate_total"] = remoteJobsResponse.approximate_total
     
-    return jsonify({
-        "jobs": jobs
-    }),200
+    return json_response(result)
 
 @app.route('/jobs/search/best-paying-companies', methods=['GET'])
+@cached(ttl=60, subscribed_ttl=3600, tags=lambda: [("job-title", request.args.get("title", ""))])
 def render_best_paying_companies():
     job_title = request.args.get('title')
 
@@ -308,16 +641,9 @@ def render_best_paying_companies():
 
         best_paying_response = job_postings_client.GetBestPayingCompanies(best_paying_request)
 
-        companies = []
-        for company in best_paying_response.companies:
-            companies.append({
-                "company_name": company.company_name,
-                "average_salary": company.average_salary
-            })
-
-        return jsonify({
-            "best_paying_companies": companies
-        }), 200
+        return json_response({
+            "best_paying_companies": BEST_COMPANY_JSON.array(best_paying_response.companies)
+        })
 
     except Exception as e:
         return jsonify({"error": f"Error fetching best paying companies: {str(e)}"}), 500
@@ -0,0 +1,86 @@
+"""Production server for api_interface:
+
+    gunicorn -c gunicorn.conf.py api_interface:app
+
+Pre-forks API_WORKERS processes (default: the CPUs the container may use,
+at most MAX_DEFAULT_WORKERS), each with its own gRPC channels and response
+cache, so JSON encoding and proto conversion run on every core instead of
+under one GIL. The master also runs invalidation_relay.py, which holds the
+one data_access invalidation stream and passes its events to every worker,
+so the subscriptions data_access serves do not grow with the core count.
+
+Workers share the listening socket, opened with SO_REUSEPORT so a new
+master can bind next to the old one on upgrade (USR2). HUP reloads the
+code and replaces the workers gracefully; in-flight requests get
+graceful_timeout seconds to finish.
+
+Each worker writes its metrics to files under PROMETHEUS_MULTIPROC_DIR,
+and /metrics, whichever worker serves it, adds up all of them.
+"""
+import math, os, shutil, subprocess, sys, threading, time
+
+def available_cpus():
+    """CPUs this container may use: its cgroup quota if it has one, else its affinity mask."""
+    cpus = len(os.sched_getaffinity(0))
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+        if quota != "max":
+            cpus = min(cpus, math.ceil(int(quota) / int(period)))
+    except (OSError, ValueError):
+        pass
+    return max(cpus, 1)
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8082')}"
+reuse_port = True
+# Past this many workers on a big host, more cores mostly add gRPC channels
+# and cold caches; set API_WORKERS to go higher.
+MAX_DEFAULT_WORKERS = 8
+workers = int(os.getenv("API_WORKERS", min(available_cpus(), MAX_DEFAULT_WORKERS)))
+# Threads let a worker keep serving while some of its requests wait on
+# gRPC calls or stream large responses.
+worker_class = "gthread"
+threads = int(os.getenv("API_THREADS", 4))
+# Below the load balancer's 180 s backend timeout.
+timeout = int(os.getenv("API_TIMEOUT", 170))
+graceful_timeout = int(os.getenv("API_GRACEFUL_TIMEOUT", 30))
+keepalive = 5
+accesslog = "-"
+
+# Read by prometheus_client when the workers import it.
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", "/tmp/api_interface-metrics")
+# Read by the workers to find the invalidation relay.
+os.environ.setdefault("INVALIDATION_RELAY_SOCKET", "/tmp/api_interface-invalidations.sock")
+
+relay = None
+
+def on_starting(server):
+    # Start from empty histograms rather than the last run's.
+    path = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(path)
+
+def run_relay(server, restart_interval=5):
+    # Started as a fresh interpreter rather than forked, so the master never
+    # loads gRPC. Restarted if it dies until the master exits.
+    global relay
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "invalidation_relay.py")
+    while True:
+        relay = subprocess.Popen([sys.executable, path, os.environ["INVALIDATION_RELAY_SOCKET"]])
+        code = relay.wait()
+        server.log.warning("Invalidation relay exited with %s, restarting", code)
+        time.sleep(restart_interval)
+
+def when_ready(server):
+    threading.Thread(target=run_relay, args=(server,), daemon=True).start()
+
+def on_exit(server):
+    if relay is not None:
+        relay.terminate()
+
+def post_fork(server, worker):
+    # Channels open lazily in each worker; the thread that follows the
+    # invalidation relay is started here so the response cache follows
+    # writes from the start.
+    import api_interface
+    api_interface.start_invalidation_follower()
@@ -0,0 +1,118 @@
+"""One data_access invalidation stream for all gunicorn workers.
+
+gunicorn.conf.py starts this module as a process of its own next to the
+workers:
+
+    python invalidation_relay.py SOCKET_PATH
+
+It subscribes to data_access once and passes every event on to the
+workers connected to SOCKET_PATH (a Unix SOCK_SEQPACKET socket, one event
+per packet). A worker that connects while the stream is up first gets a
+reset. When the stream drops, or a worker stops reading, the relay hangs
+up on those workers; they clear their caches and reconnect, and stay
+unsubscribed until the next reset.
+
+The master process does not use gRPC itself, since it forks the workers.
+"""
+import os, socket, sys, threading, time
+import grpc
+from data_access_pb2 import InvalidationEvent, InvalidationRequest
+from data_access_pb2_grpc import DataAccessServiceStub
+
+data_access_host = os.getenv("DATA_ACCESS_HOST", "data-access-service")
+# data_access serves the invalidation stream on a port of its own.
+data_access_invalidation_port = os.getenv("DATA_ACCESS_INVALIDATION_PORT", "50052")
+DATA_ACCESS_TARGET = f"{data_access_host}:{data_access_invalidation_port}"
+
+# Largest packet sent to a worker. Bigger events (bulk writes naming many
+# titles) go out as a reset, which evicts everything.
+MAX_PACKET = 64 * 1024
+RESET = InvalidationEvent(reset=True).SerializeToString()
+
+class Relay:
+    """Fans one stream of invalidation events out to the connected workers."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._workers = []
+        self._active = False
+
+    def _send(self, worker, packet):
+        # Workers are non-blocking: one that has fallen a socket buffer
+        # behind is dropped rather than holding up the rest.
+        try:
+            worker.send(packet)
+            return True
+        except OSError:
+            worker.close()
+            return False
+
+    def add(self, worker):
+        worker.setblocking(False)
+        with self._lock:
+            if self._active and not self._send(worker, RESET):
+                return
+            self._workers.append(worker)
+
+    def publish(self, event):
+        packet = event.SerializeToString()
+        if len(packet) > MAX_PACKET:
+            packet = RESET
+        with self._lock:
+            if event.reset:
+                self._active = True
+            self._workers = [worker for worker in self._workers if self._send(worker, packet)]
+
+    def drop_all(self):
+        """Hang up on every worker; they may have missed events."""
+        with self._lock:
+            self._active = False
+            for worker in self._workers:
+                worker.close()
+            self._workers = []
+
+    def accept(self, listener):
+        while True:
+            worker, _ = listener.accept()
+            self.add(worker)
+
+    def follow(self, stub, retry_interval=5):
+        while True:
+            try:
+                for event in stub.SubscribeInvalidations(InvalidationRequest()):
+                    self.publish(event)
+            except grpc.RpcError as e:
+                print(f"Invalidation stream lost: {e}")
+            self.drop_all()
+            time.sleep(retry_interval)
+
+def relayed_events(path):
+    """Yield the events the relay at path sends this worker, until it hangs up."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_SEQPACKET) as conn:
+        conn.connect(path)
+        while True:
+            packet = conn.recv(MAX_PACKET)
+            if not packet:
+                return
+            yield InvalidationEvent.FromString(packet)
+
+def listen(path):
+    if os.path.exists(path):
+        os.unlink(path)
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+    listener.bind(path)
+    listener.listen()
+    return listener
+
+def main(path):
+    master = os.getppid()
+    relay = Relay()
+    threading.Thread(target=relay.accept, args=(listen(path),), daemon=True).start()
+    stub = DataAccessServiceStub(grpc.insecure_channel(DATA_ACCESS_TARGET))
+    threading.Thread(target=relay.follow, args=(stub,), daemon=True).start()
+    # Exit with the gunicorn master, even if it is killed.
+    while os.getppid() == master:
+        time.sleep(1)
+
+if __name__ == "__main__":
+    main(sys.argv[1])
@@ -0,0 +1,113 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class _Flight:
+    """A load in progress; concurrent misses on the same key wait on it."""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class ResponseCache:
+    """Thread-safe read-through cache with per-entry TTL and LRU eviction.
+
+    Concurrent misses for the same key are coalesced: the first caller runs
+    the loader, the others block until it finishes and share its result (or
+    its exception). Only values accepted by `cacheable` are stored.
+
+    Entries can carry tags for `invalidate`. A load that overlaps an
+    `invalidate` or `clear` is returned to its callers but not stored, since
+    it may have read the data the invalidation was about.
+    """
+
+    def __init__(self, max_entries=256, clock=time.monotonic):
+        self.max_entries = max_entries
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (expires_at, value, tags)
+        self._inflight = {}
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get_or_load(self, key, ttl, loader, cacheable=lambda value: True, tags=()):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > self._clock():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                del self._entries[key]
+
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = _Flight()
+                generation = self._generation
+                self.misses += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            flight.event.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = loader()
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+                if (flight.error is None and ttl > 0 and generation == self._generation
+                        and cacheable(flight.value)):
+                    self._store(key, ttl, flight.value, tuple(tags))
+            flight.event.set()
+        return flight.value
+
+    def _store(self, key, ttl, value, tags):
+        self._entries[key] = (self._clock() + ttl, value, tags)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, affected):
+        """Drop every entry with a tag for which `affected(tag)` is true."""
+        with self._lock:
+            self._generation += 1
+            stale = [key for key, entry in self._entries.items() if any(affected(tag) for tag in entry[2])]
+            for key in stale:
+                del self._entries[key]
+            self.invalidations += len(stale)
+            return len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses + self.coalesced
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "hit_ratio": (self.hits + self.coalesced) / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,119 @@
+import json
+from json.encoder import encode_basestring_ascii
+from operator import attrgetter
+
+from google.protobuf.descriptor import FieldDescriptor
+
+# Plain values are encoded the way Flask 2.2's jsonify does outside debug
+# mode: sorted keys, ASCII only, no whitespace.
+_encode_plain = json.JSONEncoder(ensure_ascii=True, separators=(",", ":"), sort_keys=True).encode
+
+
+_BOOLS = {True: "true", False: "false"}
+# float.__repr__ spellings that json.dumps (allow_nan=True) writes differently.
+_SPECIAL_FLOATS = {"nan": "NaN", "inf": "Infinity", "-inf": "-Infinity"}
+
+
+# Column encoders: an iterable of field values in, an iterable of JSON
+# texts out. Each is a map() over a C function, so no Python code runs
+# per value.
+def encode_strings(values):
+    return map(encode_basestring_ascii, values)
+
+
+def encode_bools(values):
+    return map(_BOOLS.__getitem__, values)
+
+
+def encode_ints(values):
+    return map(int.__repr__, values)
+
+
+def encode_floats(values):
+    reprs = list(map(float.__repr__, values))
+    return map(_SPECIAL_FLOATS.get, reprs, reprs)
+
+
+_ENCODERS = {
+    FieldDescriptor.TYPE_STRING: encode_strings,
+    FieldDescriptor.TYPE_BOOL: encode_bools,
+    FieldDescriptor.TYPE_FLOAT: encode_floats,
+    FieldDescriptor.TYPE_DOUBLE: encode_floats,
+    **{
+        field_type: encode_ints
+        for field_type in (
+            FieldDescriptor.TYPE_INT32, FieldDescriptor.TYPE_INT64,
+            FieldDescriptor.TYPE_UINT32, FieldDescriptor.TYPE_UINT64,
+            FieldDescriptor.TYPE_SINT32, FieldDescriptor.TYPE_SINT64,
+            FieldDescriptor.TYPE_FIXED32, FieldDescriptor.TYPE_FIXED64,
+            FieldDescriptor.TYPE_SFIXED32, FieldDescriptor.TYPE_SFIXED64,
+            FieldDescriptor.TYPE_ENUM,
+        )
+    },
+}
+
+
+class Fragment(str):
+    """Text that is already JSON; json_body() inserts it unchanged."""
+
+
+def _field_encoder(descriptor, path):
+    *parents, name = path.split(".")
+    for parent in parents:
+        descriptor = descriptor.fields_by_name[parent].message_type
+    field = descriptor.fields_by_name[name]
+    if field.label == FieldDescriptor.LABEL_REPEATED or field.type not in _ENCODERS:
+        raise ValueError(f"{path} is not a scalar field")
+    return _ENCODERS[field.type]
+
+
+class FieldPlan:
+    """Encodes messages of one type as JSON objects.
+
+    `fields` maps each JSON key to the message attribute holding its value,
+    dotted for nested messages ("job.title"). Everything that does not
+    depend on the messages is worked out once: the key order (sorted, as
+    jsonify does), a column encoder per field from its proto type, and a
+    %-template holding the escaped keys. A batch of messages is then
+    encoded column by column and the columns zipped into the template.
+    """
+
+    def __init__(self, message_class, fields):
+        if not fields:
+            raise ValueError("a FieldPlan needs at least one field")
+        items = sorted(fields.items())
+        descriptor = message_class.DESCRIPTOR
+        self.keys = tuple(key for key, _ in items)
+        self.paths = tuple(path for _, path in items)
+        self.encoders = tuple(_field_encoder(descriptor, path) for path in self.paths)
+        self.getters = tuple(attrgetter(path) for path in self.paths)
+        self.template = "{" + ",".join(encode_basestring_ascii(key).replace("%", "%%") + ":%s" for key in self.keys) + "}"
+
+    def encode_all(self, messages):
+        """Each message as a JSON object, in order."""
+        messages = list(messages)
+        columns = [encode(map(get, messages)) for encode, get in zip(self.encoders, self.getters)]
+        return list(map(self.template.__mod__, zip(*columns)))
+
+    def encode(self, message):
+        return self.encode_all([message])[0]
+
+    def array(self, messages):
+        """The messages as a JSON array, ready to go into json_body()."""
+        return Fragment("[" + ",".join(self.encode_all(messages)) + "]")
+
+    def object(self, message):
+        return Fragment(self.encode(message))
+
+
+def json_body(members):
+    """jsonify's response body for the object `members`, as bytes.
+
+    Values may be Fragments from a FieldPlan or plain JSON-serialisable
+    values.
+    """
+    parts = [
+        encode_basestring_ascii(key) + ":" + (value if isinstance(value, Fragment) else _encode_plain(value))
+        for key, value in sorted(members.items())
+    ]
+    return ("{" + ",".join(parts) + "}\n").encode("utf-8")
@@ -0,0 +1,42 @@
+import os
+import sys
+import tempfile
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SERVICE = os.path.dirname(HERE)
+MICROSERVICES = os.path.dirname(SERVICE)
+COMMON = os.path.join(MICROSERVICES, "common")
+PROTOS = [
+    os.path.join(MICROSERVICES, "data_access", "protobuf", "data-access.proto"),
+    os.path.join(MICROSERVICES, "job_postings", "protobuf", "jobpostings.proto"),
+    os.path.join(MICROSERVICES, "job_reviews", "protobuf", "jobreviews.proto"),
+]
+
+
+def generate_stubs():
+    """Compile the protos api_interface uses into a temp dir, as the Dockerfile does."""
+    out = tempfile.mkdtemp(prefix="api_interface_stubs_")
+    includes = [f"-I{os.path.dirname(proto)}" for proto in PROTOS]
+    status = protoc.main(["protoc", *includes, f"--python_out={out}", f"--grpc_python_out={out}", *PROTOS])
+    if status != 0:
+        raise RuntimeError("protoc failed on the api_interface protos")
+    return out
+
+
+collect_ignore = []
+try:
+    import grpc  # noqa: F401
+    from grpc_tools import protoc
+except ImportError:
+    # invalidation_relay and api_interface need the generated stubs.
+    collect_ignore += ["test_invalidation_relay.py", "test_streamed_routes.py"]
+else:
+    sys.path[:0] = [generate_stubs(), COMMON]
+
+try:
+    import flask  # noqa: F401
+    import grpc_interceptor  # noqa: F401
+    import prometheus_client  # noqa: F401
+except ImportError:
+    # api_interface cannot be imported without its service dependencies.
+    collect_ignore.append("test_streamed_routes.py")
@@ -0,0 +1,76 @@
+import os
+import sys
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import invalidation_relay
+from data_access_pb2 import InvalidationEvent
+
+
+@pytest.fixture
+def relay(tmp_path):
+    path = str(tmp_path / "relay.sock")
+    relay = invalidation_relay.Relay()
+    listener = invalidation_relay.listen(path)
+    threading.Thread(target=relay.accept, args=(listener,), daemon=True).start()
+    yield relay, path
+    relay.drop_all()
+    listener.close()
+
+
+def connect(relay, path):
+    """A worker's event iterator, once the relay has registered it."""
+    before = len(relay._workers)
+    events = invalidation_relay.relayed_events(path)
+    # The generator connects on its first next(); run that in a thread so
+    # we can wait for the relay to see it.
+    received = []
+    reader = threading.Thread(target=lambda: received.extend(events), daemon=True)
+    reader.start()
+    deadline = threading.Event()
+    while len(relay._workers) == before and not deadline.wait(0.01):
+        pass
+    return reader, received
+
+
+def test_events_reach_every_worker_until_the_relay_hangs_up(relay):
+    relay, path = relay
+    workers = [connect(relay, path) for _ in range(2)]
+
+    relay.publish(InvalidationEvent(reset=True))
+    relay.publish(InvalidationEvent(table="jobs", titles=["Engineer"]))
+    relay.drop_all()
+
+    for reader, received in workers:
+        reader.join(timeout=5)
+        assert not reader.is_alive()
+        assert [(e.reset, e.table, list(e.titles)) for e in received] == [
+            (True, "", []), (False, "jobs", ["Engineer"]),
+        ]
+
+
+def test_workers_that_join_a_live_stream_start_with_a_reset(relay):
+    relay, path = relay
+    relay.publish(InvalidationEvent(reset=True))
+    relay.publish(InvalidationEvent(table="reviews"))
+
+    reader, received = connect(relay, path)
+    relay.publish(InvalidationEvent(table="jobs", titles=["Nurse"]))
+    relay.drop_all()
+    reader.join(timeout=5)
+
+    assert [(e.reset, e.table) for e in received] == [(True, ""), (False, "jobs")]
+
+
+def test_oversized_events_are_sent_as_a_reset(relay):
+    relay, path = relay
+    reader, received = connect(relay, path)
+
+    relay.publish(InvalidationEvent(table="jobs", titles=["x" * 1000] * 100))
+    relay.drop_all()
+    reader.join(timeout=5)
+
+    assert [e.reset for e in received] == [True]
@@ -0,0 +1,102 @@
+import os
+import sys
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from response_cache import ResponseCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_hit_until_ttl_expires():
+    clock = FakeClock()
+    cache = ResponseCache(clock=clock)
+    calls = []
+
+    def load():
+        calls.append(1)
+        return len(calls)
+
+    assert cache.get_or_load("a", 10, load) == 1
+    assert cache.get_or_load("a", 10, load) == 1
+    clock.now = 11
+    assert cache.get_or_load("a", 10, load) == 2
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 2
+
+
+def test_lru_eviction():
+    cache = ResponseCache(max_entries=2)
+    cache.get_or_load("a", 10, lambda: "a")
+    cache.get_or_load("b", 10, lambda: "b")
+    cache.get_or_load("a", 10, lambda: "stale")  # touch a
+    cache.get_or_load("c", 10, lambda: "c")      # evicts b
+    assert cache.get_or_load("a", 10, lambda: "new") == "a"
+    assert cache.get_or_load("b", 10, lambda: "new") == "new"
+    assert cache.stats()["evictions"] == 2
+
+
+def test_uncacheable_values_are_not_stored():
+    cache = ResponseCache()
+    cache.get_or_load("a", 10, lambda: 500, cacheable=lambda v: v == 200)
+    assert cache.get_or_load("a", 10, lambda: 200, cacheable=lambda v: v == 200) == 200
+    assert cache.stats()["entries"] == 1
+
+
+def test_concurrent_misses_share_one_load():
+    cache = ResponseCache()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+    results = []
+
+    def load():
+        calls.append(1)
+        started.set()
+        release.wait()
+        return "value"
+
+    def worker():
+        results.append(cache.get_or_load("a", 10, load))
+
+    leader = threading.Thread(target=worker)
+    leader.start()
+    started.wait()
+    followers = [threading.Thread(target=worker) for _ in range(4)]
+    for t in followers:
+        t.start()
+    while cache.stats()["coalesced"] < 4:
+        pass
+    release.set()
+    for t in [leader] + followers:
+        t.join()
+
+    assert calls == [1]
+    assert results == ["value"] * 5
+
+
+def test_invalidate_by_tag():
+    cache = ResponseCache()
+    cache.get_or_load("salary", 10, lambda: 1, tags=[("job-title", "Engineer")])
+    cache.get_or_load("cities", 10, lambda: 2, tags=[("reviews",)])
+    assert cache.invalidate(lambda tag: tag == ("reviews",)) == 1
+    assert cache.get_or_load("salary", 10, lambda: "reloaded") == 1
+    assert cache.get_or_load("cities", 10, lambda: "reloaded") == "reloaded"
+
+
+def test_load_overlapping_invalidation_is_not_stored():
+    cache = ResponseCache()
+
+    def load():
+        cache.invalidate(lambda tag: True)
+        return "maybe stale"
+
+    assert cache.get_or_load("a", 10, load) == "maybe stale"
+    assert cache.stats()["entries"] == 0
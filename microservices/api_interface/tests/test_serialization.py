@@ -0,0 +1,109 @@
+import json
+import math
+import os
+import sys
+
+import pytest
+
+pytest.importorskip("google.protobuf")
+
+from google.protobuf import descriptor_pb2, descriptor_pool, message_factory
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from serialization import FieldPlan, Fragment, json_body
+
+FieldProto = descriptor_pb2.FieldDescriptorProto
+
+
+def message_classes():
+    """A Job message and a JobWithRating wrapping it, built without protoc."""
+    file = descriptor_pb2.FileDescriptorProto(name="serialization_test.proto", package="serialization_test", syntax="proto3")
+    job = file.message_type.add(name="Job")
+    for number, (name, field_type) in enumerate([
+        ("id", FieldProto.TYPE_STRING),
+        ("title", FieldProto.TYPE_STRING),
+        ("salary", FieldProto.TYPE_INT32),
+        ("views", FieldProto.TYPE_INT64),
+        ("company_id", FieldProto.TYPE_FLOAT),
+        ("med_salary", FieldProto.TYPE_DOUBLE),
+        ("remote_allowed", FieldProto.TYPE_BOOL),
+    ], start=1):
+        job.field.add(name=name, number=number, type=field_type, label=FieldProto.LABEL_OPTIONAL)
+    job.field.add(name="tags", number=8, type=FieldProto.TYPE_STRING, label=FieldProto.LABEL_REPEATED)
+
+    wrapper = file.message_type.add(name="JobWithRating")
+    wrapper.field.add(name="rating", number=1, type=FieldProto.TYPE_INT32, label=FieldProto.LABEL_OPTIONAL)
+    wrapper.field.add(name="job", number=2, type=FieldProto.TYPE_MESSAGE, label=FieldProto.LABEL_OPTIONAL,
+                      type_name=".serialization_test.Job")
+
+    pool = descriptor_pool.DescriptorPool()
+    pool.Add(file)
+    return (
+        message_factory.GetMessageClass(pool.FindMessageTypeByName("serialization_test.Job")),
+        message_factory.GetMessageClass(pool.FindMessageTypeByName("serialization_test.JobWithRating")),
+    )
+
+
+Job, JobWithRating = message_classes()
+
+JOB_FIELDS = {
+    "id": "id",
+    "title": "title",
+    "salary": "salary",
+    "views": "views",
+    "company_id": "company_id",
+    "med_salary": "med_salary",
+    "remote_allowed": "remote_allowed",
+}
+
+
+def jsonify_body(value):
+    # What Flask 2.2's jsonify returns outside debug mode.
+    return (json.dumps(value, sort_keys=True, ensure_ascii=True, separators=(",", ":")) + "\n").encode("utf-8")
+
+
+def test_matches_jsonify_of_the_equivalent_dicts():
+    jobs = [
+        Job(id="1", title='Café "Barista" 100% \\ \n ', salary=-3, views=2**40, company_id=0.1,
+            med_salary=1e300, remote_allowed=True),
+        Job(id="2", title="", med_salary=math.nan),
+        Job(id="3", company_id=math.inf, med_salary=-math.inf),
+        Job(title="\U0001F600 emoji"),
+    ]
+    plan = FieldPlan(Job, JOB_FIELDS)
+
+    body = json_body({"jobs": plan.array(jobs), "next_page_token": None, "approximate_total": 4})
+
+    dicts = [{key: getattr(job, attribute) for key, attribute in JOB_FIELDS.items()} for job in jobs]
+    assert body == jsonify_body({"jobs": dicts, "next_page_token": None, "approximate_total": 4})
+
+
+def test_nested_fields_and_renamed_keys():
+    plan = FieldPlan(JobWithRating, {"rating": "rating", "job_title": "job.title", "%s": "job.salary"})
+    message = JobWithRating(rating=4, job=Job(title="Engineer", salary=10))
+
+    assert plan.encode(message) == '{"%s":10,"job_title":"Engineer","rating":4}'
+    assert json_body({"job": plan.object(message)}) == jsonify_body({
+        "job": {"rating": 4, "job_title": "Engineer", "%s": 10}
+    })
+
+
+def test_single_field_and_empty_input():
+    assert FieldPlan(Job, {"title": "title"}).encode(Job(title="x")) == '{"title":"x"}'
+    assert FieldPlan(Job, JOB_FIELDS).array([]) == "[]"
+    with pytest.raises(ValueError):
+        FieldPlan(Job, {})
+
+
+def test_rejects_non_scalar_fields():
+    with pytest.raises(ValueError):
+        FieldPlan(Job, {"tags": "tags"})
+    with pytest.raises(ValueError):
+        FieldPlan(JobWithRating, {"job": "job"})
+
+
+def test_json_body_encodes_plain_values_like_jsonify():
+    members = {"b": [1, 2.5, "é"], "a": {"z": 1, "y": None}, "c": Fragment("[true]")}
+
+    assert json_body(members) == jsonify_body({"b": [1, 2.5, "é"], "a": {"z": 1, "y": None}, "c": [True]})
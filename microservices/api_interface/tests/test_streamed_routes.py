@@ -0,0 +1,66 @@
+import json
+import os
+import sys
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import api_interface
+from jobpostings_pb2 import JobForLargestCompany, JobPostingsForLargestCompaniesResponse
+
+
+def chunk(*titles):
+    return JobPostingsForLargestCompaniesResponse(job=[
+        JobForLargestCompany(company="Acme", title=title, company_id=7) for title in titles
+    ])
+
+
+class GatedJobPostings:
+    """A job_postings stub whose stream sends one chunk, then waits to be released."""
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.finished = threading.Event()
+
+    def StreamJobPostingsForLargestCompanies(self, request):
+        yield chunk("Engineer")
+        self.release.wait(timeout=5)
+        yield chunk("Nurse", "Driver")
+        self.finished.set()
+
+
+@pytest.fixture
+def client(monkeypatch):
+    stub = GatedJobPostings()
+    monkeypatch.setattr(api_interface, "job_postings_client", stub)
+    # No invalidation thread; nothing here is cached.
+    monkeypatch.setattr(api_interface, "_follower_pid", os.getpid())
+    return api_interface.app.test_client(), stub
+
+
+@pytest.mark.parametrize("query, headers", [
+    ("?stream=true", {}),
+    ("", {"Accept": api_interface.NDJSON_MIMETYPE}),
+])
+def test_first_chunk_is_sent_before_the_upstream_stream_ends(client, query, headers):
+    client, stub = client
+    response = client.get(f"/jobs/search/jobs-in-biggest-companies{query}", headers=headers, buffered=False)
+    body = response.iter_encoded()
+
+    sent = b""
+    while b"Engineer" not in sent:
+        sent += next(body)
+    assert not stub.finished.is_set()
+
+    stub.release.set()
+    sent += b"".join(body)
+    response.close()
+
+    if query:
+        jobs = json.loads(sent)["jobs"]
+    else:
+        jobs = [json.loads(line) for line in sent.decode().splitlines()]
+    assert [job["title"] for job in jobs] == ["Engineer", "Nurse", "Driver"]
+    assert jobs[0]["company_id"] == 7
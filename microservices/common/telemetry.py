@@ -0,0 +1,370 @@
+"""Latency histograms and trace ids, shared by the four services.
+
+Each image copies this module next to its service. A server interceptor
+times every gRPC call a service handles, a client interceptor every call
+it makes, and api_interface times its routes with Flask hooks. While a
+call or request is handled, the time spent in the database (stage("db"))
+and in downstream gRPC calls is added up, and when it finishes the split
+is recorded as db / downstream / local, local being the rest: building
+protos from rows, JSON encoding, waiting for a pool slot.
+
+A trace id travels in the x-trace-id gRPC metadata. api_interface takes
+it from the X-Trace-Id header or makes one up and returns it in the
+response; every hop passes it on. Calls slower than SLOW_REQUEST_SECONDS
+are logged with their trace id and split, so one request can be followed
+through the services' logs.
+
+The metrics are exposed in the Prometheus text format, by
+start_metrics_server() on METRICS_PORT in the gRPC services and by the
+/metrics route in api_interface.
+"""
+import contextvars, os, re, threading, time, uuid
+from collections import namedtuple
+from collections.abc import Iterator
+
+import grpc
+from grpc_interceptor import AsyncServerInterceptor, ServerInterceptor
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Histogram, generate_latest, start_http_server
+from prometheus_client import multiprocess
+
+TRACE_HEADER = "X-Trace-Id"
+TRACE_METADATA_KEY = "x-trace-id"
+# Incoming ids are passed on as gRPC metadata, so only plain tokens are kept.
+_TRACE_ID = re.compile(r"[0-9A-Za-z._-]{1,64}")
+
+METRICS_PORT = int(os.getenv("METRICS_PORT", 9100))
+# 0 turns the slow request log off.
+SLOW_REQUEST_SECONDS = float(os.getenv("SLOW_REQUEST_SECONDS", 0))
+
+# 1 ms up to the API's 170 s request timeout.
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 170.0)
+
+SERVER_SECONDS = Histogram(
+    "grpc_server_handling_seconds", "Time to handle a gRPC call, up to its last response message.",
+    ["service", "method", "code"], buckets=BUCKETS,
+)
+CLIENT_SECONDS = Histogram(
+    "grpc_client_handling_seconds", "Time from starting an outgoing gRPC call until it completes.",
+    ["service", "method", "code"], buckets=BUCKETS,
+)
+HTTP_SECONDS = Histogram(
+    "http_request_duration_seconds", "Time to serve an HTTP request, including streaming its body.",
+    ["service", "route", "method", "status"], buckets=BUCKETS,
+)
+STAGE_SECONDS = Histogram(
+    "request_stage_seconds", "Time a call or request spent in each stage: db, downstream or local.",
+    ["service", "handler", "stage"], buckets=BUCKETS,
+)
+
+service_name = "unknown"
+
+def set_service(name):
+    """Name this process's service in the `service` label."""
+    global service_name
+    service_name = name
+
+def new_trace_id():
+    return uuid.uuid4().hex
+
+def valid_trace_id(value):
+    return value if value and _TRACE_ID.fullmatch(value) else None
+
+class Request:
+    """Timings of the call or request being handled."""
+
+    def __init__(self, handler, trace_id):
+        self.handler = handler
+        self.trace_id = trace_id
+        self.started = time.perf_counter()
+        self.stages = {"db": 0.0, "downstream": 0.0}
+        # Calls fanned out to a thread pool add to the same request.
+        self._lock = threading.Lock()
+
+    def add(self, stage, seconds):
+        with self._lock:
+            self.stages[stage] += seconds
+
+    def finish(self):
+        """Record the stage split and return the total time."""
+        total = time.perf_counter() - self.started
+        with self._lock:
+            stages = dict(self.stages)
+        # Concurrent downstream calls overlap, so together they can take
+        # longer than the request.
+        stages["local"] = max(total - sum(stages.values()), 0.0)
+        for stage, seconds in stages.items():
+            STAGE_SECONDS.labels(service_name, self.handler, stage).observe(seconds)
+        if SLOW_REQUEST_SECONDS and total >= SLOW_REQUEST_SECONDS:
+            split = " ".join(f"{stage}={seconds * 1000:.1f}ms" for stage, seconds in stages.items())
+            print(f"Slow {self.handler}: trace={self.trace_id} total={total * 1000:.1f}ms {split}")
+        return total
+
+_current = contextvars.ContextVar("telemetry_request", default=None)
+
+def begin(handler, trace_id=None):
+    """Start timing `handler` as the current request of this thread or task."""
+    request = Request(handler, valid_trace_id(trace_id) or new_trace_id())
+    _current.set(request)
+    return request
+
+def end(request):
+    """Record `request` and return its total time."""
+    _current.set(None)
+    return request.finish()
+
+def end_http(request, method, status):
+    """Record an HTTP request, begun with its route as the handler."""
+    total = end(request)
+    HTTP_SECONDS.labels(service_name, request.handler, method, str(status)).observe(total)
+
+def current_request():
+    return _current.get()
+
+class stage:
+    """Adds the time spent in the with block to a stage of the current request."""
+
+    __slots__ = ("name", "request", "started")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.request = _current.get()
+        self.started = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        if self.request is not None:
+            self.request.add(self.name, time.perf_counter() - self.started)
+
+def in_context(fn):
+    """fn, run in the caller's context from whichever thread calls it.
+
+    Threads start with an empty context; wrap functions handed to a thread
+    pool so their downstream calls count towards the current request and
+    carry its trace id.
+    """
+    context = contextvars.copy_context()
+    def run(*args, **kwargs):
+        # A context can only be entered by one thread at a time.
+        return context.copy().run(fn, *args, **kwargs)
+    return run
+
+_STATUS_NAMES = {code.value[0]: code.name for code in grpc.StatusCode}
+
+def status_name(code):
+    if code is None:
+        return "OK"
+    if isinstance(code, grpc.StatusCode):
+        return code.name
+    return _STATUS_NAMES.get(code, str(code))
+
+def short_method(full_name):
+    """"/package.Service/Method" -> "Method"."""
+    if isinstance(full_name, bytes):
+        # grpc.aio client call details
+        full_name = full_name.decode()
+    return full_name.rsplit("/", 1)[-1]
+
+def incoming_trace_id(context):
+    for key, value in context.invocation_metadata() or ():
+        if key == TRACE_METADATA_KEY:
+            return value
+    return None
+
+def _call_status(context, failed):
+    code = context.code()
+    if code is None and failed:
+        return grpc.StatusCode.UNKNOWN
+    return code
+
+def _record_call(request, code):
+    total = end(request)
+    SERVER_SECONDS.labels(service_name, request.handler, status_name(code)).observe(total)
+
+class ServerMetricsInterceptor(ServerInterceptor):
+    """Times each call and makes it the current request.
+
+    Put it first in the interceptor list so the status it records is the
+    one the others set. Streaming calls are timed to their last message.
+    """
+
+    def intercept(self, method, request_or_iterator, context, method_name):
+        request = begin(short_method(method_name), incoming_trace_id(context))
+        try:
+            response = method(request_or_iterator, context)
+        except BaseException:
+            _record_call(request, _call_status(context, True))
+            raise
+        if isinstance(response, Iterator):
+            return self._stream(request, response, context)
+        _record_call(request, _call_status(context, False))
+        return response
+
+    def _stream(self, request, responses, context):
+        # The handler runs as gRPC iterates, after intercept() returned.
+        _current.set(request)
+        failed = True
+        try:
+            yield from responses
+            failed = False
+        finally:
+            _record_call(request, _call_status(context, failed))
+
+class AsyncServerMetricsInterceptor(AsyncServerInterceptor):
+    """ServerMetricsInterceptor for grpc.aio servers."""
+
+    async def intercept(self, method, request_or_iterator, context, method_name):
+        request = begin(short_method(method_name), incoming_trace_id(context))
+        try:
+            response = method(request_or_iterator, context)
+            if not hasattr(response, "__aiter__"):
+                response = await response
+                _record_call(request, _call_status(context, False))
+                return response
+        except BaseException:
+            _record_call(request, _call_status(context, True))
+            raise
+        return self._stream(request, response, context)
+
+    async def _stream(self, request, responses, context):
+        _current.set(request)
+        failed = True
+        try:
+            async for response in responses:
+                yield response
+            failed = False
+        finally:
+            _record_call(request, _call_status(context, failed))
+
+class _OutgoingCall:
+    """Times one outgoing call and adds it to the current request's downstream stage."""
+
+    def __init__(self, method):
+        self.method = short_method(method)
+        self.request = _current.get()
+        self.started = time.perf_counter()
+
+    def metadata(self, metadata):
+        """`metadata` plus the current trace id, if there is one."""
+        metadata = list(metadata or ())
+        if self.request is not None:
+            metadata.append((TRACE_METADATA_KEY, self.request.trace_id))
+        return metadata
+
+    def done(self, code):
+        seconds = time.perf_counter() - self.started
+        CLIENT_SECONDS.labels(service_name, self.method, status_name(code)).observe(seconds)
+        if self.request is not None:
+            self.request.add("downstream", seconds)
+
+class _ClientCallDetails(
+    namedtuple(
+        "_ClientCallDetails", ("method", "timeout", "metadata", "credentials", "wait_for_ready", "compression")
+    ),
+    grpc.ClientCallDetails,
+):
+    pass
+
+class ClientMetricsInterceptor(
+    grpc.UnaryUnaryClientInterceptor,
+    grpc.UnaryStreamClientInterceptor,
+    grpc.StreamUnaryClientInterceptor,
+    grpc.StreamStreamClientInterceptor,
+):
+    """Passes the trace id on and times outgoing calls; see intercept_channel()."""
+
+    def _intercept(self, continuation, client_call_details, request_or_iterator):
+        outgoing = _OutgoingCall(client_call_details.method)
+        details = _ClientCallDetails(
+            client_call_details.method,
+            client_call_details.timeout,
+            outgoing.metadata(client_call_details.metadata),
+            client_call_details.credentials,
+            client_call_details.wait_for_ready,
+            client_call_details.compression,
+        )
+        call = continuation(details, request_or_iterator)
+        # Blocking unary calls come back finished, and take no callbacks.
+        if call.done() or not call.add_callback(lambda: outgoing.done(call.code())):
+            outgoing.done(call.code())
+        return call
+
+    intercept_unary_unary = _intercept
+    intercept_unary_stream = _intercept
+    intercept_stream_unary = _intercept
+    intercept_stream_stream = _intercept
+
+def intercept_channel(channel):
+    return grpc.intercept_channel(channel, ClientMetricsInterceptor())
+
+def _async_details(outgoing, client_call_details):
+    return client_call_details._replace(
+        metadata=grpc.aio.Metadata(*outgoing.metadata(client_call_details.metadata))
+    )
+
+async def _await_response(continuation, client_call_details, request_or_iterator):
+    outgoing = _OutgoingCall(client_call_details.method)
+    call = await continuation(_async_details(outgoing, client_call_details), request_or_iterator)
+    # aio only gives the status to a coroutine, so wait for the response
+    # here and hand it back instead of the call.
+    code = grpc.StatusCode.CANCELLED
+    try:
+        response = await call
+        code = grpc.StatusCode.OK
+        return response
+    except grpc.aio.AioRpcError as e:
+        code = e.code()
+        raise
+    finally:
+        outgoing.done(code)
+
+async def _stream_responses(outgoing, call):
+    code = grpc.StatusCode.CANCELLED
+    try:
+        async for response in call:
+            yield response
+        code = grpc.StatusCode.OK
+    except grpc.aio.AioRpcError as e:
+        code = e.code()
+        raise
+    finally:
+        outgoing.done(code)
+
+class _AsyncUnaryUnaryInterceptor(grpc.aio.UnaryUnaryClientInterceptor):
+    async def intercept_unary_unary(self, continuation, client_call_details, request):
+        return await _await_response(continuation, client_call_details, request)
+
+class _AsyncStreamUnaryInterceptor(grpc.aio.StreamUnaryClientInterceptor):
+    async def intercept_stream_unary(self, continuation, client_call_details, request_iterator):
+        return await _await_response(continuation, client_call_details, request_iterator)
+
+class _AsyncUnaryStreamInterceptor(grpc.aio.UnaryStreamClientInterceptor):
+    async def intercept_unary_stream(self, continuation, client_call_details, request):
+        outgoing = _OutgoingCall(client_call_details.method)
+        call = await continuation(_async_details(outgoing, client_call_details), request)
+        return _stream_responses(outgoing, call)
+
+def async_client_interceptors():
+    """ClientMetricsInterceptor for grpc.aio channels, as their interceptors= list.
+
+    aio files each interceptor under one call type only, hence one per type.
+    """
+    return [_AsyncUnaryUnaryInterceptor(), _AsyncStreamUnaryInterceptor(), _AsyncUnaryStreamInterceptor()]
+
+def metrics_exposition():
+    """This process's metrics in the Prometheus text format, and their content type.
+
+    Under PROMETHEUS_MULTIPROC_DIR (gunicorn workers) the values every
+    process wrote there are added up.
+    """
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+def start_metrics_server():
+    """Serve /metrics on METRICS_PORT from a daemon thread (0 disables it)."""
+    if METRICS_PORT:
+        start_http_server(METRICS_PORT)
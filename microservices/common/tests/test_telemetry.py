@@ -0,0 +1,188 @@
+import asyncio
+import os
+import sys
+import time
+from concurrent import futures
+
+import pytest
+
+grpc = pytest.importorskip("grpc")
+pytest.importorskip("grpc_interceptor")
+pytest.importorskip("prometheus_client")
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import telemetry
+from prometheus_client import REGISTRY
+
+SERVICE = "test.Echo"
+
+
+def identity(value):
+    return value
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+def stage_seconds(handler, stage):
+    return sample("request_stage_seconds_sum", service="telemetry_test", handler=handler, stage=stage)
+
+
+def echo_handlers(seen):
+    """Unary and streaming methods that report the trace id they saw."""
+
+    def unary(request, context):
+        seen.append(telemetry.current_request().trace_id)
+        with telemetry.stage("db"):
+            time.sleep(0.02)
+        return request
+
+    def stream(request, context):
+        seen.append(telemetry.current_request().trace_id)
+        for _ in range(3):
+            with telemetry.stage("db"):
+                time.sleep(0.01)
+            yield request
+
+    def failing(request, context):
+        context.abort(grpc.StatusCode.NOT_FOUND, "no such thing")
+
+    return grpc.method_handlers_generic_handler(SERVICE, {
+        "Unary": grpc.unary_unary_rpc_method_handler(unary, identity, identity),
+        "Stream": grpc.unary_stream_rpc_method_handler(stream, identity, identity),
+        "Failing": grpc.unary_unary_rpc_method_handler(failing, identity, identity),
+    })
+
+
+@pytest.fixture
+def server():
+    telemetry.set_service("telemetry_test")
+    seen = []
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=4), interceptors=[telemetry.ServerMetricsInterceptor()])
+    server.add_generic_rpc_handlers((echo_handlers(seen),))
+    port = server.add_insecure_port("127.0.0.1:0")
+    server.start()
+    channel = telemetry.intercept_channel(grpc.insecure_channel(f"127.0.0.1:{port}"))
+    yield channel, seen
+    channel.close()
+    server.stop(None)
+
+
+def test_trace_id_and_stages_of_a_downstream_call(server):
+    channel, seen = server
+    unary = channel.unary_unary(f"/{SERVICE}/Unary")
+    db_before = stage_seconds("Unary", "db")
+    calls_before = sample("grpc_server_handling_seconds_count", service="telemetry_test", method="Unary", code="OK")
+
+    request = telemetry.begin("caller", "trace-123")
+    assert unary(b"x") == b"x"
+    assert telemetry.end(request) >= 0.02
+
+    assert seen == ["trace-123"]
+    assert stage_seconds("Unary", "db") - db_before >= 0.02
+    assert sample("grpc_server_handling_seconds_count", service="telemetry_test", method="Unary", code="OK") == calls_before + 1
+    # The caller spent the call's time downstream.
+    assert stage_seconds("caller", "downstream") >= 0.02
+    assert sample("grpc_client_handling_seconds_count", service="telemetry_test", method="Unary", code="OK") >= 1
+
+
+def test_calls_without_a_trace_get_a_new_one(server):
+    channel, seen = server
+    channel.unary_unary(f"/{SERVICE}/Unary")(b"x")
+    channel.unary_unary(f"/{SERVICE}/Unary")(b"x")
+
+    assert len(seen) == 2 and seen[0] != seen[1]
+    assert all(telemetry.valid_trace_id(trace_id) for trace_id in seen)
+
+
+def test_streams_are_timed_to_their_last_message(server):
+    channel, seen = server
+    db_before = stage_seconds("Stream", "db")
+    count_before = sample("grpc_server_handling_seconds_count", service="telemetry_test", method="Stream", code="OK")
+
+    request = telemetry.begin("caller", "trace-stream")
+    assert list(channel.unary_stream(f"/{SERVICE}/Stream")(b"x")) == [b"x"] * 3
+    telemetry.end(request)
+
+    assert seen == ["trace-stream"]
+    assert stage_seconds("Stream", "db") - db_before >= 0.03
+    assert sample("grpc_server_handling_seconds_count", service="telemetry_test", method="Stream", code="OK") == count_before + 1
+
+
+def test_failed_calls_are_labelled_with_their_status(server):
+    channel, _ = server
+    with pytest.raises(grpc.RpcError):
+        channel.unary_unary(f"/{SERVICE}/Failing")(b"x")
+
+    assert sample("grpc_server_handling_seconds_count", service="telemetry_test", method="Failing", code="NOT_FOUND") >= 1
+    assert sample("grpc_client_handling_seconds_count", service="telemetry_test", method="Failing", code="NOT_FOUND") >= 1
+
+
+def test_in_context_carries_the_request_into_threads():
+    request = telemetry.begin("fan-out", "trace-pool")
+
+    def work(_):
+        with telemetry.stage("downstream"):
+            time.sleep(0.01)
+        return telemetry.current_request().trace_id
+
+    with futures.ThreadPoolExecutor(max_workers=2) as pool:
+        assert list(pool.map(telemetry.in_context(work), range(4))) == ["trace-pool"] * 4
+    telemetry.end(request)
+
+    assert request.stages["downstream"] >= 0.04
+
+
+def test_untrusted_trace_ids_are_replaced():
+    assert telemetry.begin("x", "ok-id_1.2").trace_id == "ok-id_1.2"
+    assert telemetry.begin("x", "bad\nid").trace_id != "bad\nid"
+    assert telemetry.begin("x", "a" * 65).trace_id != "a" * 65
+
+
+def test_async_server_and_client():
+    telemetry.set_service("telemetry_test")
+    seen = []
+
+    async def unary(request, context):
+        seen.append(telemetry.current_request().trace_id)
+        with telemetry.stage("db"):
+            await asyncio.sleep(0.02)
+        return request
+
+    async def stream(request, context):
+        seen.append(telemetry.current_request().trace_id)
+        for _ in range(2):
+            yield request
+
+    async def main():
+        server = grpc.aio.server(interceptors=[telemetry.AsyncServerMetricsInterceptor()])
+        server.add_generic_rpc_handlers((grpc.method_handlers_generic_handler("test.AsyncEcho", {
+            "Unary": grpc.unary_unary_rpc_method_handler(unary, identity, identity),
+            "Stream": grpc.unary_stream_rpc_method_handler(stream, identity, identity),
+        }),))
+        port = server.add_insecure_port("127.0.0.1:0")
+        await server.start()
+        async with grpc.aio.insecure_channel(f"127.0.0.1:{port}", interceptors=telemetry.async_client_interceptors()) as channel:
+            request = telemetry.begin("async-caller", "trace-aio")
+            assert await channel.unary_unary("/test.AsyncEcho/Unary")(b"x") == b"x"
+            assert [r async for r in channel.unary_stream("/test.AsyncEcho/Stream")(b"y")] == [b"y", b"y"]
+            telemetry.end(request)
+        await server.stop(None)
+        return request
+
+    db_before = stage_seconds("Unary", "db")
+    request = asyncio.run(main())
+
+    assert seen == ["trace-aio", "trace-aio"]
+    assert stage_seconds("Unary", "db") - db_before >= 0.02
+    assert request.stages["downstream"] >= 0.02
+    assert sample("grpc_server_handling_seconds_count", service="telemetry_test", method="Stream", code="OK") >= 1
+
+
+def test_exposition_is_prometheus_text():
+    body, content_type = telemetry.metrics_exposition()
+
+    assert content_type.startswith("text/plain")
+    assert b"# TYPE request_stage_seconds histogram" in body
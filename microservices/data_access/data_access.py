@@ -1,16 +1,65 @@
 #!/usr/bin/env python3
 import psycopg2
+import psycopg2.extensions
 import psycopg2.extras
 
-import random, os
+import base64, hashlib, io, json, os, queue, select, threading, time
+from collections import deque
 from concurrent import futures
+from functools import lru_cache
 import grpc
+import telemetry
 import data_access_pb2
 import data_access_pb2_grpc
 import data_access_pb2
 from grpc_interceptor import ExceptionToStatusInterceptor
-from grpc_interceptor.exceptions import NotFound
-from data_access_pb2 import Job, Review, JobForLargestCompany, BestCompany, BestPayingCompaniesResponse, DeleteReviewResponse, RemoteJobSearchResponse, JobForRemote, JobPostingsResponse, JobReviewsResponse, CompaniesResponse, UpdateJobReviewResponse, JobPostingsForLargestCompaniesResponse, CreateReviewResponse, PostJobResponse
+from grpc_interceptor.exceptions import InvalidArgument, NotFound
+from data_access_pb2 import Job, Review, JobForLargestCompany, BestCompany, BestPayingCompaniesResponse, DeleteReviewResponse, RemoteJobSearchResponse, JobForRemote, JobPostingsResponse, JobReviewsResponse, CompaniesResponse, UpdateJobReviewResponse, JobPostingsForLargestCompaniesResponse, CreateReviewResponse, PostJobResponse, CompanyRatingAggregate, CompanyRatingAggregatesResponse, CityRating, BestCitiesResponse, TitleAndCityRating, JobReviewRatingsResponse, JobSalaryStatsResponse, BulkBatchResult, BulkIngestResponse, InvalidationEvent
+
+telemetry.set_service("data_access")
+
+@lru_cache(maxsize=None)
+def timed_cursor(base):
+    """`base` with its round trips to the server counted as db time of the current call."""
+    class TimedCursor(base):
+        def execute(self, query, vars=None):
+            with telemetry.stage("db"):
+                return super().execute(query, vars)
+
+        def executemany(self, query, vars_list):
+            with telemetry.stage("db"):
+                return super().executemany(query, vars_list)
+
+        def fetchone(self):
+            with telemetry.stage("db"):
+                return super().fetchone()
+
+        def fetchmany(self, *args, **kwargs):
+            with telemetry.stage("db"):
+                return super().fetchmany(*args, **kwargs)
+
+        def fetchall(self):
+            with telemetry.stage("db"):
+                return super().fetchall()
+
+        def copy_expert(self, *args, **kwargs):
+            with telemetry.stage("db"):
+                return super().copy_expert(*args, **kwargs)
+
+    TimedCursor.__name__ = f"Timed{base.__name__}"
+    return TimedCursor
+
+class TimedConnection(psycopg2.extensions.connection):
+    """A connection whose cursors, of any cursor_factory, are timed (timed_cursor).
+
+    Building messages from the rows is left to the handler, so it shows
+    up as local time.
+    """
+
+    def cursor(self, *args, **kwargs):
+        base = kwargs.get("cursor_factory") or self.cursor_factory or psycopg2.extensions.cursor
+        kwargs["cursor_factory"] = timed_cursor(base)
+        return super().cursor(*args, **kwargs)
 
 def get_db_connection():
     try:
@@ -32,7 +81,8 @@ def get_db_connection():
             user=db_user,
             password=db_password,
             host=db_host,
-            port=db_port_int
+            port=db_port_int,
+            connection_factory=TimedConnection
         )
         return conn
     except Exception as e:
@@ -42,46 +92,986 @@ def get_db_connection():
         # be handled by the interceptor.
         raise # Re-raise the exception
 
+# Number of gRPC worker threads; the connection pool is sized to match so a
+# handler never waits for a connection while another worker sits idle.
+MAX_WORKERS = 10
+
+# SubscribeInvalidations streams are served from their own server on
+# INVALIDATION_PORT, with up to MAX_SUBSCRIBERS of them at once.
+INVALIDATION_PORT = int(os.environ.get("INVALIDATION_PORT", 50052))
+MAX_SUBSCRIBERS = int(os.environ.get("MAX_INVALIDATION_SUBSCRIBERS", 32))
+
+class ConnectionPool:
+    """Thread-safe pool of psycopg2 connections shared by the gRPC workers.
+
+    Connections are opened lazily up to `size`. On checkout a connection is
+    checked (and pinged with SELECT 1 if it sat idle longer than
+    `check_interval` seconds); broken connections are closed and replaced.
+    """
+
+    def __init__(self, connect, size, check_interval=30.0):
+        self._connect = connect
+        self._size = size
+        self._check_interval = check_interval
+        self._idle = deque() # (connection, time it was returned)
+        self._opened = 0
+        self._cond = threading.Condition()
+
+        # Stats
+        self._checkouts = 0
+        self._wait_time = 0.0
+        self._in_use = 0
+        self._recycled = 0
+
+    def getconn(self):
+        started = time.monotonic()
+        with self._cond:
+            while not self._idle and self._opened >= self._size:
+                self._cond.wait()
+            if self._idle:
+                conn, returned_at = self._idle.pop()
+            else:
+                # Reserve a slot; the connection is opened outside the lock.
+                conn, returned_at = None, None
+                self._opened += 1
+            self._in_use += 1
+            self._checkouts += 1
+            self._wait_time += time.monotonic() - started
+
+        try:
+            if conn is None:
+                conn = self._connect()
+            elif not self._is_usable(conn, returned_at):
+                conn = self._recycle(conn)
+        except Exception:
+            with self._cond:
+                self._opened -= 1
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+        return conn
+
+    def putconn(self, conn):
+        broken = bool(conn.closed)
+        if not broken:
+            try:
+                # Never hand out a connection with an open transaction.
+                if conn.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+            except psycopg2.Error:
+                broken = True
+
+        if broken:
+            self._close_quietly(conn)
+
+        with self._cond:
+            self._in_use -= 1
+            if broken:
+                self._opened -= 1
+                self._recycled += 1
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    def stats(self):
+        with self._cond:
+            return {
+                "size": self._size,
+                "opened": self._opened,
+                "idle": len(self._idle),
+                "in_use": self._in_use,
+                "checkouts": self._checkouts,
+                "wait_time_seconds": self._wait_time,
+                "recycled": self._recycled,
+            }
+
+    def _is_usable(self, conn, returned_at):
+        if conn.closed or conn.get_transaction_status() == psycopg2.extensions.TRANSACTION_STATUS_UNKNOWN:
+            return False
+        if time.monotonic() - returned_at < self._check_interval:
+            return True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _recycle(self, conn):
+        self._close_quietly(conn)
+        with self._cond:
+            self._recycled += 1
+        return self._connect()
+
+    @staticmethod
+    def _close_quietly(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+db_pool = ConnectionPool(
+    get_db_connection,
+    size=int(os.environ.get("DB_POOL_SIZE", MAX_WORKERS)),
+    check_interval=float(os.environ.get("DB_POOL_CHECK_INTERVAL", 30)),
+)
+
+def log_pool_stats(interval):
+    while True:
+        time.sleep(interval)
+        print(f"DB pool stats: {db_pool.stats()}")
+
+# Writes announce the keys they touched on this channel with pg_notify.
+# NOTIFY is transactional, so listeners only hear about committed writes.
+INVALIDATION_CHANNEL = "data_changes"
+# Postgres caps NOTIFY payloads at 8000 bytes; larger events collapse to
+# a table-wide one.
+INVALIDATION_PAYLOAD_LIMIT = 7900
+
+NOTIFY_SQL = "SELECT pg_notify(%s, %s)"
+
+def invalidation_payload(table, firms=(), locations=(), titles=(), review_ids=(), origin=""):
+    payload = json.dumps({
+        "table": table,
+        "firms": sorted({f for f in firms if f}),
+        "locations": sorted({l for l in locations if l}),
+        "titles": sorted({t for t in titles if t}),
+        "review_ids": sorted(set(review_ids)),
+        "origin": origin,
+    })
+    if len(payload.encode()) > INVALIDATION_PAYLOAD_LIMIT:
+        payload = json.dumps({"table": table, "reset": True})
+    return payload
+
+def invalidation_event(payload):
+    return InvalidationEvent(**json.loads(payload))
+
+def review_change_keys(rows):
+    return {
+        "firms": [row["firm"] for row in rows],
+        "locations": [row["location"] for row in rows],
+        "titles": [row["job_title"] for row in rows],
+        # Bulk-loaded rows have no id here; their event lists none.
+        "review_ids": [row["id"] for row in rows if row.get("id") is not None],
+    }
+
+def write_origin(context):
+    """The caller's "origin" metadata, echoed in the write's invalidation event.
+
+    A subscriber that applies its own writes locally sends it so it can
+    recognise (and skip) the events they cause.
+    """
+    for key, value in context.invocation_metadata():
+        if key == "origin":
+            return value
+    return ""
+
+def notify_change(cursor, table, **keys):
+    """Queue an invalidation event; it is delivered when the transaction commits."""
+    cursor.execute(NOTIFY_SQL, (INVALIDATION_CHANNEL, invalidation_payload(table, **keys)))
+
+def notify_review_change(cursor, rows, origin=""):
+    notify_change(cursor, "reviews", origin=origin, **review_change_keys(rows))
+
+class InvalidationHub:
+    """Relays NOTIFY events from one LISTEN connection to every subscriber.
+
+    Each subscriber gets a bounded queue. A subscriber that falls behind
+    has its backlog replaced by a single reset event instead of blocking
+    the listener.
+    """
+
+    def __init__(self, connect, queue_size=1000):
+        self._connect = connect
+        self._queue_size = queue_size
+        self._lock = threading.Lock()
+        self._subscribers = set()
+
+    def subscribe(self):
+        events = queue.Queue(maxsize=self._queue_size)
+        events.put(InvalidationEvent(reset=True))
+        with self._lock:
+            self._subscribers.add(events)
+        return events
+
+    def unsubscribe(self, events):
+        with self._lock:
+            self._subscribers.discard(events)
+
+    def publish(self, event):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for events in subscribers:
+            try:
+                events.put_nowait(event)
+            except queue.Full:
+                while True:
+                    try:
+                        events.get_nowait()
+                    except queue.Empty:
+                        break
+                events.put_nowait(InvalidationEvent(reset=True))
+
+    def listen(self, poll_interval=5.0, retry_interval=5.0):
+        """Forward notifications forever, reconnecting after errors."""
+        while True:
+            conn = None
+            try:
+                conn = self._connect()
+                conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+                with conn.cursor() as cursor:
+                    cursor.execute(f"LISTEN {INVALIDATION_CHANNEL}")
+                # Anything committed while we were not listening is lost.
+                self.publish(InvalidationEvent(reset=True))
+                while True:
+                    if select.select([conn], [], [], poll_interval) == ([], [], []):
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        notify = conn.notifies.pop(0)
+                        self.publish(invalidation_event(notify.payload))
+            except Exception as e:
+                print(f"Error listening for invalidations: {e}")
+                time.sleep(retry_interval)
+            finally:
+                if conn is not None:
+                    conn.close()
+
+invalidation_hub = InvalidationHub(get_db_connection)
+
+# Rating columns tracked per firm in company_rating_summary.
+COMPANY_RATING_COLUMNS = (
+    "overall_rating",
+    "work_life_balance",
+    "culture_values",
+    "diversity_inclusion",
+    "career_opp",
+)
+
+# Rating columns tracked per location in location_rating_summary.
+LOCATION_RATING_COLUMNS = COMPANY_RATING_COLUMNS + ("comp_benefits", "senior_mgmt")
+
+# Review columns the summary tables are derived from.
+REVIEW_SUMMARY_COLUMNS = ("firm", "location") + LOCATION_RATING_COLUMNS
+
+# Per-review rating used by CalculateRating: the mean of the non-zero
+# sub-ratings, each truncated to an integer. NULL if none are set.
+REVIEW_SUB_RATING_COLUMNS = (
+    "work_life_balance",
+    "culture_values",
+    "diversity_inclusion",
+    "career_opp",
+    "comp_benefits",
+    "senior_mgmt",
+)
+REVIEW_RATING_SQL = "({}) / NULLIF({}, 0)".format(
+    " + ".join(f"COALESCE(TRUNC(NULLIF({c}, 0)), 0)" for c in REVIEW_SUB_RATING_COLUMNS),
+    " + ".join(f"(NULLIF({c}, 0) IS NOT NULL)::int" for c in REVIEW_SUB_RATING_COLUMNS),
+)
+
+def rating_totals(rows, key, columns):
+    """Sum (row, sign) pairs into {key: [review_count, sum, count, sum, count, ...]}.
+
+    NULL ratings are left out of the per-column sums and counts but still
+    count towards review_count.
+    """
+    totals = {}
+    for row, sign in rows:
+        entry = totals.setdefault(row[key] or "", [0] * (1 + 2 * len(columns)))
+        entry[0] += sign
+        for i, column in enumerate(columns):
+            value = row[column]
+            if value is not None:
+                entry[1 + 2 * i] += sign * value
+                entry[2 + 2 * i] += sign
+    return totals
+
+# (table, key column, rating columns) of each rating summary table.
+RATING_SUMMARIES = (
+    ("company_rating_summary", "firm", COMPANY_RATING_COLUMNS),
+    ("location_rating_summary", "location", LOCATION_RATING_COLUMNS),
+)
+
+def rating_summary_sql(table, key, columns):
+    """Upsert (ending in VALUES %s, for execute_values) and cleanup statements."""
+    value_columns = ["review_count"]
+    for column in columns:
+        value_columns += [f"{column}_sum", f"{column}_count"]
+    assignments = ", ".join(f"{c} = s.{c} + EXCLUDED.{c}" for c in value_columns)
+    upsert = (
+        f"INSERT INTO {table} AS s ({key}, {', '.join(value_columns)}) VALUES %s "
+        f"ON CONFLICT ({key}) DO UPDATE SET {assignments}"
+    )
+    # Drop groups whose last review was removed.
+    cleanup = f"DELETE FROM {table} WHERE {key} = ANY(%s) AND review_count <= 0"
+    return upsert, cleanup
+
+def upsert_rating_summary(cursor, table, key, columns, totals):
+    """Add the deltas in `totals` to a rating summary table."""
+    if not totals:
+        return
+    upsert, cleanup = rating_summary_sql(table, key, columns)
+    # Upsert in key order so concurrent writers lock the summary rows in
+    # the same order and cannot deadlock on each other.
+    psycopg2.extras.execute_values(cursor, upsert, [(k, *v) for k, v in sorted(totals.items())])
+    cursor.execute(cleanup, (list(totals),))
+
+def update_rating_summaries(cursor, removed=(), added=()):
+    """Apply review writes to the rating summary tables.
+
+    `removed` and `added` are review rows (mappings with REVIEW_SUMMARY_COLUMNS) as they were before and after the write. Must run in the same
+    transaction as the write itself.
+    """
+    rows = [(row, -1) for row in removed] + [(row, 1) for row in added]
+    for table, key, columns in RATING_SUMMARIES:
+        upsert_rating_summary(cursor, table, key, columns, rating_totals(rows, key, columns))
+
+def job_for_largest_company_from_row(row):
+    return JobForLargestCompany(
+        company=row["company"],
+        title=row["title"],
+        description=row["description"],
+        location=row["location"],
+        company_id=int(row["company_id"]) if row["company_id"] is not None else 0,
+        med_salary=float(row["med_salary"]) if row["med_salary"] is not None else 0.0
+    )
+
+# Field masks. Each spec maps the proto fields an RPC can return to a
+# converter for the value of the column of the same name; a request's
+# `fields` picks which of them are selected and set. Rows come from plain
+# tuple cursors in projection order.
+
+def as_is(value):
+    return value
+
+def value_or(default):
+    return lambda value: default if value is None else value
+
+JOB_FIELDS = {
+    "job_id": as_is,
+    "company": as_is,
+    "title": as_is,
+    "description": as_is,
+    "max_salary": value_or(0.0),
+    "pay_period": as_is,
+    "location": as_is,
+    "company_id": value_or(0),
+    "views": value_or(0.0),
+    "med_salary": value_or(0.0),
+    "min_salary": value_or(0.0),
+    "formatted_work_type": as_is,
+    "remote_allowed": as_is,
+    "job_posting_url": as_is,
+    "aplication_url": as_is,
+    "application_type": as_is,
+    "formatted_experience_level": as_is,
+    "skills_desc": as_is,
+    "posting_domain": as_is,
+    "sponsored": as_is,
+    "work_type": as_is,
+    "currency": as_is,
+    "normalized_salary": value_or(0.0),
+    "zip_code": value_or(0.0),
+}
+
+REVIEW_FIELDS = {
+    "id": as_is,
+    "firm": as_is,
+    "job_title": as_is,
+    "current": as_is,
+    "location": as_is,
+    "overall_rating": value_or(0),
+    "work_life_balance": value_or(0.0),
+    "culture_values": value_or(0.0),
+    "diversity_inclusion": value_or(0.0),
+    "career_opp": value_or(0.0),
+    "comp_benefits": value_or(0.0),
+    "senior_mgmt": value_or(0.0),
+    "recommend": as_is,
+    "ceo_approv": as_is,
+    "outlook": as_is,
+    "headline": as_is,
+    "pros": as_is,
+    "cons": as_is,
+}
+
+COMPANY_FIELDS = {
+    "company_id": value_or(0),
+    "employee_count": value_or(0),
+    "follower_count": value_or(0),
+}
+
+# What the review page RPCs return when no fields are requested.
+COMPANY_REVIEW_DEFAULT_FIELDS = (
+    "id", "firm", "overall_rating", "work_life_balance", "culture_values",
+    "diversity_inclusion", "career_opp",
+)
+LOCATION_REVIEW_DEFAULT_FIELDS = (
+    "id", "location", "overall_rating", "work_life_balance", "culture_values",
+    "diversity_inclusion", "career_opp", "comp_benefits", "senior_mgmt",
+)
+
+def field_projection(spec, fields, default=None, required=()):
+    """(field, converter) pairs for a field mask, `required` fields first.
+
+    An empty mask selects `default`, or every field in `spec`. Raises
+    InvalidArgument for fields that are not in `spec`.
+    """
+    names = list(fields) or list(default or spec)
+    unknown = [name for name in names if name not in spec]
+    if unknown:
+        raise InvalidArgument(f"Unknown fields: {', '.join(unknown)}")
+    return tuple((name, spec[name]) for name in dict.fromkeys([*required, *names]))
+
+def select_list(projection):
+    return ", ".join(name for name, _ in projection)
+
+def message_from_tuple(message, projection, row):
+    return message(**{name: convert(value) for (name, convert), value in zip(projection, row)})
+
+def remote_job_from_row(row):
+    return JobForRemote(
+        id=row["job_id"],
+        title=row["title"] or "",
+        company=row["company"] or "",
+        description=row["description"] or "",
+        location=row["location"] or "",
+        remote_allowed=bool(row["remote_allowed"])
+    )
+
+def best_company_from_row(row):
+    return BestCompany(
+        company_name=row["company"],
+        average_salary=row["average_salary"]
+    )
+
+def job_salary_stats_from_row(row):
+    stats = JobSalaryStatsResponse(
+        average_salary=float(row["average_salary"] or 0),
+        count=row["count"]
+    )
+    # percentile_cont gives NULL when no job has a salary.
+    if "percentiles" in row.keys() and row["percentiles"] is not None:
+        stats.p25, stats.p50, stats.p75 = row["percentiles"]
+    return stats
+
+def company_rating_aggregate_from_row(row):
+    return CompanyRatingAggregate(
+        firm=row["firm"],
+        review_count=row["review_count"],
+        overall_rating_sum=row["overall_rating_sum"],
+        overall_rating_count=row["overall_rating_count"],
+        work_life_balance_sum=row["work_life_balance_sum"],
+        work_life_balance_count=row["work_life_balance_count"],
+        culture_values_sum=row["culture_values_sum"],
+        culture_values_count=row["culture_values_count"],
+        diversity_inclusion_sum=row["diversity_inclusion_sum"],
+        diversity_inclusion_count=row["diversity_inclusion_count"],
+        career_opp_sum=row["career_opp_sum"],
+        career_opp_count=row["career_opp_count"],
+    )
+
+def city_rating_from_row(row):
+    return CityRating(
+        city=row["location"],
+        average_rating=row["average_rating"],
+        review_count=row["review_count"]
+    )
+
+def title_and_city_rating_from_row(row):
+    return TitleAndCityRating(
+        title=row["title"],
+        city=row["city"],
+        rating_sum=row["rating_sum"],
+        review_count=row["review_count"]
+    )
+
+def review_data_from_message(review):
+    """Column values for inserting a Review message; unset ratings become NULL."""
+    return {
+        "firm": review.firm or "",
+        "job_title": review.job_title or "",
+        "current": review.current or "",
+        "location": review.location or "",
+        "overall_rating": review.overall_rating or None,
+        "work_life_balance": review.work_life_balance or None,
+        "culture_values": review.culture_values or None,
+        "diversity_inclusion": review.diversity_inclusion or None,
+        "career_opp": review.career_opp or None,
+        "comp_benefits": review.comp_benefits or None,
+        "senior_mgmt": review.senior_mgmt or None,
+        "recommend": review.recommend or "",
+        "ceo_approv": review.ceo_approv or "",
+        "outlook": review.outlook or "",
+        "headline": review.headline or "",
+        "pros": review.pros or "",
+        "cons": review.cons or ""
+    }
+
+# Rows per message on the streaming RPCs when the request leaves limit unset.
+STREAM_CHUNK_SIZE = 1000
+
+def stream_rows(conn, name, query, params, chunk_size):
+    """Yield lists of up to chunk_size rows from a server-side (named) cursor.
+
+    Each chunk is one FETCH, so only chunk_size rows are held in this
+    process at a time and the full result is never materialized with
+    fetchall().
+    """
+    cursor = conn.cursor(name=name, cursor_factory=psycopg2.extras.DictCursor)
+    try:
+        cursor.execute(query, params)
+        while True:
+            chunk = cursor.fetchmany(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        cursor.close()
+
+# Rows per COPY on the bulk ingestion RPCs; a client can lower or raise it
+# per call with the "batch-size" metadata key, up to BULK_MAX_BATCH_SIZE.
+BULK_BATCH_SIZE = int(os.environ.get("BULK_BATCH_SIZE", 1000))
+BULK_MAX_BATCH_SIZE = int(os.environ.get("BULK_MAX_BATCH_SIZE", 10000))
+
+REVIEW_INSERT_COLUMNS = (
+    "firm", "job_title", "current", "location", "overall_rating",
+    "work_life_balance", "culture_values", "diversity_inclusion",
+    "career_opp", "comp_benefits", "senior_mgmt", "recommend",
+    "ceo_approv", "outlook", "headline", "pros", "cons",
+)
+JOB_INSERT_COLUMNS = ("title", "company", "description", "location", "normalized_salary")
+
+def bulk_batch_size(context):
+    """The call's "batch-size" metadata, capped. Raises InvalidArgument."""
+    for key, value in context.invocation_metadata():
+        if key == "batch-size":
+            try:
+                batch_size = int(value)
+            except ValueError:
+                batch_size = 0
+            if batch_size < 1:
+                raise InvalidArgument(f"batch-size must be a positive integer, got {value!r}")
+            return min(batch_size, BULK_MAX_BATCH_SIZE)
+    return BULK_BATCH_SIZE
+
+def copy_text_value(value):
+    """Encode one value for COPY ... FROM STDIN in text format."""
+    if value is None:
+        return "\\N"
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
+
+def copy_rows(cursor, table, columns, rows):
+    """Load rows (sequences ordered like columns) with a single COPY."""
+    data = io.StringIO()
+    for row in rows:
+        data.write("\t".join(copy_text_value(value) for value in row))
+        data.write("\n")
+    data.seek(0)
+    cursor.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN", data)
+
+def ingest_in_batches(messages, batch_size, to_row, write_batch):
+    """Validate streamed messages and write them in batches.
+
+    `to_row` returns the row for a message, or None to reject it.
+    `write_batch(cursor, rows)` writes the valid rows of one batch in its
+    own transaction; if it fails the batch is rolled back and all of its
+    rows are counted as rejected.
+    """
+    results = []
+    pending = []
+    invalid = 0
+
+    def flush():
+        result = BulkBatchResult(batch=len(results) + 1, rejected=invalid)
+        if pending:
+            conn = db_pool.getconn()
+            try:
+                with conn.cursor() as cursor:
+                    write_batch(cursor, pending)
+                conn.commit()
+                result.accepted = len(pending)
+            except Exception as e:
+                print(f"Error writing bulk batch {result.batch}: {e}")
+                conn.rollback()
+                result.rejected += len(pending)
+                result.error = str(e)
+            finally:
+                db_pool.putconn(conn)
+        results.append(result)
+
+    for message in messages:
+        row = to_row(message)
+        if row is None:
+            invalid += 1
+        else:
+            pending.append(row)
+        if len(pending) + invalid >= batch_size:
+            flush()
+            pending, invalid = [], 0
+
+    if pending or invalid:
+        flush()
+
+    return BulkIngestResponse(
+        accepted=sum(r.accepted for r in results),
+        rejected=sum(r.rejected for r in results),
+        batch=results
+    )
+
+def valid_review_data(review):
+    """Insert values for a bulk-loaded review, or None if it is unusable."""
+    if not review.firm or not review.job_title or not review.location:
+        return None
+    ratings = [getattr(review, column) for column in LOCATION_RATING_COLUMNS]
+    if any(rating < 0 or rating > 5 for rating in ratings):
+        return None
+    return review_data_from_message(review)
+
+def write_review_batch(cursor, rows):
+    copy_rows(cursor, "reviews", REVIEW_INSERT_COLUMNS, [[row[c] for c in REVIEW_INSERT_COLUMNS] for row in rows])
+    update_rating_summaries(cursor, added=rows)
+    notify_review_change(cursor, rows)
+
+def valid_job_row(job):
+    """Insert values for a bulk-loaded job, or None if it is unusable."""
+    if not job.title or not job.company_name or not job.description or not job.location:
+        return None
+    return (job.title, job.company_name, job.description, job.location, job.normalized_salary)
+
+def write_job_batch(cursor, rows):
+    copy_rows(cursor, "jobs", JOB_INSERT_COLUMNS, rows)
+    notify_change(cursor, "jobs", titles=[row[0] for row in rows])
+
+# Fixed queries. data_access_aio runs the same statements through asyncpg,
+# rewriting the placeholders with asyncpg_sql().
+# {columns} is filled in from a field projection.
+JOBS_WITH_TITLE_SQL = "SELECT {columns} FROM jobs WHERE title LIKE %s LIMIT 10"
+JOBS_WITH_TITLE_AND_CITY_SQL = "SELECT {columns} FROM jobs WHERE title LIKE %s AND location LIKE %s LIMIT 10"
+REVIEWS_WITH_TITLE_AND_CITY_SQL = "SELECT {columns} FROM reviews WHERE TRIM(job_title) LIKE %s AND TRIM(location) LIKE %s"
+# The largest companies first, one row per company (its highest count).
+COMPANIES_WITH_EMPLOYEES_SQL = """
+    SELECT {columns} FROM (
+        SELECT DISTINCT ON (company_id) company_id, employee_count, follower_count
+        FROM employee
+        WHERE company_id <> 0
+        ORDER BY company_id, employee_count DESC NULLS LAST
+    ) AS company
+    ORDER BY employee_count DESC NULLS LAST, company_id
+    LIMIT %s OFFSET %s
+"""
+REVIEW_PAGE_SQL = "SELECT {columns} FROM reviews LIMIT %s OFFSET %s"
+# Keyset mode: seek past the last id seen, so a full scan is linear and
+# stays stable while reviews are being inserted.
+REVIEW_PAGE_AFTER_SQL = "SELECT {columns} FROM reviews WHERE id > %s ORDER BY id LIMIT %s"
+LARGEST_COMPANY_JOBS_SQL = (
+    "SELECT job_id, company, title, description, location, company_id, med_salary "
+    "FROM jobs WHERE company_id = %s LIMIT %s OFFSET %s"
+)
+# Keyset mode: seek past the last job_id seen instead of rescanning every
+# earlier row with OFFSET.
+LARGEST_COMPANY_JOBS_AFTER_SQL = (
+    "SELECT job_id, company, title, description, location, company_id, med_salary "
+    "FROM jobs WHERE company_id = %s AND job_id > %s ORDER BY job_id LIMIT %s"
+)
+# Lock the row and keep its previous rating so the summaries can be
+# adjusted by the difference.
+UPDATE_REVIEW_SQL = """
+    UPDATE reviews AS r
+    SET current = %s,
+        overall_rating = %s,
+        headline = %s
+    FROM (SELECT id, overall_rating FROM reviews WHERE id = %s FOR UPDATE) AS old
+    WHERE r.id = old.id
+    RETURNING r.id, r.firm, r.location, r.job_title, old.overall_rating AS old_overall_rating, r.overall_rating,
+              r.work_life_balance, r.culture_values, r.diversity_inclusion, r.career_opp,
+              r.comp_benefits, r.senior_mgmt
+"""
+# The id comes from the table's identity sequence.
+INSERT_REVIEW_SQL = """
+    INSERT INTO reviews (
+        firm, job_title, current, location, overall_rating, 
+        work_life_balance, culture_values, diversity_inclusion, 
+        career_opp, comp_benefits, senior_mgmt, recommend, 
+        ceo_approv, outlook, headline, pros, cons
+    ) VALUES (
+        %(firm)s, %(job_title)s, %(current)s, %(location)s, %(overall_rating)s, 
+        %(work_life_balance)s, %(culture_values)s, %(diversity_inclusion)s, 
+        %(career_opp)s, %(comp_benefits)s, %(senior_mgmt)s, %(recommend)s, 
+        %(ceo_approv)s, %(outlook)s, %(headline)s, %(pros)s, %(cons)s
+    )
+    RETURNING id
+"""
+# The job_id comes from the table's identity sequence.
+INSERT_JOB_SQL = """
+    INSERT INTO jobs (title, company, description, location, normalized_salary)
+    VALUES (%s, %s, %s, %s, %s)
+    RETURNING job_id
+"""
+DELETE_REVIEW_SQL = "DELETE FROM reviews WHERE id = %s RETURNING id, job_title, " + ", ".join(REVIEW_SUMMARY_COLUMNS)
+# Columns DELETE_REVIEW_SQL returns.
+DELETED_REVIEW_COLUMNS = ("id", "job_title") + REVIEW_SUMMARY_COLUMNS
+BEST_PAYING_COMPANIES_SQL = """
+SELECT company, AVG(max_salary) as average_salary
+FROM jobs
+WHERE title = %s AND pay_period = 'YEARLY'
+GROUP BY company
+ORDER BY average_salary DESC
+"""
+JOB_SALARY_STATS_SQL = """
+SELECT AVG(normalized_salary) AS average_salary, COUNT(*) AS count
+FROM jobs
+WHERE title = %s
+"""
+JOB_SALARY_STATS_WITH_PERCENTILES_SQL = """
+SELECT AVG(normalized_salary) AS average_salary, COUNT(*) AS count,
+       percentile_cont(ARRAY[0.25, 0.5, 0.75]) WITHIN GROUP (ORDER BY normalized_salary) AS percentiles
+FROM jobs
+WHERE title = %s
+"""
+COMPANY_RATING_AGGREGATES_SQL = "SELECT * FROM company_rating_summary WHERE review_count > 0"
+# Average over all seven rating columns, missing ratings counting as 0.
+BEST_CITIES_SQL = """
+SELECT location,
+       (overall_rating_sum + work_life_balance_sum + culture_values_sum
+        + diversity_inclusion_sum + career_opp_sum + comp_benefits_sum
+        + senior_mgmt_sum) / (7.0 * review_count) AS average_rating,
+       review_count
+FROM location_rating_summary
+WHERE review_count > 0
+ORDER BY average_rating DESC, location
+LIMIT %s
+"""
+# Resolve every (title, city) pair in a single round trip, with the same
+# substring matching as GetJobReviewsWithTitleAndCity.
+JOB_REVIEW_RATINGS_SQL = f"""
+SELECT p.title, p.city,
+       COALESCE(SUM(r.review_rating), 0) AS rating_sum,
+       COUNT(r.review_rating) AS review_count
+FROM unnest(%s::text[], %s::text[]) WITH ORDINALITY AS p(title, city, idx)
+LEFT JOIN LATERAL (
+    SELECT {REVIEW_RATING_SQL} AS review_rating
+    FROM reviews
+    WHERE TRIM(job_title) LIKE '%%' || p.title || '%%'
+      AND TRIM(location) LIKE '%%' || p.city || '%%'
+) r ON TRUE
+GROUP BY p.idx, p.title, p.city
+ORDER BY p.idx
+"""
+# Ordered by id so every chunk's next_cursor can resume the export.
+# {where} is empty or a WHERE clause built by stream_reviews_query.
+STREAM_REVIEWS_SQL = "SELECT {columns} FROM reviews{where} ORDER BY id"
+STREAM_LARGEST_COMPANY_JOBS_SQL = (
+    "SELECT job_id, company, title, description, location, company_id, med_salary "
+    "FROM jobs WHERE company_id = %s AND job_id > %s ORDER BY job_id"
+)
+
+# The *_query functions below return (query, params, projection) for the
+# field-masked RPCs.
+
+def jobs_with_title_query(request):
+    projection = field_projection(JOB_FIELDS, request.fields)
+    return JOBS_WITH_TITLE_SQL.format(columns=select_list(projection)), (f"%{request.title}%",), projection
+
+def jobs_with_title_and_city_query(request):
+    projection = field_projection(JOB_FIELDS, request.fields)
+    query = JOBS_WITH_TITLE_AND_CITY_SQL.format(columns=select_list(projection))
+    return query, (f"%{request.title}%", f"%{request.city}%"), projection
+
+def reviews_with_title_and_city_query(request):
+    projection = field_projection(REVIEW_FIELDS, request.fields)
+    query = REVIEWS_WITH_TITLE_AND_CITY_SQL.format(columns=select_list(projection))
+    return query, (f"%{request.title}%", f"%{request.city}%"), projection
+
+def review_page_query(request, default_fields):
+    """Page query for a JobReviewsRequest in offset or keyset mode.
+
+    The id is always selected first; it is the page's next_cursor.
+    """
+    projection = field_projection(REVIEW_FIELDS, request.fields, default_fields, required=("id",))
+    columns = select_list(projection)
+    if request.HasField("after_id"):
+        return REVIEW_PAGE_AFTER_SQL.format(columns=columns), (request.after_id, request.limit), projection
+    return REVIEW_PAGE_SQL.format(columns=columns), (request.limit, request.offset), projection
+
+def companies_with_employees_query(request):
+    projection = field_projection(COMPANY_FIELDS, request.fields)
+    query = COMPANIES_WITH_EMPLOYEES_SQL.format(columns=select_list(projection))
+    return query, (request.limit or 10, request.offset), projection
+
+def largest_company_jobs_query(request):
+    if request.HasField("after_job_id"):
+        return LARGEST_COMPANY_JOBS_AFTER_SQL, (request.company_id, request.after_job_id, request.limit or 10)
+    return LARGEST_COMPANY_JOBS_SQL, (request.company_id, request.limit or 10, request.offset)
+
+def stream_reviews_query(request):
+    """(query, params, projection) for StreamJobReviews; the id is selected first."""
+    projection = field_projection(REVIEW_FIELDS, request.fields, required=("id",))
+    filters, params = [], []
+    if request.HasField("after_id"):
+        filters.append("id > %s")
+        params.append(request.after_id)
+    if request.ids:
+        filters.append("id = ANY(%s)")
+        params.append(list(request.ids))
+    where = " WHERE " + " AND ".join(filters) if filters else ""
+    return STREAM_REVIEWS_SQL.format(columns=select_list(projection), where=where), tuple(params), projection
+
+def stream_largest_company_jobs_query(request):
+    return STREAM_LARGEST_COMPANY_JOBS_SQL, (
+        request.company_id, request.after_job_id if request.HasField("after_job_id") else -1
+    )
+
+def job_salary_stats_query(request):
+    if request.percentiles:
+        return JOB_SALARY_STATS_WITH_PERCENTILES_SQL, (request.title,)
+    return JOB_SALARY_STATS_SQL, (request.title,)
+
+REMOTE_JOB_COLUMNS = "job_id, title, company, description, location, views, remote_allowed"
+REMOTE_JOB_RANK = "ts_rank(search_vector, websearch_to_tsquery('english', %s))"
+
+# GetRemoteJobs returns pages of REMOTE_JOBS_PAGE_SIZE jobs unless the
+# request sets page_size, which is capped at REMOTE_JOBS_MAX_PAGE_SIZE.
+REMOTE_JOBS_PAGE_SIZE = int(os.environ.get("REMOTE_JOBS_PAGE_SIZE", 50))
+REMOTE_JOBS_MAX_PAGE_SIZE = int(os.environ.get("REMOTE_JOBS_MAX_PAGE_SIZE", 500))
+
+def remote_jobs_filters(request):
+    """WHERE clause and parameters for a RemoteJobSearchRequest's optional filters."""
+    filters = ["remote_allowed = TRUE"]
+    params = []
+
+    if request.city and isinstance(request.city, str):
+        filters.append("location ILIKE %s")
+        params.append(f"%{request.city.strip()}%")
+
+    if request.keyword and isinstance(request.keyword, str):
+        # Full-text match on the indexed title/description vector
+        # instead of scanning every description with ILIKE.
+        filters.append("search_vector @@ websearch_to_tsquery('english', %s)")
+        params.append(request.keyword.strip())
+
+    if request.company and isinstance(request.company, str):
+        filters.append("company ILIKE %s")
+        params.append(f"%{request.company.strip()}%")
+
+    return " AND ".join(filters), params
+
+def remote_jobs_ranked(request):
+    return bool(request.keyword and isinstance(request.keyword, str) and request.rank_by_relevance)
+
+def remote_jobs_query(request):
+    """Query and parameters for every job matching a RemoteJobSearchRequest.
+
+    Jobs are ordered by job_id, or by relevance and then job_id.
+    """
+    where, params = remote_jobs_filters(request)
+    query = f"SELECT {REMOTE_JOB_COLUMNS} FROM jobs WHERE {where}"
+    if remote_jobs_ranked(request):
+        query += f" ORDER BY {REMOTE_JOB_RANK} DESC, job_id"
+        params.append(request.keyword.strip())
+    else:
+        query += " ORDER BY job_id"
+    return query, tuple(params)
+
+def remote_jobs_fingerprint(request):
+    # Ties a page token to the search it came from.
+    search = json.dumps([request.city, request.keyword, request.company, remote_jobs_ranked(request)])
+    return hashlib.sha256(search.encode()).hexdigest()[:16]
+
+def remote_jobs_page_token(request, row):
+    """Opaque token for the page after `row`: its (rank,) job_id plus the search."""
+    token = {"search": remote_jobs_fingerprint(request), "job_id": row["job_id"]}
+    if remote_jobs_ranked(request):
+        token["rank"] = row["rank"]
+    return base64.urlsafe_b64encode(json.dumps(token).encode()).decode()
+
+def parse_remote_jobs_page_token(request):
+    """The token's position, or None for the first page. Raises InvalidArgument."""
+    if not request.page_token:
+        return None
+    try:
+        token = json.loads(base64.urlsafe_b64decode(request.page_token.encode()))
+        position = (int(token["job_id"]), float(token["rank"]) if remote_jobs_ranked(request) else None)
+        if token["search"] != remote_jobs_fingerprint(request):
+            raise ValueError("token belongs to another search")
+    except (ValueError, KeyError, TypeError) as e:
+        raise InvalidArgument(f"Invalid page_token: {e}")
+    return position
+
+def remote_jobs_page_size(request):
+    if request.page_size < 0:
+        raise InvalidArgument("page_size must not be negative")
+    return min(request.page_size or REMOTE_JOBS_PAGE_SIZE, REMOTE_JOBS_MAX_PAGE_SIZE)
+
+def remote_jobs_page_query(request):
+    """Query, parameters and page size for one page of GetRemoteJobs.
+
+    Pages are keyset-paginated on the same order as remote_jobs_query, so
+    each costs about the same however many jobs match. One row past the
+    page is fetched to tell whether another page follows.
+    """
+    page_size = remote_jobs_page_size(request)
+    position = parse_remote_jobs_page_token(request)
+    where, filter_params = remote_jobs_filters(request)
+
+    if remote_jobs_ranked(request):
+        keyword = request.keyword.strip()
+        query = f"SELECT {REMOTE_JOB_COLUMNS}, {REMOTE_JOB_RANK} AS rank FROM jobs WHERE {where}"
+        params = [keyword, *filter_params]
+        if position is not None:
+            # Rank descending, then job_id ascending. ts_rank is a real, so
+            # the token's rank is compared at that precision.
+            query += f" AND (-{REMOTE_JOB_RANK}, job_id) > (-%s::real, %s)"
+            params += [keyword, position[1], position[0]]
+        query += " ORDER BY rank DESC, job_id LIMIT %s"
+    else:
+        query = f"SELECT {REMOTE_JOB_COLUMNS} FROM jobs WHERE {where}"
+        params = list(filter_params)
+        if position is not None:
+            query += " AND job_id > %s"
+            params.append(position[0])
+        query += " ORDER BY job_id LIMIT %s"
+
+    params.append(page_size + 1)
+    return query, tuple(params), page_size
+
+def remote_jobs_page(request, rows, page_size):
+    """RemoteJobSearchResponse for up to page_size + 1 rows of remote_jobs_page_query."""
+    response = RemoteJobSearchResponse(jobs=[remote_job_from_row(row) for row in rows[:page_size]])
+    if len(rows) > page_size:
+        response.next_page_token = remote_jobs_page_token(request, rows[page_size - 1])
+    return response
+
+def approximate_total_query(request):
+    """The planner's row estimate for the search: cheap, and approximate."""
+    where, params = remote_jobs_filters(request)
+    return f"EXPLAIN (FORMAT JSON) SELECT 1 FROM jobs WHERE {where}", tuple(params)
+
+def approximate_total_from_plan(plan):
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
 class DataAccessService(data_access_pb2_grpc.DataAccessServiceServicer):
     def GetJobPostingsWithTitle(self, request, context):
         conn = None # Initialize conn to None
         cursor = None # Initialize cursor to None
+        query, params, projection = jobs_with_title_query(request)
         try:
-            conn = get_db_connection()
-            cursor = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
-            cursor.execute("SELECT * FROM jobs WHERE title LIKE %s LIMIT 10", (f"%{request.title}%",))
+            conn = db_pool.getconn()
+            cursor = conn.cursor()
+            cursor.execute(query, params)
             rows = cursor.fetchall()
 
             # Transform rows into Job objects.
-            job_postings = [
-                Job(
-                    job_id=row["job_id"],
-                    company=row["company"],
-                    title=row["title"],
-                    description=row["description"],
-                    max_salary=row["max_salary"] or 0.0,
-                    pay_period=row["pay_period"],
-                    location=row["location"],
-                    company_id=row["company_id"] or 0.0,
-                    views=row["views"] or 0.0,
-                    med_salary=row["med_salary"] or 0.0,
-                    min_salary=row["min_salary"] or 0.0,
-                    formatted_work_type=row["formatted_work_type"],
-                    remote_allowed=row["remote_allowed"],
-                    job_posting_url=row["job_posting_url"],
-                    aplication_url=row["aplication_url"],
-                    application_type=row["application_type"],
-                    formatted_experience_level=row["formatted_experience_level"],
-                    skills_desc=row["skills_desc"],
-                    posting_domain=row["posting_domain"],
-                    sponsored=row["sponsored"],
-                    work_type=row["work_type"],
-                    currency=row["currency"],
-                    normalized_salary=row["normalized_salary"] or 0.0,
-                    zip_code=row["zip_code"] or 0.0
-                )
-                for row in rows
-            ]
+            job_postings = [message_from_tuple(Job, projection, row) for row in rows]
 
             return JobPostingsResponse(job=job_postings)
         except Exception as e:
@@ -93,46 +1083,19 @@ class DataAccessService(data_access_pb2_grpc.DataAccessServiceServicer):
             if cursor is not None:
                 cursor.close()
             if conn is not None:
-                conn.close()
+                db_pool.putconn(conn)
         
     def GetJobPostingsWithTitleAndCity(self, request, context):
         conn = None # Initialize conn to None
         cursor = None # Initialize cursor to None
+        query, params, projection = jobs_with_title_and_city_query(request)
         try:
-            conn = get_db_connection()
-            cursor = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
-            cursor.execute("SELECT * FROM jobs WHERE title LIKE %s AND location LIKE %s LIMIT 10", (f"%{request.title}%", f"%{request.city}%",))
+            conn = db_pool.getconn()
+            cursor = conn.cursor()
+            cursor.execute(query, params)
             rows = cursor.fetchall()
 
-            job_postings = [
-                Job(
-                    job_id=row["job_id"],
-                    company=row["company"],
-                    title=row["title"],
-                    description=row["description"],
-                    max_salary=row["max_salary"] or 0.0,
-                    pay_period=row["pay_period"],
-                    location=row["location"],
-                    company_id=row["company_id"] or 0.0,
-                    views=row["views"] or 0.0,
-                    med_salary=row["med_salary"] or 0.0,
-                    min_salary=row["min_salary"] or 0.0,
-                    formatted_work_type=row["formatted_work_type"],
-                    remote_allowed=row["remote_allowed"],
-                    job_posting_url=row["job_posting_url"],
-                    aplication_url=row["aplication_url"],
-                    application_type=row["application_type"],
-                    formatted_experience_level=row["formatted_experience_level"],
-                    skills_desc=row["skills_desc"],
-                    posting_domain=row["posting_domain"],
-                    sponsored=row["sponsored"],
-                    work_type=row["work_type"],
-                    currency=row["currency"],
-                    normalized_salary=row["normalized_salary"] or 0.0,
-                    zip_code=row["zip_code"] or 0.0
-                )
-                for row in rows
-            ]
+            job_postings = [message_from_tuple(Job, projection, row) for row in rows]
 
             return JobPostingsResponse(job=job_postings)
 
@@ -145,41 +1108,27 @@ class DataAccessService(data_access_pb2_grpc.DataAccessServiceServicer):
             if cursor is not None:
                 cursor.close()
             if conn is not None:
-                conn.close()
+                db_pool.putconn(conn)
 
     def GetJobPostingsForLargestCompanies(self, request, context):
         conn = None # Initialize conn to None
         cursor = None # Initialize cursor to None
         try:
             # Connect to the database.
-            conn = get_db_connection()
+            conn = db_pool.getconn()
             cursor = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
             
             # Execute the SQL query.
-            query = (
-                "SELECT company, title, description, location, company_id, med_salary "
-                "FROM jobs WHERE company_id = %s LIMIT 10 OFFSET %s"
-            )
-            params = (request.company_id, request.offset)
-            cursor.execute(query, params)
+            cursor.execute(*largest_company_jobs_query(request))
             
             # Fetch the results.
             rows = cursor.fetchall()
             
             # Transform rows into JobForLargestCompany objects.
-            job_postings = []
-            for idx, row in enumerate(rows):
-                job_obj = JobForLargestCompany(
-                    company=row["company"],
-                    title=row["title"],
-                    description=row["description"],
-                    location=row["location"],
-                    company_id=int(row["company_id"]) if row["company_id"] is not None else 0,
-                    med_salary=float(row["med_salary"]) if row["med_salary"] is not None else 0.0
-                )
-                job_postings.append(job_obj)
+            job_postings = [job_for_largest_company_from_row(row) for row in rows]
             
-            return JobPostingsForLargestCompaniesResponse(job=job_postings)
+            next_cursor = rows[-1]["job_id"] if rows else request.after_job_id
+            return JobPostingsForLargestCompaniesResponse(job=job_postings, next_cursor=next_cursor)
         except Exception as e:
             print(f"Error in GetJobPostingsForLargestCompanies: {e}")
             # The interceptor might catch this, but returning empty on specific errors is also an option
@@ -189,27 +1138,19 @@ class DataAccessService(data_access_pb2_grpc.DataAccessServiceServicer):
             if cursor is not None:
                 cursor.close()
             if conn is not None:
-                conn.close()
+                db_pool.putconn(conn)
 
     def GetCompaniesWithEmployees(self, request, context):
         conn = None # Initialize conn to None
         cursor = None # Initialize cursor to None
+        query, params, projection = companies_with_employees_query(request)
         try:
-            conn = get_db_connection()
-            cursor = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
-            cursor.execute("SELECT * FROM employee LIMIT 10;")
+            conn = db_pool.getconn()
+            cursor = conn.cursor()
+            cursor.execute(query, params)
             rows = cursor.fetchall()
             
-            company = [
-                data_access_pb2.Company(
-                    company_id=row["company_id"] if row["company_id"] is not None else 0,
-                    employee_count=row["employee_count"] if row["employee_count"] is not None else 0,
-                    follower_count=row["follower_count"] if row["follower_count"] is not None else 0,
-                )
-                for row in rows
-            ]
-            cursor.close()
-            conn.close()
+            company = [message_from_tuple(data_access_pb2.Company, projection, row) for row in rows]
             return CompaniesResponse(company=company)
         except Exception as e:
             print(f"Error in GetCompaniesWithEmployees: {e}")
@@ -220,33 +1161,21 @@ class DataAccessService(data_access_pb2_grpc.DataAccessServiceServicer):
             if cursor is not None:
                 cursor.close()
             if conn is not None:
-                conn.close()
+                db_pool.putconn(conn)
 
     def GetJobReviewsForCompanyReview(self, request, context):
         conn = None # Initialize conn to None
         cursor = None # Initialize cursor to None
+        query, params, projection = review_page_query(request, COMPANY_REVIEW_DEFAULT_FIELDS)
         try:
-            conn = get_db_connection()
-            cursor = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
-            cursor.execute(
-                "SELECT * FROM reviews LIMIT %s OFFSET %s", 
-                (request.limit, request.offset)
-            )
+            conn = db_pool.getconn()
+            cursor = conn.cursor()
+            cursor.execute(query, params)
             rows = cursor.fetchall()
             
-            reviews = [
-                data_access_pb2.Review(
-                    firm=row["firm"],
-                    overall_rating=row["overall_rating"] if row["overall_rating"] is not None else 0,
-                    work_life_balance=row["work_life_balance"] if row["work_life_balance"] is not None else 0.0,
-                    culture_values=row["culture_values"] if row["culture_values"] is not None else 0.0,
-                    diversity_inclusion=row["diversity_inclusion"] if row["diversity_inclusion"] is not None else 0.0,
-                    career_opp=row["career_opp"] if row["career_opp"] is not None else 0.0,
-                )
-                for row in rows
-            ]
+            reviews = [message_from_tuple(Review, projection, row) for row in rows]
 
-            return JobReviewsResponse(review=reviews)
+            return JobReviewsResponse(review=reviews, next_cursor=rows[-1][0] if rows else request.after_id)
         except Exception as e:
             print(f"Error in GetJobReviewsForCompanyReview: {e}")
             # The interceptor might catch this, but returning empty on specific errors is also an option
@@ -256,35 +1185,21 @@ class DataAccessService(data_access_pb2_grpc.DataAccessServiceServicer):
             if cursor is not None:
                 cursor.close()
             if conn is not None:
-                conn.close()
+                db_pool.putconn(conn)
 
     def GetJobReviewsForLocationReview(self, request, context):
         conn = None # Initialize conn to None
         cursor = None # Initialize cursor to None
+        query, params, projection = review_page_query(request, LOCATION_REVIEW_DEFAULT_FIELDS)
         try:
-            conn = get_db_connection()
-            cursor = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
-            cursor.execute(
-                "SELECT * FROM reviews LIMIT %s OFFSET %s", 
-                (request.limit, request.offset)
-            )
+            conn = db_pool.getconn()
+            cursor = conn.cursor()
+            cursor.execute(query, params)
             rows = cursor.fetchall()
             
-            reviews = [
-                Review(
-                    location=row["location"],
-                    overall_rating=row["overall_rating"] if row["overall_rating"] is not None else 0,
-                    work_life_balance=row["work_life_balance"] if row["work_life_balance"] is not None else 0.0,
-                    culture_values=row["culture_values"] if row["culture_values"] is not None else 0.0,
-                    diversity_inclusion=row["diversity_inclusion"] if row["diversity_inclusion"] is not None else 0.0,
-                    career_opp=row["career_opp"] if row["career_opp"] is not None else 0.0,
-                    comp_benefits=row["comp_benefits"] if row["comp_benefits"] is not None else 0.0,
-                    senior_mgmt=row["senior_mgmt"] if row["senior_mgmt"] is not None else 0.0,
-                )
-                for row in rows
-            ]
+            reviews = [message_from_tuple(Review, projection, row) for row in rows]
 
-            return JobReviewsResponse(review=reviews)
+            return JobReviewsResponse(review=reviews, next_cursor=rows[-1][0] if rows else request.after_id)
         except Exception as e:
             print(f"Error in GetJobReviewsForLocationReview: {e}")
             # The interceptor might catch this, but returning empty on specific errors is also an option
@@ -294,30 +1209,29 @@ class DataAccessService(data_access_pb2_grpc.DataAccessServiceServicer):
             if cursor is not None:
                 cursor.close()
             if conn is not None:
-                conn.close()
+                db_pool.putconn(conn)
 
     def UpdateJobReview(self, request, context):
         conn = None # Initialize conn to None
         cursor = None # Initialize cursor to None
         try:
-            conn = get_db_connection()
+            conn = db_pool.getconn()
             cursor = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
             
-            update_query = """
-                UPDATE reviews
-                SET current = %s,
-                    overall_rating = %s,
-                    headline = %s
-                WHERE id = %s
-            """
-            cursor.execute(update_query, (request.current_status, request.rating, request.headline, request.id))
-            conn.commit()
-            rowcount = cursor.rowcount
-            
-            if rowcount == 0:
+            cursor.execute(UPDATE_REVIEW_SQL, (request.current_status, request.rating, request.headline, request.id))
+            row = cursor.fetchone()
+
+            if row is None:
+                conn.rollback()
                 return UpdateJobReviewResponse(success=False, message="Review not found")
-            else:
-                return UpdateJobReviewResponse(success=True, message="Review updated successfully")
+
+            updated = dict(row)
+            previous = dict(updated, overall_rating=updated["old_overall_rating"])
+            update_rating_summaries(cursor, removed=[previous], added=[updated])
+            notify_review_change(cursor, [updated], write_origin(context))
+            conn.commit()
+
+            return UpdateJobReviewResponse(success=True, message="Review updated successfully")
         except Exception as e:
             print(f"Error in UpdateJobReview: {e}")
             # The interceptor might catch this, but returning empty on specific errors is also an option
@@ -327,45 +1241,18 @@ class DataAccessService(data_access_pb2_grpc.DataAccessServiceServicer):
             if cursor is not None:
                 cursor.close()
             if conn is not None:
-                conn.close()
+                db_pool.putconn(conn)
         
     def GetJobReviewsWithTitleAndCity(self, request, context):
         conn = None # Initialize conn to None
         cursor = None # Initialize cursor to None
+        query, params, projection = reviews_with_title_and_city_query(request)
         try:
-            conn = get_db_connection()
-            cursor = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)  # Permite acessar colunas pelo nome
-            cursor.execute(
-                "SELECT * FROM reviews WHERE TRIM(job_title) LIKE %s AND TRIM(location) LIKE %s",
-                (f"%{request.title}%", f"%{request.city}%",)
-            )
+            conn = db_pool.getconn()
+            cursor = conn.cursor()
+            cursor.execute(query, params)
             rows = cursor.fetchall()
-            reviews = [
-                # Assuming 'Review' is defined in data_access_pb2; adjust import if necessary.
-                # If not, you might need to import it similarly to Job.
-                # For this example, we're assuming the same module defines Review.
-                Review(
-                    id=row["id"],
-                    firm=row["firm"],
-                    job_title=row["job_title"],
-                    current=row["current"],
-                    location=row["location"],
-                    overall_rating=row["overall_rating"] if row["overall_rating"] is not None else 0,
-                    work_life_balance=row["work_life_balance"] if row["work_life_balance"] is not None else 0.0,
-                    culture_values=row["culture_values"] if row["culture_values"] is not None else 0.0,
-                    diversity_inclusion=row["diversity_inclusion"] if row["diversity_inclusion"] is not None else 0.0,
-                    career_opp=row["career_opp"] if row["career_opp"] is not None else 0.0,
-                    comp_benefits=row["comp_benefits"] if row["comp_benefits"] is not None else 0.0,
-                    senior_mgmt=row["senior_mgmt"] if row["senior_mgmt"] is not None else 0.0,
-                    recommend=row["recommend"],
-                    ceo_approv=row["ceo_approv"],
-                    outlook=row["outlook"],
-                    headline=row["headline"],
-                    pros=row["pros"],
-                    cons=row["cons"]
-                )
-                for row in rows
-            ]
+            reviews = [message_from_tuple(Review, projection, row) for row in rows]
 
             return JobReviewsResponse(review=reviews)
 
@@ -378,56 +1265,25 @@ class DataAccessService(data_access_pb2_grpc.DataAccessServiceServicer):
             if cursor is not None:
                 cursor.close()
             if conn is not None:
-                conn.close()
+                db_pool.putconn(conn)
         
     def CreateReview(self, request, context):
         conn = None # Initialize conn to None
         cursor = None # Initialize cursor to None
         try:
-            conn = get_db_connection()
+            conn = db_pool.getconn()
             cursor = conn.cursor()
 
-            cursor.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM reviews")
-            next_id = cursor.fetchone()[0]
-
-            review_data = {
-                "id": next_id,
-                "firm": request.review.firm or "",
-                "job_title": request.review.job_title or "",
-                "current": request.review.current or "",
-                "location": request.review.location or "",
-                "overall_rating": request.review.overall_rating or None,
-                "work_life_balance": request.review.work_life_balance or None,
-                "culture_values": request.review.culture_values or None,
-                "diversity_inclusion": request.review.diversity_inclusion or None,
-                "career_opp": request.review.career_opp or None,
-                "comp_benefits": request.review.comp_benefits or None,
-                "senior_mgmt": request.review.senior_mgmt or None,
-                "recommend": request.review.recommend or "",
-                "ceo_approv": request.review.ceo_approv or "",
-                "outlook": request.review.outlook or "",
-                "headline": request.review.headline or "",
-                "pros": request.review.pros or "",
-                "cons": request.review.cons or ""
-            }
+            review_data = review_data_from_message(request.review)
 
-            cursor.execute("""
-                INSERT INTO reviews (
-                    id, firm, job_title, current, location, overall_rating, 
-                    work_life_balance, culture_values, diversity_inclusion, 
-                    career_opp, comp_benefits, senior_mgmt, recommend, 
-                    ceo_approv, outlook, headline, pros, cons
-                ) VALUES (
-                    %(id)s, %(firm)s, %(job_title)s, %(current)s, %(location)s, %(overall_rating)s, 
-                    %(work_life_balance)s, %(culture_values)s, %(diversity_inclusion)s, 
-                    %(career_opp)s, %(comp_benefits)s, %(senior_mgmt)s, %(recommend)s, 
-                    %(ceo_approv)s, %(outlook)s, %(headline)s, %(pros)s, %(cons)s
-                )
-            """, review_data)
+            cursor.execute(INSERT_REVIEW_SQL, review_data)
+            review_id = cursor.fetchone()[0]
+            update_rating_summaries(cursor, added=[review_data])
+            notify_review_change(cursor, [dict(review_data, id=review_id)], write_origin(context))
 
             conn.commit()
 
-            return CreateReviewResponse(success="Review added successfully.")
+            return CreateReviewResponse(success="Review added successfully.", review_id=review_id)
         except Exception as e:
             print(f"Error in CreateReview: {e}")
             # The interceptor might catch this, but returning empty on specific errors is also an option
@@ -437,28 +1293,24 @@ class DataAccessService(data_access_pb2_grpc.DataAccessServiceServicer):
             if cursor is not None:
                 cursor.close()
             if conn is not None:
-                conn.close()
+                db_pool.putconn(conn)
         
     def PostJobInDB(self, request, context):
         conn = None # Initialize conn to None
         cursor = None # Initialize cursor to None
         try:
-            conn = get_db_connection()
+            conn = db_pool.getconn()
             cursor = conn.cursor()
 
-            job_id = self.generate_unique_job_id(cursor)
-
-            cursor.execute("""
-                INSERT INTO jobs (job_id, title, company, description, location, normalized_salary)
-                VALUES (%s, %s, %s, %s, %s, %s)
-            """, (
-                job_id,
+            cursor.execute(INSERT_JOB_SQL, (
                 request.title,
                 request.company_name,
                 request.description,
                 request.location,
                 request.normalized_salary,
             ))
+            job_id = cursor.fetchone()[0]
+            notify_change(cursor, "jobs", titles=[request.title])
 
             # Commit para persistir as alterações
             conn.commit()
@@ -467,7 +1319,7 @@ class DataAccessService(data_access_pb2_grpc.DataAccessServiceServicer):
             return data_access_pb2.PostJobResponse(
                 message="Job successfully inserted",
                 status=200,
-                job_id=job_id
+                job_id=str(job_id)
             )
 
         except Exception as e:
@@ -482,68 +1334,26 @@ class DataAccessService(data_access_pb2_grpc.DataAccessServiceServicer):
             if cursor is not None:
                 cursor.close()
             if conn is not None:
-                conn.close()
+                db_pool.putconn(conn)
 
-    def generate_unique_job_id(self, cursor):
-        """Gera um ID único para o trabalho."""
-        while True:
-            # Gerar um ID aleatório
-            new_id = random.randint(1, 999999)  # Exemplo: ID de 4 dígitos
-            cursor.execute("SELECT * FROM jobs WHERE job_id = %s", (new_id,))
-            if not cursor.fetchone():
-                return new_id
-        
     def GetRemoteJobs(self, request, context):
         conn = None # Initialize conn to None
         cursor = None # Initialize cursor to None
+        query, params, page_size = remote_jobs_page_query(request)
         try:
-            conn = get_db_connection()
+            conn = db_pool.getconn()
             cursor = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
 
-            query = """
-            SELECT job_id, title, company, description, location, views, remote_allowed
-            FROM jobs
-            WHERE remote_allowed = TRUE
-            """
-
-            filters = []
-            params = []
-
-            if request.city and isinstance(request.city, str):
-                filters.append("location ILIKE %s")
-                params.append(f"%{request.city.strip()}%")
-
-            if request.keyword and isinstance(request.keyword, str):
-                filters.append("(title ILIKE %s OR description ILIKE %s)")
-                params.append(f"%{request.keyword.strip()}%")
-                params.append(f"%{request.keyword.strip()}%")
-
-            if request.company and isinstance(request.company, str):
-                filters.append("company ILIKE %s")
-                params.append(f"%{request.company.strip()}%")
-
-            if filters:
-                query += " AND " + " AND ".join(filters)
-
-            print("Executing Query:", query)
-            print("Params:", params)
-
-            cursor.execute(query, tuple(params))
+            cursor.execute(query, params)
             rows = cursor.fetchall()
 
-            job_postings = []
-            for row in rows:
-                job_obj = JobForRemote(
-                    id=row["job_id"],
-                    title=row["title"] or "",
-                    company=row["company"] or "",
-                    description=row["description"] or "",
-                    location=row["location"] or "",
-                    remote_allowed=bool(row["remote_allowed"])
-                )
-                job_postings.append(job_obj)
+            response = remote_jobs_page(request, rows, page_size)
 
-            return RemoteJobSearchResponse(jobs=job_postings)
+            if request.include_total:
+                cursor.execute(*approximate_total_query(request))
+                response.approximate_total = approximate_total_from_plan(cursor.fetchone()[0])
+
+            return response
 
         except Exception as e:
             print(f"Error in GetRemoteJobs: {e}")
@@ -556,7 +1366,7 @@ class DataAccessService(data_access_pb2_grpc.DataAccessServiceServicer):
             if cursor is not None:
                 cursor.close()
             if conn is not None:
-                conn.close()
+                db_pool.putconn(conn)
 
     def GetBestPayingCompanies(self, request, context):
         conn = None # Initialize conn to None
@@ -570,27 +1380,13 @@ class DataAccessService(data_access_pb2_grpc.DataAccessServiceServicer):
             return BestPayingCompaniesResponse()
 
         try:
-            conn = get_db_connection()
+            conn = db_pool.getconn()
             cursor = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
 
-            query = """
-            SELECT company, AVG(max_salary) as average_salary
-            FROM jobs
-            WHERE title = %s AND pay_period = 'YEARLY'
-            GROUP BY company
-            ORDER BY average_salary DESC
-            """
-
-            cursor.execute(query, (job_title,))
+            cursor.execute(BEST_PAYING_COMPANIES_SQL, (job_title,))
             rows = cursor.fetchall()
 
-            companies = []
-            for row in rows:
-                company = BestCompany(
-                    company_name=row["company"],
-                    average_salary=row["average_salary"]
-                )
-                companies.append(company)
+            companies = [best_company_from_row(row) for row in rows]
 
             return BestPayingCompaniesResponse(companies=companies)
 
@@ -605,32 +1401,61 @@ class DataAccessService(data_access_pb2_grpc.DataAccessServiceServicer):
             if cursor is not None:
                 cursor.close()
             if conn is not None:
-                conn.close()
-        
+                db_pool.putconn(conn)
+
+    def GetJobSalaryStats(self, request, context):
+        conn = None # Initialize conn to None
+        cursor = None # Initialize cursor to None
+
+        if not request.title:
+            context.set_details("Job title is required")
+            context.set_code(grpc.StatusCode.INVALID_ARGUMENT)
+            return JobSalaryStatsResponse()
+
+        try:
+            conn = db_pool.getconn()
+            cursor = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
+            cursor.execute(*job_salary_stats_query(request))
+
+            return job_salary_stats_from_row(cursor.fetchone())
+
+        except Exception as e:
+            print(f"Error in GetJobSalaryStats: {e}")
+            context.set_details(f"Database query failed: {str(e)}")
+            context.set_code(grpc.StatusCode.INTERNAL)
+            return JobSalaryStatsResponse()
+        finally:
+            # Ensure cursor and connection are closed
+            if cursor is not None:
+                cursor.close()
+            if conn is not None:
+                db_pool.putconn(conn)
+
     def DeleteReview(self, request, context):
         conn = None # Initialize conn to None
         cursor = None # Initialize cursor to None
         try:
-            conn = get_db_connection()
+            conn = db_pool.getconn()
             cursor = conn.cursor()
 
-            cursor.execute("SELECT COUNT(*) FROM reviews WHERE id = %s", (request.review_id,))
-            count = cursor.fetchone()[0]
+            cursor.execute(DELETE_REVIEW_SQL, (request.review_id,))
+            row = cursor.fetchone()
 
-            if count == 0:
-                cursor.close()
-                conn.close()
+            if row is None:
+                conn.rollback()
                 context.set_code(grpc.StatusCode.NOT_FOUND)
                 context.set_details("Review not found")
                 return DeleteReviewResponse(success=False, message="Review not found")
 
-            cursor.execute("DELETE FROM reviews WHERE id = %s", (request.review_id,))
+            deleted = dict(zip(DELETED_REVIEW_COLUMNS, row))
+            update_rating_summaries(cursor, removed=[deleted])
+            notify_review_change(cursor, [deleted], write_origin(context))
             conn.commit()
 
             return DeleteReviewResponse(success=True, message="Review deleted successfully")
 
         except Exception as e:
-            print(f"Error in GetBestPayingCompanies: {e}")
+            print(f"Error in DeleteReview: {e}")
             # The interceptor might catch this, but returning empty on specific errors is also an option
             context.set_code(grpc.StatusCode.INTERNAL)
             context.set_details(f"Error deleting Review: {str(e)}")
@@ -640,20 +1465,233 @@ class DataAccessService(data_access_pb2_grpc.DataAccessServiceServicer):
             if cursor is not None:
                 cursor.close()
             if conn is not None:
-                conn.close()
+                db_pool.putconn(conn)
+
+    def GetCompanyRatingAggregates(self, request, context):
+        conn = None # Initialize conn to None
+        cursor = None # Initialize cursor to None
+        try:
+            conn = db_pool.getconn()
+            cursor = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
+            cursor.execute(COMPANY_RATING_AGGREGATES_SQL)
+            rows = cursor.fetchall()
+
+            companies = [company_rating_aggregate_from_row(row) for row in rows]
+
+            return CompanyRatingAggregatesResponse(company=companies)
+        except Exception as e:
+            print(f"Error in GetCompanyRatingAggregates: {e}")
+            context.set_code(grpc.StatusCode.INTERNAL)
+            context.set_details(f"Database query failed: {str(e)}")
+            return CompanyRatingAggregatesResponse()
+        finally:
+            # Ensure cursor and connection are closed
+            if cursor is not None:
+                cursor.close()
+            if conn is not None:
+                db_pool.putconn(conn)
+
+    def GetBestCities(self, request, context):
+        conn = None # Initialize conn to None
+        cursor = None # Initialize cursor to None
+        try:
+            conn = db_pool.getconn()
+            cursor = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
+
+            cursor.execute(BEST_CITIES_SQL, (request.limit or 10,))
+            rows = cursor.fetchall()
+
+            cities = [city_rating_from_row(row) for row in rows]
+
+            return BestCitiesResponse(city=cities)
+        except Exception as e:
+            print(f"Error in GetBestCities: {e}")
+            context.set_code(grpc.StatusCode.INTERNAL)
+            context.set_details(f"Database query failed: {str(e)}")
+            return BestCitiesResponse()
+        finally:
+            # Ensure cursor and connection are closed
+            if cursor is not None:
+                cursor.close()
+            if conn is not None:
+                db_pool.putconn(conn)
+
+    def GetJobReviewRatingsForTitlesAndCities(self, request, context):
+        conn = None # Initialize conn to None
+        cursor = None # Initialize cursor to None
+        try:
+            if not request.pair:
+                return JobReviewRatingsResponse()
+
+            conn = db_pool.getconn()
+            cursor = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
+
+            cursor.execute(JOB_REVIEW_RATINGS_SQL, (
+                [pair.title for pair in request.pair],
+                [pair.city for pair in request.pair],
+            ))
+            rows = cursor.fetchall()
+
+            ratings = [title_and_city_rating_from_row(row) for row in rows]
+
+            return JobReviewRatingsResponse(rating=ratings)
+        except Exception as e:
+            print(f"Error in GetJobReviewRatingsForTitlesAndCities: {e}")
+            context.set_code(grpc.StatusCode.INTERNAL)
+            context.set_details(f"Database query failed: {str(e)}")
+            return JobReviewRatingsResponse()
+        finally:
+            # Ensure cursor and connection are closed
+            if cursor is not None:
+                cursor.close()
+            if conn is not None:
+                db_pool.putconn(conn)
+
+    def StreamJobReviews(self, request, context):
+        conn = None # Initialize conn to None
+        chunks = None # Initialize chunks to None
+        query, params, projection = stream_reviews_query(request)
+        try:
+            conn = db_pool.getconn()
+
+            chunks = stream_rows(conn, "stream_job_reviews", query, params, request.limit or STREAM_CHUNK_SIZE)
+            for rows in chunks:
+                yield JobReviewsResponse(
+                    review=[message_from_tuple(Review, projection, row) for row in rows],
+                    next_cursor=rows[-1][0]
+                )
+        except Exception as e:
+            print(f"Error in StreamJobReviews: {e}")
+            context.set_code(grpc.StatusCode.INTERNAL)
+            context.set_details(f"Database query failed: {str(e)}")
+        finally:
+            # Close the server-side cursor (also on client cancel) before
+            # the connection goes back to the pool.
+            if chunks is not None:
+                chunks.close()
+            if conn is not None:
+                db_pool.putconn(conn)
+
+    def StreamJobPostingsForLargestCompanies(self, request, context):
+        conn = None # Initialize conn to None
+        chunks = None # Initialize chunks to None
+        try:
+            conn = db_pool.getconn()
+
+            query, params = stream_largest_company_jobs_query(request)
+
+            chunks = stream_rows(conn, "stream_largest_company_jobs", query, params, request.limit or STREAM_CHUNK_SIZE)
+            for rows in chunks:
+                yield JobPostingsForLargestCompaniesResponse(
+                    job=[job_for_largest_company_from_row(row) for row in rows],
+                    next_cursor=rows[-1]["job_id"]
+                )
+        except Exception as e:
+            print(f"Error in StreamJobPostingsForLargestCompanies: {e}")
+            context.set_code(grpc.StatusCode.INTERNAL)
+            context.set_details(f"Database query failed: {str(e)}")
+        finally:
+            # Close the server-side cursor (also on client cancel) before
+            # the connection goes back to the pool.
+            if chunks is not None:
+                chunks.close()
+            if conn is not None:
+                db_pool.putconn(conn)
+
+    def StreamRemoteJobs(self, request, context):
+        conn = None # Initialize conn to None
+        chunks = None # Initialize chunks to None
+        try:
+            conn = db_pool.getconn()
+
+            query, params = remote_jobs_query(request)
+
+            chunks = stream_rows(conn, "stream_remote_jobs", query, params, STREAM_CHUNK_SIZE)
+            for rows in chunks:
+                yield RemoteJobSearchResponse(jobs=[remote_job_from_row(row) for row in rows])
+        except Exception as e:
+            print(f"Error in StreamRemoteJobs: {e}")
+            context.set_code(grpc.StatusCode.INTERNAL)
+            context.set_details(f"Database query failed: {str(e)}")
+        finally:
+            # Close the server-side cursor (also on client cancel) before
+            # the connection goes back to the pool.
+            if chunks is not None:
+                chunks.close()
+            if conn is not None:
+                db_pool.putconn(conn)
+
+    def BulkCreateReviews(self, request_iterator, context):
+        return ingest_in_batches(request_iterator, bulk_batch_size(context), valid_review_data, write_review_batch)
+
+    def BulkPostJobs(self, request_iterator, context):
+        return ingest_in_batches(request_iterator, bulk_batch_size(context), valid_job_row, write_job_batch)
+
+    def SubscribeInvalidations(self, request, context):
+        # Served by invalidation_server() instead, see serve().
+        context.abort(grpc.StatusCode.UNIMPLEMENTED, f"SubscribeInvalidations is served on port {INVALIDATION_PORT}")
+
+def stream_invalidations(request, context):
+    """SubscribeInvalidations: relay invalidation_hub events until the client goes away."""
+    events = invalidation_hub.subscribe()
+    try:
+        while context.is_active():
+            try:
+                yield events.get(timeout=1)
+            except queue.Empty:
+                continue
+    finally:
+        invalidation_hub.unsubscribe(events)
+
+def invalidation_server(max_subscribers=MAX_SUBSCRIBERS):
+    """A gRPC server for SubscribeInvalidations alone, with its own threads.
+
+    Every stream holds a thread for as long as its subscriber runs. Here
+    they cannot take the MAX_WORKERS threads the other RPCs need; past
+    max_subscribers, new streams fail with RESOURCE_EXHAUSTED and the
+    client retries later.
+    """
+    server = grpc.server(
+        futures.ThreadPoolExecutor(max_workers=max_subscribers, thread_name_prefix="invalidations"),
+        maximum_concurrent_rpcs=max_subscribers
+    )
+    service = data_access_pb2.DESCRIPTOR.services_by_name["DataAccessService"].full_name
+    server.add_generic_rpc_handlers((grpc.method_handlers_generic_handler(service, {
+        "SubscribeInvalidations": grpc.unary_stream_rpc_method_handler(
+            stream_invalidations,
+            request_deserializer=data_access_pb2.InvalidationRequest.FromString,
+            response_serializer=InvalidationEvent.SerializeToString
+        ),
+    }),))
+    return server
 
 def serve():
-    interceptors = [ExceptionToStatusInterceptor()]
+    interceptors = [telemetry.ServerMetricsInterceptor(), ExceptionToStatusInterceptor()]
     server = grpc.server(
-        futures.ThreadPoolExecutor(max_workers=10), interceptors=interceptors
+        futures.ThreadPoolExecutor(max_workers=MAX_WORKERS), interceptors=interceptors
     )
     data_access_pb2_grpc.add_DataAccessServiceServicer_to_server(
         DataAccessService(), server
     )
 
+    stats_interval = float(os.environ.get("DB_POOL_STATS_INTERVAL", 0))
+    if stats_interval > 0:
+        threading.Thread(target=log_pool_stats, args=(stats_interval,), daemon=True).start()
+
+    threading.Thread(target=invalidation_hub.listen, daemon=True).start()
+    subscriptions = invalidation_server()
+    subscriptions.add_insecure_port(f"[::]:{INVALIDATION_PORT}")
+    subscriptions.start()
+    telemetry.start_metrics_server()
+
     server.add_insecure_port("[::]:50051")
     server.start()
     server.wait_for_termination()
 
 if __name__ == "__main__":
-    serve()
+    if os.environ.get("GRPC_ASYNC", "").lower() in ("1", "true", "yes"):
+        import asyncio
+        import data_access_aio
+        asyncio.run(data_access_aio.serve())
+    else:
+        serve()
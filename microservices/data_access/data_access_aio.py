@@ -0,0 +1,620 @@
+#!/usr/bin/env python3
+"""DataAccessService on grpc.aio and asyncpg.
+
+Serves the same RPCs with the same responses as data_access.DataAccessService,
+but a query waiting on PostgreSQL no longer holds a worker thread: concurrency
+is bounded by the asyncpg pool (DB_POOL_SIZE connections), not by MAX_WORKERS.
+The SQL, row converters and validation are shared with data_access; only the
+placeholders are rewritten for asyncpg.
+
+asyncpg runs every query as a named server-side prepared statement and keeps
+it per connection (up to DB_STATEMENT_CACHE_SIZE), so the fixed queries are
+parsed and planned once per pooled connection rather than on every call.
+
+Started by data_access.py when GRPC_ASYNC is set.
+"""
+import asyncio, math, os, re
+from decimal import Decimal
+from functools import lru_cache
+
+import asyncpg
+import grpc
+import data_access_pb2
+import data_access_pb2_grpc
+import telemetry
+from grpc_interceptor import AsyncExceptionToStatusInterceptor
+from data_access_pb2 import Job, Review, Company, JobPostingsResponse, JobReviewsResponse, CompaniesResponse, UpdateJobReviewResponse, JobPostingsForLargestCompaniesResponse, CreateReviewResponse, RemoteJobSearchResponse, BestPayingCompaniesResponse, DeleteReviewResponse, CompanyRatingAggregatesResponse, BestCitiesResponse, JobReviewRatingsResponse, JobSalaryStatsResponse, BulkBatchResult, BulkIngestResponse, InvalidationEvent
+from data_access import (
+    BEST_CITIES_SQL,
+    BEST_PAYING_COMPANIES_SQL,
+    COMPANY_RATING_AGGREGATES_SQL,
+    COMPANY_REVIEW_DEFAULT_FIELDS,
+    DELETE_REVIEW_SQL,
+    DELETED_REVIEW_COLUMNS,
+    INSERT_JOB_SQL,
+    INSERT_REVIEW_SQL,
+    INVALIDATION_CHANNEL,
+    INVALIDATION_PORT,
+    JOB_INSERT_COLUMNS,
+    JOB_REVIEW_RATINGS_SQL,
+    LOCATION_REVIEW_DEFAULT_FIELDS,
+    NOTIFY_SQL,
+    RATING_SUMMARIES,
+    REVIEW_INSERT_COLUMNS,
+    STREAM_CHUNK_SIZE,
+    approximate_total_from_plan,
+    approximate_total_query,
+    UPDATE_REVIEW_SQL,
+    best_company_from_row,
+    bulk_batch_size,
+    city_rating_from_row,
+    companies_with_employees_query,
+    company_rating_aggregate_from_row,
+    invalidation_event,
+    invalidation_payload,
+    job_for_largest_company_from_row,
+    job_salary_stats_from_row,
+    job_salary_stats_query,
+    jobs_with_title_and_city_query,
+    jobs_with_title_query,
+    largest_company_jobs_query,
+    message_from_tuple,
+    rating_summary_sql,
+    rating_totals,
+    remote_job_from_row,
+    remote_jobs_page,
+    remote_jobs_page_query,
+    remote_jobs_query,
+    review_change_keys,
+    review_data_from_message,
+    review_page_query,
+    reviews_with_title_and_city_query,
+    stream_largest_company_jobs_query,
+    stream_reviews_query,
+    title_and_city_rating_from_row,
+    valid_job_row,
+    valid_review_data,
+    write_origin,
+)
+
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", 20))
+DB_STATEMENT_CACHE_SIZE = int(os.environ.get("DB_STATEMENT_CACHE_SIZE", 100))
+
+_PLACEHOLDER = re.compile(r"%\((\w+)\)s|%s|%%")
+
+@lru_cache(maxsize=1024)
+def asyncpg_sql(query):
+    """Rewrite a psycopg2 query for asyncpg.
+
+    %s placeholders become $1, $2, ... in order, %(name)s placeholders are
+    numbered by first appearance and %% becomes %. Returns the query and,
+    for named placeholders, the names in $n order (otherwise None).
+    """
+    names = []
+    position = 0
+
+    def replace(match):
+        nonlocal position
+        if match.group(0) == "%%":
+            return "%"
+        name = match.group(1)
+        if name is None:
+            position += 1
+            return f"${position}"
+        if name not in names:
+            names.append(name)
+        return f"${names.index(name) + 1}"
+
+    return _PLACEHOLDER.sub(replace, query), tuple(names) or None
+
+def asyncpg_args(query, params):
+    sql, names = asyncpg_sql(query)
+    if names is not None:
+        params = [params[name] for name in names]
+    return sql, params
+
+# Every query goes through these helpers (or times itself), so the db
+# stage of each call covers all of its round trips; see telemetry.stage.
+
+async def fetch(conn, query, params=()):
+    sql, params = asyncpg_args(query, params)
+    with telemetry.stage("db"):
+        return await conn.fetch(sql, *params)
+
+async def fetchrow(conn, query, params=()):
+    sql, params = asyncpg_args(query, params)
+    with telemetry.stage("db"):
+        return await conn.fetchrow(sql, *params)
+
+async def execute(conn, query, params=()):
+    sql, params = asyncpg_args(query, params)
+    with telemetry.stage("db"):
+        return await conn.execute(sql, *params)
+
+# asyncpg encodes parameters by their column type and does not coerce the
+# way a psycopg2 literal does, so a few values are converted up front.
+
+def pg_numeric(value):
+    # psycopg2 sends floats as repr(); keep the same digits for NUMERIC.
+    return Decimal(repr(value))
+
+def pg_round(value):
+    # Postgres rounds NUMERIC -> INT half away from zero.
+    return int(math.copysign(math.floor(abs(value) + 0.5), value))
+
+async def stream_records(conn, query, params, chunk_size):
+    """Async counterpart of data_access.stream_rows, on an asyncpg cursor."""
+    sql, params = asyncpg_args(query, params)
+    async with conn.transaction():
+        with telemetry.stage("db"):
+            cursor = await conn.cursor(sql, *params)
+        while True:
+            # One FETCH per chunk.
+            with telemetry.stage("db"):
+                chunk = await cursor.fetch(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+async def update_rating_summaries(conn, removed=(), added=()):
+    """Async counterpart of data_access.update_rating_summaries."""
+    rows = [(row, -1) for row in removed] + [(row, 1) for row in added]
+    for table, key, columns in RATING_SUMMARIES:
+        totals = rating_totals(rows, key, columns)
+        if not totals:
+            continue
+        upsert, cleanup = rating_summary_sql(table, key, columns)
+        # Key order, as in data_access.upsert_rating_summary.
+        values = [(k, *v) for k, v in sorted(totals.items())]
+        upsert = upsert.replace("VALUES %s", "VALUES (" + ", ".join(["%s"] * len(values[0])) + ")")
+        with telemetry.stage("db"):
+            await conn.executemany(asyncpg_sql(upsert)[0], values)
+        await execute(conn, cleanup, (list(totals),))
+
+async def notify_change(conn, table, **keys):
+    await execute(conn, NOTIFY_SQL, (INVALIDATION_CHANNEL, invalidation_payload(table, **keys)))
+
+async def notify_review_change(conn, rows, origin=""):
+    await notify_change(conn, "reviews", origin=origin, **review_change_keys(rows))
+
+async def write_review_batch(conn, rows):
+    records = [[row[c] for c in REVIEW_INSERT_COLUMNS] for row in rows]
+    with telemetry.stage("db"):
+        await conn.copy_records_to_table("reviews", records=records, columns=REVIEW_INSERT_COLUMNS)
+    await update_rating_summaries(conn, added=rows)
+    await notify_review_change(conn, rows)
+
+async def write_job_batch(conn, rows):
+    records = [(*row[:-1], pg_numeric(row[-1])) for row in rows]
+    with telemetry.stage("db"):
+        await conn.copy_records_to_table("jobs", records=records, columns=JOB_INSERT_COLUMNS)
+    await notify_change(conn, "jobs", titles=[row[0] for row in rows])
+
+async def ingest_in_batches(pool, messages, batch_size, to_row, write_batch):
+    """Async counterpart of data_access.ingest_in_batches."""
+    results = []
+    pending = []
+    invalid = 0
+
+    async def flush():
+        result = BulkBatchResult(batch=len(results) + 1, rejected=invalid)
+        if pending:
+            try:
+                async with pool.acquire() as conn:
+                    async with conn.transaction():
+                        await write_batch(conn, pending)
+                result.accepted = len(pending)
+            except Exception as e:
+                print(f"Error writing bulk batch {result.batch}: {e}")
+                result.rejected += len(pending)
+                result.error = str(e)
+        results.append(result)
+
+    async for message in messages:
+        row = to_row(message)
+        if row is None:
+            invalid += 1
+        else:
+            pending.append(row)
+        if len(pending) + invalid >= batch_size:
+            await flush()
+            pending, invalid = [], 0
+
+    if pending or invalid:
+        await flush()
+
+    return BulkIngestResponse(
+        accepted=sum(r.accepted for r in results),
+        rejected=sum(r.rejected for r in results),
+        batch=results
+    )
+
+class AsyncInvalidationHub:
+    """Async counterpart of data_access.InvalidationHub, on asyncpg's LISTEN."""
+
+    def __init__(self, queue_size=1000):
+        self._queue_size = queue_size
+        self._subscribers = set()
+
+    def subscribe(self):
+        events = asyncio.Queue(maxsize=self._queue_size)
+        events.put_nowait(InvalidationEvent(reset=True))
+        self._subscribers.add(events)
+        return events
+
+    def unsubscribe(self, events):
+        self._subscribers.discard(events)
+
+    def publish(self, event):
+        for events in list(self._subscribers):
+            try:
+                events.put_nowait(event)
+            except asyncio.QueueFull:
+                while not events.empty():
+                    events.get_nowait()
+                events.put_nowait(InvalidationEvent(reset=True))
+
+    async def listen(self, connect, poll_interval=5.0, retry_interval=5.0):
+        """Forward notifications forever, reconnecting after errors."""
+        while True:
+            conn = None
+            try:
+                conn = await connect()
+                await conn.add_listener(
+                    INVALIDATION_CHANNEL,
+                    lambda _conn, _pid, _channel, payload: self.publish(invalidation_event(payload))
+                )
+                # Anything committed while we were not listening is lost.
+                self.publish(InvalidationEvent(reset=True))
+                while True:
+                    await asyncio.sleep(poll_interval)
+                    await conn.execute("SELECT 1")
+            except Exception as e:
+                print(f"Error listening for invalidations: {e}")
+            finally:
+                if conn is not None and not conn.is_closed():
+                    await conn.close()
+            await asyncio.sleep(retry_interval)
+
+class AsyncDataAccessService(data_access_pb2_grpc.DataAccessServiceServicer):
+    def __init__(self, pool, invalidations):
+        self.pool = pool
+        self.invalidations = invalidations
+
+    async def GetJobPostingsWithTitle(self, request, context):
+        query, params, projection = jobs_with_title_query(request)
+        try:
+            async with self.pool.acquire() as conn:
+                rows = await fetch(conn, query, params)
+            return JobPostingsResponse(job=[message_from_tuple(Job, projection, row) for row in rows])
+        except Exception as e:
+            print(f"Error in GetJobPostingsWithTitle: {e}")
+            return JobPostingsResponse(job=[])
+
+    async def GetJobPostingsWithTitleAndCity(self, request, context):
+        query, params, projection = jobs_with_title_and_city_query(request)
+        try:
+            async with self.pool.acquire() as conn:
+                rows = await fetch(conn, query, params)
+            return JobPostingsResponse(job=[message_from_tuple(Job, projection, row) for row in rows])
+        except Exception as e:
+            print(f"Error in GetJobPostingsWithTitleAndCity: {e}")
+            return JobPostingsResponse(job=[])
+
+    async def GetJobPostingsForLargestCompanies(self, request, context):
+        try:
+            async with self.pool.acquire() as conn:
+                rows = await fetch(conn, *largest_company_jobs_query(request))
+            next_cursor = rows[-1]["job_id"] if rows else request.after_job_id
+            return JobPostingsForLargestCompaniesResponse(
+                job=[job_for_largest_company_from_row(row) for row in rows],
+                next_cursor=next_cursor
+            )
+        except Exception as e:
+            print(f"Error in GetJobPostingsForLargestCompanies: {e}")
+            return JobPostingsForLargestCompaniesResponse(job=[])
+
+    async def GetCompaniesWithEmployees(self, request, context):
+        query, params, projection = companies_with_employees_query(request)
+        try:
+            async with self.pool.acquire() as conn:
+                rows = await fetch(conn, query, params)
+            return CompaniesResponse(company=[message_from_tuple(Company, projection, row) for row in rows])
+        except Exception as e:
+            print(f"Error in GetCompaniesWithEmployees: {e}")
+            return CompaniesResponse(company=[])
+
+    async def GetJobReviewsForCompanyReview(self, request, context):
+        query, params, projection = review_page_query(request, COMPANY_REVIEW_DEFAULT_FIELDS)
+        try:
+            async with self.pool.acquire() as conn:
+                rows = await fetch(conn, query, params)
+            return JobReviewsResponse(
+                review=[message_from_tuple(Review, projection, row) for row in rows],
+                next_cursor=rows[-1][0] if rows else request.after_id
+            )
+        except Exception as e:
+            print(f"Error in GetJobReviewsForCompanyReview: {e}")
+            return JobReviewsResponse(review=[])
+
+    async def GetJobReviewsForLocationReview(self, request, context):
+        query, params, projection = review_page_query(request, LOCATION_REVIEW_DEFAULT_FIELDS)
+        try:
+            async with self.pool.acquire() as conn:
+                rows = await fetch(conn, query, params)
+            return JobReviewsResponse(
+                review=[message_from_tuple(Review, projection, row) for row in rows],
+                next_cursor=rows[-1][0] if rows else request.after_id
+            )
+        except Exception as e:
+            print(f"Error in GetJobReviewsForLocationReview: {e}")
+            return JobReviewsResponse(review=[])
+
+    async def UpdateJobReview(self, request, context):
+        try:
+            async with self.pool.acquire() as conn:
+                async with conn.transaction():
+                    row = await fetchrow(conn, UPDATE_REVIEW_SQL, (
+                        request.current_status, pg_round(request.rating), request.headline, request.id
+                    ))
+                    if row is None:
+                        return UpdateJobReviewResponse(success=False, message="Review not found")
+
+                    updated = dict(row)
+                    previous = dict(updated, overall_rating=updated["old_overall_rating"])
+                    await update_rating_summaries(conn, removed=[previous], added=[updated])
+                    await notify_review_change(conn, [updated], write_origin(context))
+
+            return UpdateJobReviewResponse(success=True, message="Review updated successfully")
+        except Exception as e:
+            print(f"Error in UpdateJobReview: {e}")
+            return UpdateJobReviewResponse(success=False, message=str(e))
+
+    async def GetJobReviewsWithTitleAndCity(self, request, context):
+        query, params, projection = reviews_with_title_and_city_query(request)
+        try:
+            async with self.pool.acquire() as conn:
+                rows = await fetch(conn, query, params)
+            return JobReviewsResponse(review=[message_from_tuple(Review, projection, row) for row in rows])
+        except Exception as e:
+            print(f"Error in GetJobReviewsWithTitleAndCity: {e}")
+            return JobReviewsResponse(review=[])
+
+    async def CreateReview(self, request, context):
+        try:
+            review_data = review_data_from_message(request.review)
+
+            async with self.pool.acquire() as conn:
+                async with conn.transaction():
+                    row = await fetchrow(conn, INSERT_REVIEW_SQL, review_data)
+                    await update_rating_summaries(conn, added=[review_data])
+                    await notify_review_change(conn, [dict(review_data, id=row["id"])], write_origin(context))
+
+            return CreateReviewResponse(success="Review added successfully.", review_id=row["id"])
+        except Exception as e:
+            print(f"Error in CreateReview: {e}")
+            return CreateReviewResponse(success="Failed to add review.")
+
+    async def PostJobInDB(self, request, context):
+        try:
+            async with self.pool.acquire() as conn:
+                async with conn.transaction():
+                    row = await fetchrow(conn, INSERT_JOB_SQL, (
+                        request.title,
+                        request.company_name,
+                        request.description,
+                        request.location,
+                        pg_numeric(request.normalized_salary),
+                    ))
+                    await notify_change(conn, "jobs", titles=[request.title])
+
+            return data_access_pb2.PostJobResponse(
+                message="Job successfully inserted",
+                status=200,
+                job_id=str(row["job_id"])
+            )
+        except Exception as e:
+            print(f"Error in PostJobInDB: {e}")
+            return data_access_pb2.PostJobResponse(
+                message=f"Erro ao atualizar ou inserir o trabalho: {e}",
+                status=500
+            )
+
+    async def GetRemoteJobs(self, request, context):
+        query, params, page_size = remote_jobs_page_query(request)
+        try:
+            async with self.pool.acquire() as conn:
+                rows = await fetch(conn, query, params)
+                response = remote_jobs_page(request, rows, page_size)
+                if request.include_total:
+                    plan = await fetchrow(conn, *approximate_total_query(request))
+                    response.approximate_total = approximate_total_from_plan(plan[0])
+            return response
+        except Exception as e:
+            print(f"Error in GetRemoteJobs: {e}")
+            context.set_details(f"Database query failed: {str(e)}")
+            context.set_code(grpc.StatusCode.INTERNAL)
+            return RemoteJobSearchResponse(jobs=[])
+
+    async def GetBestPayingCompanies(self, request, context):
+        if not request.title:
+            context.set_details("Job title is required")
+            context.set_code(grpc.StatusCode.INVALID_ARGUMENT)
+            return BestPayingCompaniesResponse()
+
+        try:
+            async with self.pool.acquire() as conn:
+                rows = await fetch(conn, BEST_PAYING_COMPANIES_SQL, (request.title,))
+            return BestPayingCompaniesResponse(companies=[best_company_from_row(row) for row in rows])
+        except Exception as e:
+            print(f"Error in GetBestPayingCompanies: {e}")
+            context.set_details(f"Database query failed: {str(e)}")
+            context.set_code(grpc.StatusCode.INTERNAL)
+            return BestPayingCompaniesResponse()
+
+    async def GetJobSalaryStats(self, request, context):
+        if not request.title:
+            context.set_details("Job title is required")
+            context.set_code(grpc.StatusCode.INVALID_ARGUMENT)
+            return JobSalaryStatsResponse()
+
+        try:
+            async with self.pool.acquire() as conn:
+                row = await fetchrow(conn, *job_salary_stats_query(request))
+            return job_salary_stats_from_row(row)
+        except Exception as e:
+            print(f"Error in GetJobSalaryStats: {e}")
+            context.set_details(f"Database query failed: {str(e)}")
+            context.set_code(grpc.StatusCode.INTERNAL)
+            return JobSalaryStatsResponse()
+
+    async def DeleteReview(self, request, context):
+        try:
+            async with self.pool.acquire() as conn:
+                async with conn.transaction():
+                    row = await fetchrow(conn, DELETE_REVIEW_SQL, (int(request.review_id),))
+                    if row is None:
+                        context.set_code(grpc.StatusCode.NOT_FOUND)
+                        context.set_details("Review not found")
+                        return DeleteReviewResponse(success=False, message="Review not found")
+
+                    deleted = dict(zip(DELETED_REVIEW_COLUMNS, row))
+                    await update_rating_summaries(conn, removed=[deleted])
+                    await notify_review_change(conn, [deleted], write_origin(context))
+
+            return DeleteReviewResponse(success=True, message="Review deleted successfully")
+        except Exception as e:
+            print(f"Error in DeleteReview: {e}")
+            context.set_code(grpc.StatusCode.INTERNAL)
+            context.set_details(f"Error deleting Review: {str(e)}")
+            return DeleteReviewResponse(success=False, message="Error deleting Review")
+
+    async def GetCompanyRatingAggregates(self, request, context):
+        try:
+            async with self.pool.acquire() as conn:
+                rows = await fetch(conn, COMPANY_RATING_AGGREGATES_SQL)
+            return CompanyRatingAggregatesResponse(company=[company_rating_aggregate_from_row(row) for row in rows])
+        except Exception as e:
+            print(f"Error in GetCompanyRatingAggregates: {e}")
+            context.set_code(grpc.StatusCode.INTERNAL)
+            context.set_details(f"Database query failed: {str(e)}")
+            return CompanyRatingAggregatesResponse()
+
+    async def GetBestCities(self, request, context):
+        try:
+            async with self.pool.acquire() as conn:
+                rows = await fetch(conn, BEST_CITIES_SQL, (request.limit or 10,))
+            return BestCitiesResponse(city=[city_rating_from_row(row) for row in rows])
+        except Exception as e:
+            print(f"Error in GetBestCities: {e}")
+            context.set_code(grpc.StatusCode.INTERNAL)
+            context.set_details(f"Database query failed: {str(e)}")
+            return BestCitiesResponse()
+
+    async def GetJobReviewRatingsForTitlesAndCities(self, request, context):
+        try:
+            if not request.pair:
+                return JobReviewRatingsResponse()
+
+            async with self.pool.acquire() as conn:
+                rows = await fetch(conn, JOB_REVIEW_RATINGS_SQL, (
+                    [pair.title for pair in request.pair],
+                    [pair.city for pair in request.pair],
+                ))
+            return JobReviewRatingsResponse(rating=[title_and_city_rating_from_row(row) for row in rows])
+        except Exception as e:
+            print(f"Error in GetJobReviewRatingsForTitlesAndCities: {e}")
+            context.set_code(grpc.StatusCode.INTERNAL)
+            context.set_details(f"Database query failed: {str(e)}")
+            return JobReviewRatingsResponse()
+
+    async def StreamJobReviews(self, request, context):
+        query, params, projection = stream_reviews_query(request)
+        try:
+            async with self.pool.acquire() as conn:
+                async for rows in stream_records(conn, query, params, request.limit or STREAM_CHUNK_SIZE):
+                    yield JobReviewsResponse(
+                        review=[message_from_tuple(Review, projection, row) for row in rows],
+                        next_cursor=rows[-1][0]
+                    )
+        except Exception as e:
+            print(f"Error in StreamJobReviews: {e}")
+            context.set_code(grpc.StatusCode.INTERNAL)
+            context.set_details(f"Database query failed: {str(e)}")
+
+    async def StreamJobPostingsForLargestCompanies(self, request, context):
+        try:
+            async with self.pool.acquire() as conn:
+                query, params = stream_largest_company_jobs_query(request)
+                async for rows in stream_records(conn, query, params, request.limit or STREAM_CHUNK_SIZE):
+                    yield JobPostingsForLargestCompaniesResponse(
+                        job=[job_for_largest_company_from_row(row) for row in rows],
+                        next_cursor=rows[-1]["job_id"]
+                    )
+        except Exception as e:
+            print(f"Error in StreamJobPostingsForLargestCompanies: {e}")
+            context.set_code(grpc.StatusCode.INTERNAL)
+            context.set_details(f"Database query failed: {str(e)}")
+
+    async def StreamRemoteJobs(self, request, context):
+        try:
+            async with self.pool.acquire() as conn:
+                query, params = remote_jobs_query(request)
+                async for rows in stream_records(conn, query, params, STREAM_CHUNK_SIZE):
+                    yield RemoteJobSearchResponse(jobs=[remote_job_from_row(row) for row in rows])
+        except Exception as e:
+            print(f"Error in StreamRemoteJobs: {e}")
+            context.set_code(grpc.StatusCode.INTERNAL)
+            context.set_details(f"Database query failed: {str(e)}")
+
+    async def BulkCreateReviews(self, request_iterator, context):
+        return await ingest_in_batches(self.pool, request_iterator, bulk_batch_size(context), valid_review_data, write_review_batch)
+
+    async def BulkPostJobs(self, request_iterator, context):
+        return await ingest_in_batches(self.pool, request_iterator, bulk_batch_size(context), valid_job_row, write_job_batch)
+
+    async def SubscribeInvalidations(self, request, context):
+        events = self.invalidations.subscribe()
+        try:
+            while True:
+                yield await events.get()
+        finally:
+            self.invalidations.unsubscribe(events)
+
+def db_connect_args():
+    return {
+        "host": os.environ.get("DB_HOST"),
+        "port": int(os.environ.get("DB_PORT", 5432)),
+        "database": os.environ.get("DB_NAME"),
+        "user": os.environ.get("DB_USER"),
+        "password": os.environ.get("DB_PASSWORD"),
+    }
+
+async def serve():
+    pool = await asyncpg.create_pool(
+        min_size=1,
+        max_size=DB_POOL_SIZE,
+        statement_cache_size=DB_STATEMENT_CACHE_SIZE,
+        **db_connect_args()
+    )
+    invalidations = AsyncInvalidationHub()
+    listener = asyncio.create_task(invalidations.listen(lambda: asyncpg.connect(**db_connect_args())))
+
+    server = grpc.aio.server(interceptors=[telemetry.AsyncServerMetricsInterceptor(), AsyncExceptionToStatusInterceptor()])
+    data_access_pb2_grpc.add_DataAccessServiceServicer_to_server(
+        AsyncDataAccessService(pool, invalidations), server
+    )
+    telemetry.start_metrics_server()
+    server.add_insecure_port("[::]:50051")
+    # Streams cost no thread here, so SubscribeInvalidations is served on
+    # both ports; clients use the one the sync server reserves for it.
+    server.add_insecure_port(f"[::]:{INVALIDATION_PORT}")
+    await server.start()
+    try:
+        await server.wait_for_termination()
+    finally:
+        listener.cancel()
+        await pool.close()
+
+if __name__ == "__main__":
+    asyncio.run(serve())
@@ -0,0 +1,32 @@
+import os
+import sys
+import tempfile
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SERVICE = os.path.dirname(HERE)
+COMMON = os.path.join(SERVICE, "..", "common")
+
+
+def generate_stubs():
+    """Compile data-access.proto into a temp dir, as the Dockerfile does."""
+    out = tempfile.mkdtemp(prefix="data_access_stubs_")
+    proto_dir = os.path.join(SERVICE, "protobuf")
+    status = protoc.main([
+        "protoc", f"-I{proto_dir}", f"--python_out={out}", f"--grpc_python_out={out}",
+        os.path.join(proto_dir, "data-access.proto"),
+    ])
+    if status != 0:
+        raise RuntimeError("protoc failed on data-access.proto")
+    return out
+
+
+try:
+    import grpc_interceptor  # noqa: F401
+    import prometheus_client  # noqa: F401
+    import psycopg2  # noqa: F401
+    from grpc_tools import protoc
+except ImportError:
+    # data_access cannot be imported without its service dependencies.
+    collect_ignore_glob = ["test_*.py"]
+else:
+    sys.path[:0] = [generate_stubs(), SERVICE, COMMON]
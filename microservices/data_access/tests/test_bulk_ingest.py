@@ -0,0 +1,108 @@
+import psycopg2.extensions
+import pytest
+
+import data_access
+from grpc_interceptor.exceptions import InvalidArgument
+
+
+class FakeConnection:
+    closed = 0
+
+    def __init__(self, log):
+        self.log = log
+
+    def cursor(self):
+        return FakeCursor()
+
+    def commit(self):
+        self.log.append("commit")
+
+    def rollback(self):
+        self.log.append("rollback")
+
+    def get_transaction_status(self):
+        return psycopg2.extensions.TRANSACTION_STATUS_IDLE
+
+
+class FakeCursor:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class FakeContext:
+    def __init__(self, metadata=()):
+        self.metadata = tuple(metadata)
+
+    def invocation_metadata(self):
+        return self.metadata
+
+
+@pytest.fixture
+def transactions(monkeypatch):
+    log = []
+    monkeypatch.setattr(data_access, "db_pool", data_access.ConnectionPool(lambda: FakeConnection(log), size=1))
+    return log
+
+
+def positive(value):
+    return value if value > 0 else None
+
+
+def test_batches_count_accepted_and_rejected_rows(transactions):
+    written = []
+    response = data_access.ingest_in_batches([1, -1, 2, 3, -2, 4, 5], 3, positive, lambda cursor, rows: written.append(rows))
+
+    assert written == [[1, 2], [3, 4], [5]]
+    assert [(r.batch, r.accepted, r.rejected) for r in response.batch] == [(1, 2, 1), (2, 2, 1), (3, 1, 0)]
+    assert (response.accepted, response.rejected) == (5, 2)
+    assert transactions == ["commit"] * 3
+
+
+def test_a_failed_batch_is_rolled_back_and_rejected_whole(transactions):
+    def write(cursor, rows):
+        if 3 in rows:
+            raise RuntimeError("duplicate key")
+
+    response = data_access.ingest_in_batches([1, 2, 3, -1, 5], 2, positive, write)
+
+    assert [(r.accepted, r.rejected, r.error) for r in response.batch] == [(2, 0, ""), (0, 2, "duplicate key"), (1, 0, "")]
+    assert (response.accepted, response.rejected) == (3, 2)
+    assert transactions == ["commit", "rollback", "commit"]
+    assert data_access.db_pool.stats()["in_use"] == 0
+
+
+def test_batches_of_only_invalid_rows_skip_the_database(transactions):
+    response = data_access.ingest_in_batches([-1, -2, -3], 2, positive, lambda cursor, rows: None)
+
+    assert [(r.accepted, r.rejected) for r in response.batch] == [(0, 2), (0, 1)]
+    assert transactions == []
+
+
+def test_batch_size_comes_from_metadata_and_is_capped():
+    assert data_access.bulk_batch_size(FakeContext()) == data_access.BULK_BATCH_SIZE
+    assert data_access.bulk_batch_size(FakeContext([("batch-size", "25")])) == 25
+    assert data_access.bulk_batch_size(FakeContext([("batch-size", "10000000")])) == data_access.BULK_MAX_BATCH_SIZE
+
+
+@pytest.mark.parametrize("value", ["0", "-5", "ten", ""])
+def test_bad_batch_sizes_are_invalid_arguments(value):
+    with pytest.raises(InvalidArgument):
+        data_access.bulk_batch_size(FakeContext([("batch-size", value)]))
+
+
+def test_summary_upserts_run_in_key_order(monkeypatch):
+    upserts = []
+    monkeypatch.setattr(data_access.psycopg2.extras, "execute_values", lambda cursor, sql, rows: upserts.append([row[0] for row in rows]))
+    review = dict.fromkeys(data_access.LOCATION_RATING_COLUMNS, 3.0)
+    rows = [dict(review, firm=firm, location=location) for firm, location in [("b", "Porto"), ("c", "Braga"), ("a", "Lisbon")]]
+
+    class Cursor:
+        def execute(self, sql, params):
+            pass
+
+    data_access.update_rating_summaries(Cursor(), added=rows)
+
+    assert upserts == [["a", "b", "c"], ["Braga", "Lisbon", "Porto"]]
@@ -0,0 +1,144 @@
+import threading
+import time
+
+import psycopg2
+import psycopg2.extensions
+import pytest
+
+from data_access import ConnectionPool
+
+
+class FakeConnection:
+    def __init__(self, number):
+        self.number = number
+        self.closed = 0
+        self.status = psycopg2.extensions.TRANSACTION_STATUS_IDLE
+        self.pings = 0
+        self.ping_fails = False
+
+    def get_transaction_status(self):
+        if self.closed:
+            raise psycopg2.InterfaceError("connection already closed")
+        return self.status
+
+    def rollback(self):
+        if self.closed:
+            raise psycopg2.InterfaceError("connection already closed")
+        self.status = psycopg2.extensions.TRANSACTION_STATUS_IDLE
+
+    def close(self):
+        self.closed = 1
+
+    def cursor(self):
+        return FakeCursor(self)
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, query):
+        self.conn.pings += 1
+        if self.conn.ping_fails:
+            raise psycopg2.OperationalError("server closed the connection unexpectedly")
+
+
+class Connector:
+    def __init__(self):
+        self.opened = []
+        self.fail = False
+
+    def __call__(self):
+        if self.fail:
+            raise psycopg2.OperationalError("could not connect to server")
+        conn = FakeConnection(len(self.opened))
+        self.opened.append(conn)
+        return conn
+
+
+def test_connections_are_opened_lazily_and_reused():
+    connect = Connector()
+    pool = ConnectionPool(connect, size=2)
+    assert connect.opened == []
+
+    conn = pool.getconn()
+    pool.putconn(conn)
+
+    assert pool.getconn() is conn
+    assert len(connect.opened) == 1
+    stats = pool.stats()
+    assert (stats["opened"], stats["in_use"], stats["checkouts"]) == (1, 1, 2)
+
+
+def test_open_transactions_are_rolled_back_on_return():
+    pool = ConnectionPool(Connector(), size=1)
+    conn = pool.getconn()
+    conn.status = psycopg2.extensions.TRANSACTION_STATUS_INTRANS
+
+    pool.putconn(conn)
+
+    assert conn.status == psycopg2.extensions.TRANSACTION_STATUS_IDLE
+    assert pool.stats()["idle"] == 1
+
+
+def test_closed_connections_are_dropped_on_return():
+    connect = Connector()
+    pool = ConnectionPool(connect, size=1)
+    conn = pool.getconn()
+    conn.close()
+
+    pool.putconn(conn)
+    replacement = pool.getconn()
+
+    assert replacement is not conn and len(connect.opened) == 2
+    assert pool.stats()["recycled"] == 1
+
+
+def test_connections_idle_past_the_check_interval_are_pinged():
+    connect = Connector()
+    pool = ConnectionPool(connect, size=1, check_interval=0)
+    conn = pool.getconn()
+    pool.putconn(conn)
+
+    assert pool.getconn() is conn and conn.pings == 1
+    pool.putconn(conn)
+
+    conn.ping_fails = True
+    replacement = pool.getconn()
+    assert replacement is not conn and conn.closed
+    assert pool.stats()["recycled"] == 1
+
+
+def test_a_failed_connect_releases_its_slot():
+    connect = Connector()
+    pool = ConnectionPool(connect, size=1)
+    connect.fail = True
+
+    with pytest.raises(psycopg2.OperationalError):
+        pool.getconn()
+
+    connect.fail = False
+    assert pool.getconn() is connect.opened[0]
+    assert pool.stats()["opened"] == 1
+
+
+def test_checkout_waits_for_a_returned_connection():
+    pool = ConnectionPool(Connector(), size=1)
+    conn = pool.getconn()
+    got = []
+
+    waiter = threading.Thread(target=lambda: got.append(pool.getconn()))
+    waiter.start()
+    time.sleep(0.05)
+    assert got == []
+
+    pool.putconn(conn)
+    waiter.join(timeout=1)
+    assert got == [conn]
+    assert pool.stats()["wait_time_seconds"] >= 0.05
@@ -0,0 +1,59 @@
+import pytest
+
+import data_access
+from data_access_pb2 import CompaniesRequest, Job, JobReviewsRequest, Review
+from grpc_interceptor.exceptions import InvalidArgument
+
+
+def names(projection):
+    return [name for name, _ in projection]
+
+
+def test_empty_mask_selects_the_default_or_every_field():
+    assert names(data_access.field_projection(data_access.COMPANY_FIELDS, [])) == ["company_id", "employee_count", "follower_count"]
+    assert names(data_access.field_projection(data_access.JOB_FIELDS, [], default=("title",))) == ["title"]
+
+
+def test_required_fields_come_first_once():
+    projection = data_access.field_projection(data_access.REVIEW_FIELDS, ["firm", "id", "firm"], required=("id",))
+
+    assert names(projection) == ["id", "firm"]
+
+
+def test_unknown_fields_are_invalid_arguments():
+    with pytest.raises(InvalidArgument, match="salary, nope"):
+        data_access.field_projection(data_access.JOB_FIELDS, ["title", "salary", "nope"])
+
+
+def test_rows_fill_only_the_projected_fields():
+    projection = data_access.field_projection(data_access.JOB_FIELDS, ["job_id", "title", "company_id", "views"])
+    job = data_access.message_from_tuple(Job, projection, (42, "Engineer", None, None))
+
+    assert (job.job_id, job.title, job.company_id, job.views) == (42, "Engineer", 0, 0.0)
+    assert job.description == "" and job.med_salary == 0.0
+
+
+def test_review_pages_select_the_mask_with_the_id_first():
+    query, params, projection = data_access.review_page_query(
+        JobReviewsRequest(limit=5, after_id=10, fields=["location", "overall_rating"]),
+        data_access.LOCATION_REVIEW_DEFAULT_FIELDS,
+    )
+
+    assert query == "SELECT id, location, overall_rating FROM reviews WHERE id > %s ORDER BY id LIMIT %s"
+    assert params == (10, 5)
+    review = data_access.message_from_tuple(Review, projection, (11, "Lisbon", None))
+    assert (review.id, review.location, review.overall_rating) == (11, "Lisbon", 0)
+
+
+def test_review_pages_fall_back_to_the_rpc_defaults():
+    query, params, _ = data_access.review_page_query(JobReviewsRequest(limit=5, offset=20), data_access.COMPANY_REVIEW_DEFAULT_FIELDS)
+
+    assert query.startswith("SELECT " + ", ".join(data_access.COMPANY_REVIEW_DEFAULT_FIELDS) + " FROM reviews")
+    assert params == (5, 20)
+
+
+def test_companies_query_defaults_limit_to_ten():
+    query, params, _ = data_access.companies_with_employees_query(CompaniesRequest(fields=["company_id"]))
+
+    assert query.split()[:3] == ["SELECT", "company_id", "FROM"]
+    assert params == (10, 0)
@@ -0,0 +1,100 @@
+import queue
+import threading
+
+import grpc
+import pytest
+
+import data_access
+from data_access_pb2 import InvalidationEvent, InvalidationRequest
+from data_access_pb2_grpc import DataAccessServiceStub
+
+
+def drain(events):
+    drained = []
+    while True:
+        try:
+            drained.append(events.get_nowait())
+        except queue.Empty:
+            return drained
+
+
+def test_events_fan_out_to_every_subscriber():
+    hub = data_access.InvalidationHub(connect=None)
+    first, second = hub.subscribe(), hub.subscribe()
+
+    hub.publish(InvalidationEvent(table="jobs", titles=["Engineer"]))
+
+    for events in (first, second):
+        assert [(e.reset, e.table) for e in drain(events)] == [(True, ""), (False, "jobs")]
+
+
+def test_unsubscribed_queues_get_nothing_more():
+    hub = data_access.InvalidationHub(connect=None)
+    kept, dropped = hub.subscribe(), hub.subscribe()
+    hub.unsubscribe(dropped)
+    drain(dropped)
+
+    hub.publish(InvalidationEvent(table="reviews"))
+
+    assert drain(dropped) == []
+    assert [e.table for e in drain(kept)] == ["", "reviews"]
+    hub.unsubscribe(dropped)  # Unsubscribing twice is harmless.
+
+
+def test_a_subscriber_that_falls_behind_has_its_backlog_replaced_by_a_reset():
+    hub = data_access.InvalidationHub(connect=None, queue_size=3)
+    events = hub.subscribe()
+
+    for i in range(10):
+        hub.publish(InvalidationEvent(table="jobs", titles=[str(i)]))
+
+    drained = drain(events)
+    assert len(drained) <= 3
+    assert drained[0].reset and not any(e.reset for e in drained[1:])
+    # Only events published after the reset follow it.
+    assert drained[-1].titles == ["9"]
+
+
+@pytest.fixture
+def subscription_server(monkeypatch):
+    hub = data_access.InvalidationHub(connect=None)
+    monkeypatch.setattr(data_access, "invalidation_hub", hub)
+    server = data_access.invalidation_server(max_subscribers=2)
+    port = server.add_insecure_port("127.0.0.1:0")
+    server.start()
+    channel = grpc.insecure_channel(f"127.0.0.1:{port}")
+    yield hub, DataAccessServiceStub(channel)
+    channel.close()
+    server.stop(None)
+
+
+def test_subscription_server_streams_hub_events(subscription_server):
+    hub, stub = subscription_server
+    streams = [stub.SubscribeInvalidations(InvalidationRequest()) for _ in range(2)]
+    # The first message on every stream is a reset.
+    assert [next(stream).reset for stream in streams] == [True, True]
+
+    hub.publish(InvalidationEvent(table="reviews", review_ids=[4]))
+
+    assert [list(next(stream).review_ids) for stream in streams] == [[4], [4]]
+    for stream in streams:
+        stream.cancel()
+
+
+def test_subscribers_past_the_limit_are_turned_away(subscription_server):
+    hub, stub = subscription_server
+    streams = [stub.SubscribeInvalidations(InvalidationRequest()) for _ in range(2)]
+    for stream in streams:
+        next(stream)
+
+    with pytest.raises(grpc.RpcError) as error:
+        next(stub.SubscribeInvalidations(InvalidationRequest()))
+    assert error.value.code() == grpc.StatusCode.RESOURCE_EXHAUSTED
+
+    streams[0].cancel()
+    deadline = threading.Event()
+    while len(hub._subscribers) > 1 and not deadline.wait(0.05):
+        pass
+    assert len(hub._subscribers) == 1
+    for stream in streams[1:]:
+        stream.cancel()
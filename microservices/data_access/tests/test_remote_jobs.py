@@ -0,0 +1,87 @@
+import base64
+import json
+
+import pytest
+
+import data_access
+from data_access_pb2 import RemoteJobSearchRequest
+from grpc_interceptor.exceptions import InvalidArgument
+
+
+def job_row(job_id, rank=None):
+    row = {
+        "job_id": job_id, "title": "Engineer", "company": "Acme", "description": None,
+        "location": "Remote", "views": 1.0, "remote_allowed": True,
+    }
+    if rank is not None:
+        row["rank"] = rank
+    return row
+
+
+def next_request(request, token):
+    following = RemoteJobSearchRequest()
+    following.CopyFrom(request)
+    following.page_token = token
+    return following
+
+
+def test_first_page_fetches_one_row_past_the_page():
+    request = RemoteJobSearchRequest(city="Lisbon", page_size=2)
+    query, params, page_size = data_access.remote_jobs_page_query(request)
+
+    assert page_size == 2
+    assert "job_id >" not in query
+    assert query.endswith("ORDER BY job_id LIMIT %s")
+    assert params == ("%Lisbon%", 3)
+
+
+def test_next_page_starts_after_the_last_job_returned():
+    request = RemoteJobSearchRequest(page_size=2)
+    response = data_access.remote_jobs_page(request, [job_row(10), job_row(11), job_row(12)], 2)
+
+    assert [job.id for job in response.jobs] == [10, 11]
+    query, params, _ = data_access.remote_jobs_page_query(next_request(request, response.next_page_token))
+    assert "AND job_id > %s ORDER BY job_id" in query
+    assert params == (11, 3)
+
+
+def test_last_page_has_no_token():
+    request = RemoteJobSearchRequest(page_size=2)
+    response = data_access.remote_jobs_page(request, [job_row(10), job_row(11)], 2)
+
+    assert len(response.jobs) == 2
+    assert response.next_page_token == ""
+
+
+def test_ranked_pages_resume_after_rank_and_job_id():
+    request = RemoteJobSearchRequest(keyword="python", rank_by_relevance=True, page_size=1)
+    response = data_access.remote_jobs_page(request, [job_row(7, rank=0.5), job_row(3, rank=0.25)], 1)
+
+    token = json.loads(base64.urlsafe_b64decode(response.next_page_token))
+    assert (token["job_id"], token["rank"]) == (7, 0.5)
+
+    query, params, _ = data_access.remote_jobs_page_query(next_request(request, response.next_page_token))
+    assert "> (-%s::real, %s)" in query
+    assert query.endswith("ORDER BY rank DESC, job_id LIMIT %s")
+    assert params == ("python", "python", "python", 0.5, 7, 2)
+
+
+def test_token_from_another_search_is_rejected():
+    token = data_access.remote_jobs_page_token(RemoteJobSearchRequest(city="Lisbon"), job_row(5))
+
+    assert data_access.parse_remote_jobs_page_token(RemoteJobSearchRequest(city="Lisbon", page_token=token)) == (5, None)
+    with pytest.raises(InvalidArgument):
+        data_access.parse_remote_jobs_page_token(RemoteJobSearchRequest(city="Porto", page_token=token))
+
+
+@pytest.mark.parametrize("token", ["not base64!", base64.urlsafe_b64encode(b"[1, 2]").decode(), base64.urlsafe_b64encode(b'{"job_id": "x"}').decode()])
+def test_malformed_tokens_are_invalid_arguments(token):
+    with pytest.raises(InvalidArgument):
+        data_access.parse_remote_jobs_page_token(RemoteJobSearchRequest(page_token=token))
+
+
+def test_page_size_is_capped_and_must_not_be_negative():
+    assert data_access.remote_jobs_page_size(RemoteJobSearchRequest()) == data_access.REMOTE_JOBS_PAGE_SIZE
+    assert data_access.remote_jobs_page_size(RemoteJobSearchRequest(page_size=10 ** 6)) == data_access.REMOTE_JOBS_MAX_PAGE_SIZE
+    with pytest.raises(InvalidArgument):
+        data_access.remote_jobs_page_size(RemoteJobSearchRequest(page_size=-1))
@@ -0,0 +1,110 @@
+import json
+
+import pytest
+
+import data_access
+from data_access_pb2 import JobReviewsRequest
+
+
+class FakeContext:
+    def __init__(self, metadata=()):
+        self.metadata = tuple(metadata)
+
+    def invocation_metadata(self):
+        return self.metadata
+
+
+def review_row(review_id=None, firm="Acme", location="Lisbon"):
+    row = {"firm": firm, "location": location, "job_title": "Engineer"}
+    if review_id is not None:
+        row["id"] = review_id
+    return row
+
+
+def test_review_events_carry_ids_and_origin():
+    keys = data_access.review_change_keys([review_row(7), review_row(3, firm="Globex")])
+    origin = data_access.write_origin(FakeContext([("batch-size", "5"), ("origin", "replica-1")]))
+    event = data_access.invalidation_event(data_access.invalidation_payload("reviews", origin=origin, **keys))
+
+    assert list(event.review_ids) == [3, 7]
+    assert event.origin == "replica-1"
+    assert list(event.firms) == ["Acme", "Globex"]
+    assert not event.reset
+
+
+def test_bulk_rows_without_ids_list_none():
+    keys = data_access.review_change_keys([review_row(), review_row()])
+
+    assert keys["review_ids"] == []
+    assert data_access.write_origin(FakeContext()) == ""
+
+
+def test_oversized_events_collapse_to_a_reset():
+    keys = data_access.review_change_keys([review_row(i, firm=f"firm-{i}") for i in range(2000)])
+
+    assert json.loads(data_access.invalidation_payload("reviews", **keys)) == {"table": "reviews", "reset": True}
+
+
+def test_review_stream_selects_the_mask_for_the_given_ids():
+    request = JobReviewsRequest(limit=10, after_id=-1, ids=[5, 9], fields=["firm", "overall_rating"])
+    query, params, projection = data_access.stream_reviews_query(request)
+
+    assert query == "SELECT id, firm, overall_rating FROM reviews WHERE id > %s AND id = ANY(%s) ORDER BY id"
+    assert params == (-1, [5, 9])
+    assert [name for name, _ in projection] == ["id", "firm", "overall_rating"]
+
+
+def test_review_stream_defaults_to_every_column():
+    query, params, _ = data_access.stream_reviews_query(JobReviewsRequest())
+
+    assert query == f"SELECT {', '.join(data_access.REVIEW_FIELDS)} FROM reviews ORDER BY id"
+    assert params == ()
+
+
+class NoConnections:
+    """A pool that fails the test if a handler takes a connection."""
+
+    def getconn(self):
+        raise AssertionError("connection taken for an invalid request")
+
+    def acquire(self):
+        raise AssertionError("connection taken for an invalid request")
+
+
+def test_review_stream_with_an_unknown_field_is_invalid_argument(monkeypatch):
+    import grpc
+    from concurrent import futures
+    from grpc_interceptor import ExceptionToStatusInterceptor
+    from data_access_pb2_grpc import DataAccessServiceStub, add_DataAccessServiceServicer_to_server
+
+    monkeypatch.setattr(data_access, "db_pool", NoConnections())
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=2), interceptors=[ExceptionToStatusInterceptor()])
+    add_DataAccessServiceServicer_to_server(data_access.DataAccessService(), server)
+    port = server.add_insecure_port("127.0.0.1:0")
+    server.start()
+    try:
+        with grpc.insecure_channel(f"127.0.0.1:{port}") as channel:
+            stream = DataAccessServiceStub(channel).StreamJobReviews(JobReviewsRequest(fields=["firm", "salary"]))
+            with pytest.raises(grpc.RpcError) as error:
+                list(stream)
+    finally:
+        server.stop(None)
+
+    assert error.value.code() == grpc.StatusCode.INVALID_ARGUMENT
+    assert "salary" in error.value.details()
+
+
+def test_async_review_stream_with_an_unknown_field_is_invalid_argument():
+    pytest.importorskip("asyncpg")
+    import asyncio
+    import data_access_aio
+    from grpc_interceptor.exceptions import InvalidArgument
+
+    service = data_access_aio.AsyncDataAccessService(NoConnections(), invalidations=None)
+
+    async def main():
+        async for _ in service.StreamJobReviews(JobReviewsRequest(fields=["salary"]), context=None):
+            pass
+
+    with pytest.raises(InvalidArgument):
+        asyncio.run(main())
@@ -1,15 +1,19 @@
-import random, os
+import asyncio, queue, random, os, threading
+from collections import deque
 from concurrent import futures
+from functools import wraps
+from itertools import islice
 
 import grpc
 import data_access_pb2
 import jobpostings_pb2
 import jobpostings_pb2_grpc
-from grpc_interceptor import ExceptionToStatusInterceptor
-from grpc_interceptor.exceptions import NotFound
+import telemetry
+from grpc_interceptor import AsyncExceptionToStatusInterceptor, ExceptionToStatusInterceptor
+from grpc_interceptor.exceptions import InvalidArgument, NotFound
 from jobreviews_pb2 import CalculateRatingRequest, JobReview
 from jobreviews_pb2_grpc import JobReviewServiceStub
-from data_access_pb2 import JobPostingsRequestWithTitle, JobPostingsRequestWithTitleAndCity, BestPayingCompaniesRequest, JobPostingsRequest, CompaniesRequest, PostJobRequest, RemoteJobSearchRequest
+from data_access_pb2 import JobSalaryStatsRequest, JobPostingsRequestWithTitleAndCity, BestPayingCompaniesRequest, JobPostingsRequest, CompaniesRequest, PostJobRequest, RemoteJobSearchRequest
 from data_access_pb2_grpc import DataAccessServiceStub
 from jobpostings_pb2 import (
     Job,
@@ -20,244 +24,647 @@ from jobpostings_pb2 import (
     JobPostingsForLargestCompaniesResponse,
     BestPayingCompaniesResponse,
     RemoteJobSearchResponse,
-    JobAddResponse
+    JobAddResponse,
+    BulkBatchResult,
+    BulkIngestResponse
 )
 
 data_access_host = os.getenv("DATA_ACCESS_HOST", "data-access-service")
 job_review_host = os.getenv("JOBREVIEWSHOST", "job-reviews-service")
 
-job_review_posting_channel = grpc.insecure_channel(f"{job_review_host}:50051")
-
-job_postings_channel = grpc.insecure_channel(f"{data_access_host}:50051", options=[
+DATA_ACCESS_CHANNEL_OPTIONS = [
     ('grpc.max_send_message_length', 10 * 1024 * 1024),
     ('grpc.max_receive_message_length', 10 * 1024 * 1024)
-])
+]
+
+telemetry.set_service("job_postings")
+
+# Both channels pass the trace id on and time their calls.
+job_review_posting_channel = telemetry.intercept_channel(grpc.insecure_channel(f"{job_review_host}:50051"))
+
+job_postings_channel = telemetry.intercept_channel(
+    grpc.insecure_channel(f"{data_access_host}:50051", options=DATA_ACCESS_CHANNEL_OPTIONS)
+)
 data_access_client = DataAccessServiceStub(job_postings_channel)
 job_review_client = JobReviewServiceStub(job_review_posting_channel)
 
-class JobPostingService(jobpostings_pb2_grpc.JobPostingServiceServicer):
-    def AverageSalary(self, request, context):
-        
-        jobPostingRequest = JobPostingsRequestWithTitle(title=request.title)
+# GRPC_ASYNC=1 serves with grpc.aio instead of a thread pool. In-flight
+# requests are then capped by a semaphore of GRPC_MAX_CONCURRENCY.
+GRPC_ASYNC = os.getenv("GRPC_ASYNC", "").lower() in ("1", "true", "yes")
+GRPC_MAX_CONCURRENCY = int(os.getenv("GRPC_MAX_CONCURRENCY", 100))
 
-        jobPostingsResponse = data_access_client.GetJobPostingsWithTitle(jobPostingRequest)
+# Number of gRPC worker threads of the sync server.
+MAX_WORKERS = 10
 
-        total = 0
-        count = 0
-        avg = 0.0
+# GetJobPostingsForLargestCompanies covers the LARGEST_COMPANIES biggest
+# companies and fetches up to LARGEST_COMPANIES_CONCURRENCY of them at once.
+LARGEST_COMPANIES = int(os.getenv("LARGEST_COMPANIES", 5))
+LARGEST_COMPANIES_CONCURRENCY = int(os.getenv("LARGEST_COMPANIES_CONCURRENCY", 5))
+# StreamJobPostingsForLargestCompanies holds at most this many chunks per
+# company fetched ahead of the one being sent.
+LARGEST_COMPANIES_BUFFER = int(os.getenv("LARGEST_COMPANIES_BUFFER", 4))
 
-        for job in jobPostingsResponse.job:
-            if job.title == request.title:
-                total += job.normalized_salary
-                count += 1
+# Shared by every request of the sync server, sized so each worker thread
+# can have its full LARGEST_COMPANIES_CONCURRENCY fetches running.
+company_jobs_pool = futures.ThreadPoolExecutor(
+    max_workers=MAX_WORKERS * LARGEST_COMPANIES_CONCURRENCY, thread_name_prefix="company-jobs"
+)
 
-        if count > 0:
-            avg = total / count
+# The helpers below build requests and responses around the downstream
+# calls. Both servicers use them; they only differ in how they make the
+# calls.
 
-        return AverageSalaryResponse(averageSalary=avg)
+def salary_stats_request(request):
+    return JobSalaryStatsRequest(title=request.title, percentiles=request.percentiles)
 
-    def JobsWithRating(self, request, context):
-        
-        jobPostingRequest = JobPostingsRequestWithTitleAndCity(title=request.title,city=request.city)
-        
-        jobPostingsResponse = data_access_client.GetJobPostingsWithTitleAndCity(jobPostingRequest)
-        
-        jobToSendToReviews = []
-        
-        for job in jobPostingsResponse.job:
-            job_proto = JobReview(  
-                id=str(job.job_id), 
-                title=str(job.title),
-                company_name=str(job.company),
-                description=str(job.description),
-                location=str(job.location),
-                views=int(job.views),
-                salary=int(job.normalized_salary)
-            )
+def average_salary_response(stats):
+    response = AverageSalaryResponse(averageSalary=stats.average_salary, count=stats.count)
+    for field in ("p25", "p50", "p75"):
+        if stats.HasField(field):
+            setattr(response, field, getattr(stats, field))
+    return response
 
-            
-            jobToSendToReviews.append(job_proto)
-            
-        jobsWithRatings = []
-            
-        if len(jobToSendToReviews) != 0:
-            calculateRatingRequest = CalculateRatingRequest(jobs=jobToSendToReviews)
-            
-            calculateRatingResponse = job_review_client.CalculateRating(calculateRatingRequest)
-            
-            for i, job_with_rating in enumerate(calculateRatingResponse.rating):
-                jobWithRating = JobWithRating(
-                    rating=job_with_rating.rating,  
-                    job= Job(
-                        id=str(job_with_rating.job.id), 
-                        title=str(job_with_rating.job.title),
-                        company_name=str(job_with_rating.job.company_name),
-                        description=str(job_with_rating.job.description),
-                        location=str(job_with_rating.job.location),
-                        views=int(job_with_rating.job.views),
-                        salary=int(job_with_rating.job.salary)
-                    )
+# The Job fields calculate_rating_request reads. Requested as a field mask
+# so skills_desc, the URLs and the other unused columns are not fetched.
+RATED_JOB_FIELDS = ["job_id", "title", "company", "description", "location", "views", "normalized_salary"]
+
+def jobs_with_rating_request(request):
+    return JobPostingsRequestWithTitleAndCity(title=request.title, city=request.city, fields=RATED_JOB_FIELDS)
+
+def calculate_rating_request(jobPostingsResponse):
+    # None if there are no jobs to rate.
+    jobToSendToReviews = []
+
+    for job in jobPostingsResponse.job:
+        job_proto = JobReview(
+            id=str(job.job_id),
+            title=str(job.title),
+            company_name=str(job.company),
+            description=str(job.description),
+            location=str(job.location),
+            views=int(job.views),
+            salary=int(job.normalized_salary)
+        )
+
+        jobToSendToReviews.append(job_proto)
+
+    if len(jobToSendToReviews) == 0:
+        return None
+    return CalculateRatingRequest(jobs=jobToSendToReviews)
+
+def jobs_with_rating_response(calculateRatingResponse):
+    jobsWithRatings = []
+
+    if calculateRatingResponse is not None:
+        for i, job_with_rating in enumerate(calculateRatingResponse.rating):
+            jobWithRating = JobWithRating(
+                rating=job_with_rating.rating,
+                job= Job(
+                    id=str(job_with_rating.job.id),
+                    title=str(job_with_rating.job.title),
+                    company_name=str(job_with_rating.job.company_name),
+                    description=str(job_with_rating.job.description),
+                    location=str(job_with_rating.job.location),
+                    views=int(job_with_rating.job.views),
+                    salary=int(job_with_rating.job.salary)
                 )
-                jobsWithRatings.append(jobWithRating)
+            )
+            jobsWithRatings.append(jobWithRating)
 
-        
-        return JobsWithRatingResponse(jobs=jobsWithRatings)
-        
-    def GetJobPostingsForLargestCompanies(self, request, context):
-        # Step 1: Retrieve companies with employees.
-        companies_request = data_access_pb2.CompaniesRequest()
-        companies_response = data_access_client.GetCompaniesWithEmployees(companies_request)
-        companies = companies_response.company
-        
-        if not companies:
-            return jobpostings_pb2.JobPostingsForLargestCompaniesResponse(job=[])
-        
-        # Step 2: Sort companies by employee_count (descending)
-        companies.sort(key=lambda c: c.employee_count, reverse=True)
-        
-        # Step 3: Find top 5 unique companies
-        seen_company_ids = set()
-        top_companies = []
-        
-        for company in companies:
-            # Skip companies with invalid or zero company_id
-            if not company.company_id:
+    return JobsWithRatingResponse(jobs=jobsWithRatings)
+
+def largest_companies_request():
+    # data_access ranks by employee_count and returns each company once.
+    return data_access_pb2.CompaniesRequest(limit=LARGEST_COMPANIES, fields=["company_id"])
+
+def company_jobs_request(company):
+    return data_access_pb2.JobPostingsRequest(
+        company_id=company.company_id,
+        limit=1000  # Rows per streamed chunk.
+    )
+
+def prefetch_in_order(pool, fetch, items, window):
+    """Yield fetch(item) for each item in order, up to `window` fetches ahead.
+
+    The fetches run in `pool`. Closing the generator early cancels the
+    fetches that have not started yet.
+    """
+    items = iter(items)
+    pending = deque(pool.submit(fetch, item) for item in islice(items, window))
+    try:
+        while pending:
+            result = pending.popleft().result()
+            pending.extend(pool.submit(fetch, item) for item in islice(items, 1))
+            yield result
+    finally:
+        for future in pending:
+            future.cancel()
+
+async def prefetch_in_order_async(fetch, items, window):
+    """Async counterpart of prefetch_in_order; `fetch` is a coroutine function."""
+    items = iter(items)
+    pending = deque(asyncio.ensure_future(fetch(item)) for item in islice(items, window))
+    try:
+        while pending:
+            result = await pending.popleft()
+            pending.extend(asyncio.ensure_future(fetch(item)) for item in islice(items, 1))
+            yield result
+    finally:
+        for task in pending:
+            task.cancel()
+
+# Marks the end of one stream in stream_in_order's queues.
+_END = object()
+
+class _Failed:
+    """A stream's exception, queued to be raised where the stream is read."""
+
+    def __init__(self, error):
+        self.error = error
+
+def stream_in_order(pool, stream, items, window, buffer):
+    """Yield the messages of stream(item) for each item in order, up to `window` streams at once.
+
+    `stream` returns a gRPC response stream. The first item's messages are
+    passed on as they arrive; the streams started ahead of it wait in
+    queues of `buffer` messages each. Closing the generator early cancels
+    the streams.
+    """
+    stopped = threading.Event()
+    calls = []
+
+    def put(chunks, value):
+        while not stopped.is_set():
+            try:
+                chunks.put(value, timeout=0.1)
+                return True
+            except queue.Full:
                 continue
-                
-            # If we haven't seen this company before, add it to our top companies
-            if company.company_id not in seen_company_ids:
-                seen_company_ids.add(company.company_id)
-                top_companies.append(company)
-                
-            # Once we have 5 unique companies, we can stop
-            if len(top_companies) == 5:
-                break
-        
-        # Step 3: For each top company, retrieve job postings in batches.
-        all_job_postings = []
-        limit = 30000  # Adjust this limit as needed.
-        for company in top_companies:
-            offset = 0
-            company_id = company.company_id
+        return False
+
+    def produce(item, chunks):
+        try:
+            call = stream(item)
+            calls.append(call)
+            if stopped.is_set():
+                call.cancel()
+            for message in call:
+                if not put(chunks, message):
+                    return
+        except Exception as e:
+            put(chunks, _Failed(e))
+            return
+        put(chunks, _END)
+
+    produce = telemetry.in_context(produce)
+    items = iter(items)
+    pending = deque()
+
+    def start(item):
+        chunks = queue.Queue(maxsize=buffer)
+        pending.append((pool.submit(produce, item, chunks), chunks))
+
+    try:
+        for item in islice(items, window):
+            start(item)
+        while pending:
+            _, chunks = pending[0]
             while True:
-                # Create a paginated request including a filter by company_id.
-                paginatedRequest = data_access_pb2.JobPostingsRequest(
-                    company_id=company_id,
-                    limit=limit,
-                    offset=offset
-                )
-                jobPostingsResponse = data_access_client.GetJobPostingsForLargestCompanies(paginatedRequest)
-                
-                batch_jobs = jobPostingsResponse.job
-                
-                if not batch_jobs:
+                value = chunks.get()
+                if value is _END:
                     break
+                if isinstance(value, _Failed):
+                    raise value.error
+                yield value
+            pending.popleft()
+            for item in islice(items, 1):
+                start(item)
+    finally:
+        # Cancelling a call also wakes a producer waiting on its next message.
+        stopped.set()
+        for future, _ in pending:
+            future.cancel()
+        for call in calls:
+            call.cancel()
 
-                # Convert data_access_pb2.JobForLargestCompany to jobpostings_pb2.JobForLargestCompany
-                for job in batch_jobs:
-                    # Create a new instance of jobpostings_pb2.JobForLargestCompany
-                    job_obj = jobpostings_pb2.JobForLargestCompany(
-                        company=job.company,
-                        title=job.title,
-                        description=job.description,
-                        location=job.location,
-                        company_id=job.company_id,
-                        med_salary=job.med_salary
-                    )
-                    all_job_postings.append(job_obj)
-                
-                if len(batch_jobs) < limit:
+async def stream_in_order_async(stream, items, window, buffer):
+    """Async counterpart of stream_in_order; `stream` returns a grpc.aio response stream."""
+
+    async def produce(item, chunks):
+        call = stream(item)
+        try:
+            async for message in call:
+                await chunks.put(message)
+        except Exception as e:
+            await chunks.put(_Failed(e))
+            return
+        finally:
+            call.cancel()
+        await chunks.put(_END)
+
+    items = iter(items)
+    pending = deque()
+
+    def start(item):
+        chunks = asyncio.Queue(maxsize=buffer)
+        pending.append((asyncio.ensure_future(produce(item, chunks)), chunks))
+
+    try:
+        for item in islice(items, window):
+            start(item)
+        while pending:
+            _, chunks = pending[0]
+            while True:
+                value = await chunks.get()
+                if value is _END:
                     break
-                
-                offset += limit
+                if isinstance(value, _Failed):
+                    raise value.error
+                yield value
+            pending.popleft()
+            for item in islice(items, 1):
+                start(item)
+    finally:
+        for task, _ in pending:
+            task.cancel()
+
+def largest_company_jobs(chunk):
+    # Convert data_access_pb2.JobForLargestCompany to jobpostings_pb2.JobForLargestCompany
+    return [
+        jobpostings_pb2.JobForLargestCompany(
+            company=job.company,
+            title=job.title,
+            description=job.description,
+            location=job.location,
+            company_id=job.company_id,
+            med_salary=job.med_salary
+        )
+        for job in chunk.job
+    ]
+
+def invalid_add_job_response(request):
+    if not request.title or not request.company_name or not request.description or not request.location or request.normalized_salary is None:
+        return JobAddResponse(
+            message="Invalid request: missing required fields.",
+            status=400
+        )
+    return None
+
+def post_job_request(job):
+    return PostJobRequest(
+        title=job.title,
+        normalized_salary=job.normalized_salary,
+        company_name=job.company_name,
+        description=job.description,
+        location=job.location
+    )
+
+def add_job_response(job_response):
+    # Verificar se a inserção/atualização foi bem-sucedida
+    if job_response.status == 200:
+        return JobAddResponse(
+            message="Job added successfully",
+            status=201,
+            job_id=job_response.job_id
+        )
+    else:
+        return JobAddResponse(
+            message=f"Error adding the job: {job_response.message}",
+            status=500
+        )
+
+def remote_search_request(request):
+    return RemoteJobSearchRequest(
+        city=request.city if request.city else "",
+        keyword=request.keyword if request.keyword else "",
+        company=request.company if request.company else "",
+        rank_by_relevance=request.rank_by_relevance,
+        page_size=request.page_size,
+        page_token=request.page_token,
+        include_total=request.include_total
+    )
+
+def downstream_error(e):
+    # A request data_access rejects (e.g. a bad page_token) is the caller's
+    # mistake, so pass it on as such rather than as an internal error.
+    if e.code() == grpc.StatusCode.INVALID_ARGUMENT:
+        return InvalidArgument(e.details())
+    return e
+
+def remote_jobs_response(jobPostingsResponse):
+    converted_jobs = [
+        JobForRemote(
+            id=str(job.id),
+            title=job.title,
+            company=job.company,
+            description=job.description,
+            location=job.location,
+            remote_allowed=job.remote_allowed
+        )
+    for job in jobPostingsResponse.jobs
+    ]
+
+    response = RemoteJobSearchResponse(jobs=converted_jobs, next_page_token=jobPostingsResponse.next_page_token)
+    if jobPostingsResponse.HasField("approximate_total"):
+        response.approximate_total = jobPostingsResponse.approximate_total
+    return response
+
+def best_paying_response(best_paying_response):
+    companies = []
+    for company in best_paying_response.companies:
+        companies.append({
+            "company_name": company.company_name,
+            "average_salary": company.average_salary
+        })
+
+    return BestPayingCompaniesResponse(companies=companies)
+
+def batch_size_metadata(context):
+    return [(key, value) for key, value in context.invocation_metadata() if key == "batch-size"]
+
+def bulk_ingest_response(bulkResponse):
+    return BulkIngestResponse(
+        accepted=bulkResponse.accepted,
+        rejected=bulkResponse.rejected,
+        batch=[
+            BulkBatchResult(batch=b.batch, accepted=b.accepted, rejected=b.rejected, error=b.error)
+            for b in bulkResponse.batch
+        ]
+    )
+
+class JobPostingService(jobpostings_pb2_grpc.JobPostingServiceServicer):
+    def company_jobs(self, company):
+        # One list of jobs per streamed chunk.
+        return [
+            largest_company_jobs(chunk)
+            for chunk in data_access_client.StreamJobPostingsForLargestCompanies(company_jobs_request(company))
+        ]
+
+    def largest_companies_jobs(self, companies):
+        # Per company, in company order, while the next companies are fetched.
+        fetch = telemetry.in_context(self.company_jobs)
+        return prefetch_in_order(company_jobs_pool, fetch, companies, LARGEST_COMPANIES_CONCURRENCY)
+
+    def company_chunks(self, company):
+        return data_access_client.StreamJobPostingsForLargestCompanies(company_jobs_request(company))
+
+    def largest_companies_chunks(self, companies):
+        # The data_access chunks of every company, in company order.
+        return stream_in_order(
+            company_jobs_pool, self.company_chunks, companies, LARGEST_COMPANIES_CONCURRENCY, LARGEST_COMPANIES_BUFFER
+        )
+
+    def AverageSalary(self, request, context):
+        # Averaged in the database over every job with exactly this title.
+        try:
+            stats = data_access_client.GetJobSalaryStats(salary_stats_request(request))
+        except grpc.RpcError as e:
+            raise downstream_error(e)
+
+        return average_salary_response(stats)
+
+    def JobsWithRating(self, request, context):
+
+        jobPostingsResponse = data_access_client.GetJobPostingsWithTitleAndCity(jobs_with_rating_request(request))
+
+        calculateRatingRequest = calculate_rating_request(jobPostingsResponse)
+        calculateRatingResponse = None
+        if calculateRatingRequest is not None:
+            calculateRatingResponse = job_review_client.CalculateRating(calculateRatingRequest)
+
+        return jobs_with_rating_response(calculateRatingResponse)
+
+    def GetJobPostingsForLargestCompanies(self, request, context):
+        # Step 1: Retrieve the largest companies, biggest first.
+        companies_response = data_access_client.GetCompaniesWithEmployees(largest_companies_request())
+
+        if not companies_response.company:
+            return jobpostings_pb2.JobPostingsForLargestCompaniesResponse(job=[])
+
+        # Step 2: Stream every company's job postings concurrently, in
+        # company order.
+        all_job_postings = []
+        for chunks in self.largest_companies_jobs(companies_response.company):
+            for jobs in chunks:
+                all_job_postings.extend(jobs)
 
         return jobpostings_pb2.JobPostingsForLargestCompaniesResponse(job=all_job_postings)
 
+    def StreamJobPostingsForLargestCompanies(self, request, context):
+        companies_response = data_access_client.GetCompaniesWithEmployees(largest_companies_request())
+
+        # The current company's chunks are sent as they arrive; the
+        # companies fetched ahead hold at most LARGEST_COMPANIES_BUFFER
+        # chunks each.
+        for chunk in self.largest_companies_chunks(companies_response.company):
+            yield jobpostings_pb2.JobPostingsForLargestCompaniesResponse(job=largest_company_jobs(chunk))
+
     def AddJob(self, request, context):
-        if not request.title or not request.company_name or not request.description or not request.location or request.normalized_salary is None:
-            return JobAddResponse(
-                message="Invalid request: missing required fields.",
-                status=400
-            )
+        invalid_response = invalid_add_job_response(request)
+        if invalid_response is not None:
+            return invalid_response
 
-        job_request = PostJobRequest(
-            title=request.title,
-            normalized_salary=request.normalized_salary,
-            company_name=request.company_name,
-            description=request.description,
-            location=request.location
-        )
         try:
-            job_response = data_access_client.PostJobInDB(job_request)
+            job_response = data_access_client.PostJobInDB(post_job_request(request))
         except Exception as e:
             return JobAddResponse(
                 message=f"Error calling DataAccessService: {e}",
                 status=500
             )
-        
-        # Verificar se a inserção/atualização foi bem-sucedida
-        if job_response.status == 200:
-            return JobAddResponse(
-                message="Job added successfully",
-                status=201,
-                job_id=job_response.job_id
-            )
-        else:
-            return JobAddResponse(
-                message=f"Error adding the job: {job_response.message}",
-                status=500
-            )
-        
+
+        return add_job_response(job_response)
+
     def GetRemoteJobs(self, request, context):
-        search_request = RemoteJobSearchRequest(
-            city=request.city if request.city else "",
-            keyword=request.keyword if request.keyword else "",
-            company=request.company if request.company else ""
-        )
-        
-        jobPostingsResponse = data_access_client.GetRemoteJobs(search_request)
-        
-        converted_jobs = [
-            JobForRemote(
-                id=str(job.id),
-                title=job.title,
-                company=job.company,
-                description=job.description,
-                location=job.location,
-                remote_allowed=job.remote_allowed
-            )
-        for job in jobPostingsResponse.jobs
-        ]
+        try:
+            jobPostingsResponse = data_access_client.GetRemoteJobs(remote_search_request(request))
+        except grpc.RpcError as e:
+            raise downstream_error(e)
+
+        return remote_jobs_response(jobPostingsResponse)
+
+    def StreamRemoteJobs(self, request, context):
+        for chunk in data_access_client.StreamRemoteJobs(remote_search_request(request)):
+            yield remote_jobs_response(chunk)
 
-        return RemoteJobSearchResponse(jobs=converted_jobs)
-    
     def GetBestPayingCompanies(self, request, context):
 
         best_paying_request = BestPayingCompaniesRequest(title=request.title)
 
         try:
-            best_paying_response = data_access_client.GetBestPayingCompanies(best_paying_request)
+            return best_paying_response(data_access_client.GetBestPayingCompanies(best_paying_request))
+
+        except grpc.RpcError as e:
+            raise Exception(f"Error fetching best paying companies from DataAccess: {e}")
 
-            companies = []
-            for company in best_paying_response.companies:
-                companies.append({
-                    "company_name": company.company_name,
-                    "average_salary": company.average_salary
-                })
+    def BulkAddJobs(self, request_iterator, context):
+        # Jobs are forwarded as they arrive; data_access does the batching.
+        jobs = (post_job_request(job) for job in request_iterator)
+        bulkResponse = data_access_client.BulkPostJobs(jobs, metadata=batch_size_metadata(context))
 
-            return BestPayingCompaniesResponse(companies=companies)
+        return bulk_ingest_response(bulkResponse)
 
+def bounded(method):
+    # Run an async handler under the servicer's concurrency semaphore.
+    @wraps(method)
+    async def wrapper(self, request, context):
+        async with self.semaphore:
+            return await method(self, request, context)
+    return wrapper
+
+class AsyncJobPostingService(jobpostings_pb2_grpc.JobPostingServiceServicer):
+    """JobPostingService for grpc.aio; same behaviour, awaited downstream calls."""
+
+    def __init__(self, data_access, job_reviews, max_concurrency):
+        self.data_access = data_access
+        self.job_reviews = job_reviews
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+
+    @bounded
+    async def AverageSalary(self, request, context):
+        try:
+            stats = await self.data_access.GetJobSalaryStats(salary_stats_request(request))
+        except grpc.RpcError as e:
+            raise downstream_error(e)
+
+        return average_salary_response(stats)
+
+    @bounded
+    async def JobsWithRating(self, request, context):
+        jobPostingsResponse = await self.data_access.GetJobPostingsWithTitleAndCity(jobs_with_rating_request(request))
+
+        calculateRatingRequest = calculate_rating_request(jobPostingsResponse)
+        calculateRatingResponse = None
+        if calculateRatingRequest is not None:
+            calculateRatingResponse = await self.job_reviews.CalculateRating(calculateRatingRequest)
+
+        return jobs_with_rating_response(calculateRatingResponse)
+
+    async def company_jobs(self, company):
+        # One list of jobs per streamed chunk.
+        return [
+            largest_company_jobs(chunk)
+            async for chunk in self.data_access.StreamJobPostingsForLargestCompanies(company_jobs_request(company))
+        ]
+
+    def largest_companies_jobs(self, companies):
+        return prefetch_in_order_async(self.company_jobs, companies, LARGEST_COMPANIES_CONCURRENCY)
+
+    def company_chunks(self, company):
+        return self.data_access.StreamJobPostingsForLargestCompanies(company_jobs_request(company))
+
+    def largest_companies_chunks(self, companies):
+        return stream_in_order_async(self.company_chunks, companies, LARGEST_COMPANIES_CONCURRENCY, LARGEST_COMPANIES_BUFFER)
+
+    @bounded
+    async def GetJobPostingsForLargestCompanies(self, request, context):
+        companies_response = await self.data_access.GetCompaniesWithEmployees(largest_companies_request())
+
+        if not companies_response.company:
+            return jobpostings_pb2.JobPostingsForLargestCompaniesResponse(job=[])
+
+        # The per-company streams run concurrently, at most
+        # LARGEST_COMPANIES_CONCURRENCY at a time, in company order.
+        all_job_postings = []
+        async for chunks in self.largest_companies_jobs(companies_response.company):
+            for jobs in chunks:
+                all_job_postings.extend(jobs)
+
+        return jobpostings_pb2.JobPostingsForLargestCompaniesResponse(job=all_job_postings)
+
+    async def StreamJobPostingsForLargestCompanies(self, request, context):
+        # A generator cannot use @bounded; it holds the semaphore until the
+        # stream ends.
+        async with self.semaphore:
+            companies_response = await self.data_access.GetCompaniesWithEmployees(largest_companies_request())
+
+            async for chunk in self.largest_companies_chunks(companies_response.company):
+                yield jobpostings_pb2.JobPostingsForLargestCompaniesResponse(job=largest_company_jobs(chunk))
+
+    @bounded
+    async def AddJob(self, request, context):
+        invalid_response = invalid_add_job_response(request)
+        if invalid_response is not None:
+            return invalid_response
+
+        try:
+            job_response = await self.data_access.PostJobInDB(post_job_request(request))
+        except Exception as e:
+            return JobAddResponse(
+                message=f"Error calling DataAccessService: {e}",
+                status=500
+            )
+
+        return add_job_response(job_response)
+
+    @bounded
+    async def GetRemoteJobs(self, request, context):
+        try:
+            jobPostingsResponse = await self.data_access.GetRemoteJobs(remote_search_request(request))
+        except grpc.RpcError as e:
+            raise downstream_error(e)
+
+        return remote_jobs_response(jobPostingsResponse)
+
+    async def StreamRemoteJobs(self, request, context):
+        async with self.semaphore:
+            async for chunk in self.data_access.StreamRemoteJobs(remote_search_request(request)):
+                yield remote_jobs_response(chunk)
+
+    @bounded
+    async def GetBestPayingCompanies(self, request, context):
+        best_paying_request = BestPayingCompaniesRequest(title=request.title)
+
+        try:
+            return best_paying_response(await self.data_access.GetBestPayingCompanies(best_paying_request))
         except grpc.RpcError as e:
             raise Exception(f"Error fetching best paying companies from DataAccess: {e}")
 
+    @bounded
+    async def BulkAddJobs(self, request_iterator, context):
+        async def jobs():
+            async for job in request_iterator:
+                yield post_job_request(job)
+
+        bulkResponse = await self.data_access.BulkPostJobs(jobs(), metadata=batch_size_metadata(context))
+
+        return bulk_ingest_response(bulkResponse)
+
+async def serve_async():
+    # aio channels must be created inside the running event loop.
+    data_access_channel = grpc.aio.insecure_channel(
+        f"{data_access_host}:50051",
+        options=DATA_ACCESS_CHANNEL_OPTIONS,
+        interceptors=telemetry.async_client_interceptors()
+    )
+    job_reviews_channel = grpc.aio.insecure_channel(f"{job_review_host}:50051", interceptors=telemetry.async_client_interceptors())
+    server = grpc.aio.server(interceptors=[telemetry.AsyncServerMetricsInterceptor(), AsyncExceptionToStatusInterceptor()])
+    jobpostings_pb2_grpc.add_JobPostingServiceServicer_to_server(
+        AsyncJobPostingService(
+            DataAccessServiceStub(data_access_channel),
+            JobReviewServiceStub(job_reviews_channel),
+            GRPC_MAX_CONCURRENCY
+        ),
+        server
+    )
+    telemetry.start_metrics_server()
+
+    server.add_insecure_port("[::]:50051")
+    await server.start()
+    await server.wait_for_termination()
+
 def serve():
-    interceptors = [ExceptionToStatusInterceptor()]
+    if GRPC_ASYNC:
+        asyncio.run(serve_async())
+        return
+
+    interceptors = [telemetry.ServerMetricsInterceptor(), ExceptionToStatusInterceptor()]
     server = grpc.server(
-        futures.ThreadPoolExecutor(max_workers=10), interceptors=interceptors
+        futures.ThreadPoolExecutor(max_workers=MAX_WORKERS), interceptors=interceptors
     )
     jobpostings_pb2_grpc.add_JobPostingServiceServicer_to_server(
         JobPostingService(), server
     )
+    telemetry.start_metrics_server()
 
     server.add_insecure_port("[::]:50051")
     server.start()
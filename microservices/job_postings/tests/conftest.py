@@ -0,0 +1,34 @@
+import os
+import sys
+import tempfile
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SERVICE = os.path.dirname(HERE)
+MICROSERVICES = os.path.dirname(SERVICE)
+COMMON = os.path.join(MICROSERVICES, "common")
+PROTOS = [
+    os.path.join(MICROSERVICES, "data_access", "protobuf", "data-access.proto"),
+    os.path.join(SERVICE, "protobuf", "jobpostings.proto"),
+    os.path.join(MICROSERVICES, "job_reviews", "protobuf", "jobreviews.proto"),
+]
+
+
+def generate_stubs():
+    """Compile the three protos job_postings uses into a temp dir, as the Dockerfile does."""
+    out = tempfile.mkdtemp(prefix="job_postings_stubs_")
+    includes = [f"-I{os.path.dirname(proto)}" for proto in PROTOS]
+    status = protoc.main(["protoc", *includes, f"--python_out={out}", f"--grpc_python_out={out}", *PROTOS])
+    if status != 0:
+        raise RuntimeError("protoc failed on the job_postings protos")
+    return out
+
+
+try:
+    import grpc_interceptor  # noqa: F401
+    import prometheus_client  # noqa: F401
+    from grpc_tools import protoc
+except ImportError:
+    # job_postings cannot be imported without its service dependencies.
+    collect_ignore_glob = ["test_*.py"]
+else:
+    sys.path[:0] = [generate_stubs(), SERVICE, COMMON]
@@ -0,0 +1,73 @@
+import grpc
+import pytest
+from grpc_interceptor.exceptions import InvalidArgument
+
+import job_postings
+from data_access_pb2 import JobSalaryStatsResponse
+from jobpostings_pb2 import AverageSalaryRequest
+
+
+class DownstreamError(grpc.RpcError):
+    def __init__(self, code, details):
+        self._code = code
+        self._details = details
+
+    def code(self):
+        return self._code
+
+    def details(self):
+        return self._details
+
+
+class SalaryStats:
+    """A data_access stub that answers GetJobSalaryStats with `response`, or raises it."""
+
+    def __init__(self, response):
+        self.response = response
+        self.requests = []
+
+    def GetJobSalaryStats(self, request):
+        self.requests.append(request)
+        if isinstance(self.response, Exception):
+            raise self.response
+        return self.response
+
+
+def average_salary(monkeypatch, response, request):
+    stub = SalaryStats(response)
+    monkeypatch.setattr(job_postings, "data_access_client", stub)
+    return job_postings.JobPostingService().AverageSalary(request, context=None), stub.requests
+
+
+def test_count_and_average_are_passed_through(monkeypatch):
+    response, requests = average_salary(
+        monkeypatch, JobSalaryStatsResponse(average_salary=91234.5, count=42), AverageSalaryRequest(title="Engineer")
+    )
+
+    assert (response.averageSalary, response.count) == (pytest.approx(91234.5), 42)
+    assert [(r.title, r.percentiles) for r in requests] == [("Engineer", False)]
+    assert not any(response.HasField(field) for field in ("p25", "p50", "p75"))
+
+
+def test_only_the_percentiles_data_access_set_are_set(monkeypatch):
+    stats = JobSalaryStatsResponse(average_salary=80000, count=3, p25=60000, p75=95000)
+    response, requests = average_salary(monkeypatch, stats, AverageSalaryRequest(title="Engineer", percentiles=True))
+
+    assert requests[0].percentiles
+    assert (response.p25, response.p75) == (60000, 95000)
+    assert response.HasField("p25") and response.HasField("p75")
+    assert not response.HasField("p50")
+
+
+def test_a_title_without_jobs_has_zero_count_and_no_percentiles(monkeypatch):
+    response, _ = average_salary(monkeypatch, JobSalaryStatsResponse(), AverageSalaryRequest(title="Astronaut", percentiles=True))
+
+    assert (response.averageSalary, response.count) == (0, 0)
+    assert not any(response.HasField(field) for field in ("p25", "p50", "p75"))
+
+
+def test_an_empty_title_is_the_callers_mistake(monkeypatch):
+    error = DownstreamError(grpc.StatusCode.INVALID_ARGUMENT, "Job title is required")
+
+    with pytest.raises(InvalidArgument, match="Job title is required"):
+        average_salary(monkeypatch, error, AverageSalaryRequest(title=""))
@@ -0,0 +1,225 @@
+import asyncio
+import threading
+import time
+from concurrent import futures
+
+import pytest
+
+import job_postings
+
+
+class Tracker:
+    """Counts the fetches running at once."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.running = 0
+        self.most = 0
+
+    def __enter__(self):
+        with self.lock:
+            self.running += 1
+            self.most = max(self.most, self.running)
+
+    def __exit__(self, *exc):
+        with self.lock:
+            self.running -= 1
+
+
+class FakeCall:
+    """A response stream that sends `messages`, pausing before index `wait_at` until released."""
+
+    def __init__(self, messages, wait_at=None):
+        self.messages = messages
+        self.wait_at = wait_at
+        self.release = threading.Event()
+        self.sent = 0
+        self.finished = threading.Event()
+        self.cancelled = False
+
+    def __iter__(self):
+        for index, message in enumerate(self.messages):
+            if index == self.wait_at:
+                self.release.wait(timeout=5)
+            self.sent += 1
+            yield message
+        self.finished.set()
+
+    def cancel(self):
+        self.cancelled = True
+        self.release.set()
+
+
+@pytest.fixture
+def pool():
+    with futures.ThreadPoolExecutor(max_workers=8) as pool:
+        yield pool
+
+
+def test_prefetch_in_order_keeps_item_order_and_its_window(pool):
+    tracker = Tracker()
+
+    def fetch(item):
+        with tracker:
+            # Later items finish first.
+            time.sleep(0.01 * (5 - item))
+            return item * 10
+
+    assert list(job_postings.prefetch_in_order(pool, fetch, range(5), window=2)) == [0, 10, 20, 30, 40]
+    assert tracker.most <= 2
+
+
+def test_closing_prefetch_in_order_early_cancels_waiting_fetches():
+    fetched = []
+    with futures.ThreadPoolExecutor(max_workers=1) as pool:
+        results = job_postings.prefetch_in_order(pool, fetched.append, range(10), window=3)
+        next(results)
+        results.close()
+    # The first fetch ran; of the two queued behind it, at most the one
+    # already handed to the worker ran too.
+    assert fetched[0] == 0 and len(fetched) <= 2
+
+
+def test_prefetch_in_order_async_keeps_item_order_and_its_window():
+    tracker = Tracker()
+
+    async def fetch(item):
+        with tracker:
+            await asyncio.sleep(0.01 * (5 - item))
+            return item * 10
+
+    async def main():
+        return [result async for result in job_postings.prefetch_in_order_async(fetch, range(5), window=2)]
+
+    assert asyncio.run(main()) == [0, 10, 20, 30, 40]
+    assert tracker.most <= 2
+
+
+def test_closing_prefetch_in_order_async_early_cancels_pending_fetches():
+    finished = []
+
+    async def fetch(item):
+        await asyncio.sleep(0 if item == 0 else 0.05)
+        finished.append(item)
+        return item
+
+    async def main():
+        results = job_postings.prefetch_in_order_async(fetch, range(10), window=3)
+        first = await results.__anext__()
+        await results.aclose()
+        await asyncio.sleep(0.1)
+        return first
+
+    assert asyncio.run(main()) == 0
+    assert finished == [0]
+
+
+def test_stream_in_order_passes_the_first_stream_on_before_it_ends(pool):
+    head = FakeCall(["a1", "a2", "a3"], wait_at=1)
+    calls = {"a": head, "b": FakeCall(["b1", "b2"])}
+
+    messages = job_postings.stream_in_order(pool, calls.get, ["a", "b"], window=2, buffer=2)
+
+    assert next(messages) == "a1"
+    assert not head.finished.is_set()
+    head.release.set()
+    assert list(messages) == ["a2", "a3", "b1", "b2"]
+
+
+def test_stream_in_order_buffers_at_most_buffer_messages_per_stream_ahead(pool):
+    head = FakeCall(["a1", "a2"], wait_at=1)
+    ahead = FakeCall([f"b{i}" for i in range(20)])
+    calls = {"a": head, "b": ahead}
+
+    messages = job_postings.stream_in_order(pool, calls.get, ["a", "b"], window=2, buffer=3)
+    assert next(messages) == "a1"
+    time.sleep(0.1)
+
+    # Three queued, plus one taken from the stream and waiting for room.
+    assert ahead.sent <= 4
+    head.release.set()
+    assert list(messages) == ["a2"] + [f"b{i}" for i in range(20)]
+
+
+def test_closing_stream_in_order_early_cancels_the_streams(pool):
+    head = FakeCall(["a1", "a2"], wait_at=1)
+    ahead = FakeCall([f"b{i}" for i in range(20)])
+    calls = {"a": head, "b": ahead}
+
+    messages = job_postings.stream_in_order(pool, calls.get, ["a", "b"], window=2, buffer=2)
+    next(messages)
+    messages.close()
+
+    deadline = time.monotonic() + 5
+    while not (head.cancelled and ahead.cancelled) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert head.cancelled and ahead.cancelled
+    assert ahead.sent < 20
+
+
+def test_stream_in_order_raises_a_stream_error_in_order(pool):
+    class Broken(FakeCall):
+        def __iter__(self):
+            yield "b1"
+            raise RuntimeError("stream lost")
+
+    calls = {"a": FakeCall(["a1"]), "b": Broken([])}
+    messages = job_postings.stream_in_order(pool, calls.get, ["a", "b"], window=2, buffer=2)
+
+    assert [next(messages), next(messages)] == ["a1", "b1"]
+    with pytest.raises(RuntimeError, match="stream lost"):
+        next(messages)
+
+
+class FakeAsyncCall:
+    def __init__(self, messages, release=None):
+        self.messages = messages
+        self.release = release
+        self.sent = 0
+        self.cancelled = False
+
+    async def __aiter__(self):
+        for index, message in enumerate(self.messages):
+            if index == 1 and self.release is not None:
+                await self.release.wait()
+            self.sent += 1
+            yield message
+
+    def cancel(self):
+        self.cancelled = True
+
+
+def test_stream_in_order_async_streams_in_order_within_its_buffer():
+    async def main():
+        release = asyncio.Event()
+        head = FakeAsyncCall(["a1", "a2"], release)
+        ahead = FakeAsyncCall([f"b{i}" for i in range(20)])
+        calls = {"a": head, "b": ahead}
+        messages = job_postings.stream_in_order_async(calls.get, ["a", "b"], window=2, buffer=3)
+
+        first = await messages.__anext__()
+        await asyncio.sleep(0.05)
+        sent_ahead = ahead.sent
+        release.set()
+        rest = [message async for message in messages]
+        return first, sent_ahead, rest
+
+    first, sent_ahead, rest = asyncio.run(main())
+    assert first == "a1"
+    assert sent_ahead <= 4
+    assert rest == ["a2"] + [f"b{i}" for i in range(20)]
+
+
+def test_closing_stream_in_order_async_early_cancels_the_streams():
+    async def main():
+        release = asyncio.Event()
+        calls = {"a": FakeAsyncCall(["a1", "a2"], release), "b": FakeAsyncCall([f"b{i}" for i in range(20)])}
+        messages = job_postings.stream_in_order_async(calls.get, ["a", "b"], window=2, buffer=2)
+        await messages.__anext__()
+        await messages.aclose()
+        await asyncio.sleep(0.05)
+        return calls
+
+    calls = asyncio.run(main())
+    assert calls["a"].cancelled and calls["b"].cancelled
+    assert calls["b"].sent < 20
@@ -0,0 +1,101 @@
+import asyncio
+
+import grpc
+import pytest
+from grpc_interceptor.exceptions import InvalidArgument
+
+import job_postings
+from data_access_pb2 import JobForRemote, RemoteJobSearchResponse
+from jobpostings_pb2 import RemoteJobSearchRequest
+
+
+class DownstreamError(grpc.RpcError):
+    def __init__(self, code, details):
+        self._code = code
+        self._details = details
+
+    def code(self):
+        return self._code
+
+    def details(self):
+        return self._details
+
+
+class RemoteJobs:
+    """A data_access stub that answers GetRemoteJobs with `response`, or raises it."""
+
+    def __init__(self, response):
+        self.response = response
+        self.requests = []
+
+    def GetRemoteJobs(self, request):
+        self.requests.append(request)
+        if isinstance(self.response, Exception):
+            raise self.response
+        return self.response
+
+
+class AsyncRemoteJobs(RemoteJobs):
+    async def GetRemoteJobs(self, request):
+        return RemoteJobs.GetRemoteJobs(self, request)
+
+
+def remote_jobs(monkeypatch, response, request):
+    stub = RemoteJobs(response)
+    monkeypatch.setattr(job_postings, "data_access_client", stub)
+    return job_postings.JobPostingService().GetRemoteJobs(request, context=None), stub.requests
+
+
+def test_search_and_paging_fields_are_passed_to_data_access(monkeypatch):
+    request = RemoteJobSearchRequest(
+        city="Lisbon", keyword="python", company="Acme", rank_by_relevance=True,
+        page_size=20, page_token="abc", include_total=True,
+    )
+    _, requests = remote_jobs(monkeypatch, RemoteJobSearchResponse(), request)
+
+    sent = requests[0]
+    assert (sent.city, sent.keyword, sent.company, sent.rank_by_relevance) == ("Lisbon", "python", "Acme", True)
+    assert (sent.page_size, sent.page_token, sent.include_total) == (20, "abc", True)
+
+
+def test_jobs_next_page_token_and_total_are_passed_back(monkeypatch):
+    page = RemoteJobSearchResponse(
+        jobs=[JobForRemote(id=7, title="Engineer", company="Acme", location="Lisbon", remote_allowed=True)],
+        next_page_token="next",
+        approximate_total=1200,
+    )
+    response, _ = remote_jobs(monkeypatch, page, RemoteJobSearchRequest(include_total=True))
+
+    assert [(job.id, job.title, job.remote_allowed) for job in response.jobs] == [("7", "Engineer", True)]
+    assert response.next_page_token == "next"
+    assert response.approximate_total == 1200
+
+
+def test_the_total_stays_unset_when_not_counted(monkeypatch):
+    response, _ = remote_jobs(monkeypatch, RemoteJobSearchResponse(next_page_token=""), RemoteJobSearchRequest())
+
+    assert not response.HasField("approximate_total")
+    assert response.next_page_token == ""
+
+
+def test_a_rejected_page_token_is_the_callers_mistake(monkeypatch):
+    error = DownstreamError(grpc.StatusCode.INVALID_ARGUMENT, "Invalid page_token: token belongs to another search")
+
+    with pytest.raises(InvalidArgument, match="another search"):
+        remote_jobs(monkeypatch, error, RemoteJobSearchRequest(page_token="stale"))
+
+
+def test_other_downstream_errors_are_raised_unchanged(monkeypatch):
+    error = DownstreamError(grpc.StatusCode.UNAVAILABLE, "connection refused")
+
+    with pytest.raises(DownstreamError) as raised:
+        remote_jobs(monkeypatch, error, RemoteJobSearchRequest())
+    assert raised.value is error
+
+
+def test_async_servicer_maps_a_rejected_page_token_too():
+    error = DownstreamError(grpc.StatusCode.INVALID_ARGUMENT, "page_size must not be negative")
+    service = job_postings.AsyncJobPostingService(AsyncRemoteJobs(error), job_reviews=None, max_concurrency=1)
+
+    with pytest.raises(InvalidArgument, match="page_size"):
+        asyncio.run(service.GetRemoteJobs(RemoteJobSearchRequest(page_size=-1), context=None))
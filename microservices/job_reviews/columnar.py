@@ -0,0 +1,93 @@
+"""Read-only access to the columnar table files written by
+datasets/export_columnar.py.
+
+Numeric columns are NumPy arrays over a read-only mmap of the column file:
+nothing is copied or parsed on open, pages are read on first touch and are
+shared through the page cache by every process that maps the same file.
+String columns are the same pair of int64 offsets and a UTF-8 blob, decoded
+one value at a time.
+"""
+import json, mmap, os
+
+import numpy as np
+
+FORMAT = "columnar-v1"
+
+DTYPES = {
+    "int32": np.dtype("<i4"),
+    "int64": np.dtype("<i8"),
+    "float64": np.dtype("<f8"),
+    "bool": np.dtype("?"),
+}
+
+def map_file(path, dtype):
+    """The whole file as a read-only array of `dtype`."""
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            # mmap cannot map an empty file.
+            return np.zeros(0, dtype)
+        # The mapping stays valid after the file is closed.
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return np.frombuffer(buffer, dtype)
+
+class StringColumn:
+    """A string column: row i is data[offsets[i]:offsets[i + 1]] as UTF-8."""
+
+    def __init__(self, offsets, data):
+        self.offsets = offsets
+        self.data = data
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        start, end = self.offsets[i], self.offsets[i + 1]
+        return self.data[start:end].tobytes().decode("utf-8")
+
+    def __iter__(self):
+        data = self.data.tobytes()
+        offsets = self.offsets.tolist()
+        for start, end in zip(offsets, offsets[1:]):
+            yield data[start:end].decode("utf-8")
+
+    def tolist(self):
+        return list(self)
+
+class ColumnarTable:
+    """One exported table directory (schema.json plus the column files)."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, "schema.json")) as f:
+            schema = json.load(f)
+        if schema.get("format") != FORMAT:
+            raise ValueError(f"{path}: unsupported columnar format {schema.get('format')!r}")
+        self.name = schema["table"]
+        self.rows = schema["rows"]
+        self.exported_at = schema.get("exported_at")
+        self.columns = {column["name"]: column for column in schema["columns"]}
+
+    def __len__(self):
+        return self.rows
+
+    def _file(self, name, suffix):
+        return os.path.join(self.path, f"{name}.{suffix}")
+
+    def column(self, name):
+        """A numeric column as an ndarray, or a string column as a StringColumn.
+
+        NULLs read as 0, NaN or "" respectively; see nulls().
+        """
+        spec = self.columns.get(name)
+        if spec is None:
+            raise KeyError(f"{self.name} has no column {name!r}")
+        if spec["type"] == "string":
+            return StringColumn(map_file(self._file(name, "offsets"), DTYPES["int64"]),
+                                map_file(self._file(name, "data"), np.uint8))
+        return map_file(self._file(name, "data"), DTYPES[spec["type"]])
+
+    def nulls(self, name):
+        """Boolean mask of the NULL rows of a column."""
+        if not self.columns[name]["nullable"]:
+            return np.zeros(self.rows, bool)
+        return map_file(self._file(name, "nulls"), DTYPES["bool"])
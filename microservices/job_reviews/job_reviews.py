@@ -1,12 +1,16 @@
-import random, os
+import asyncio, random, os
 from concurrent import futures
+from functools import wraps
 import grpc
 import jobreviews_pb2_grpc
 import jobreviews_pb2
-from grpc_interceptor import ExceptionToStatusInterceptor
+import telemetry
+from grpc_interceptor import AsyncExceptionToStatusInterceptor, ExceptionToStatusInterceptor
 from grpc_interceptor.exceptions import NotFound
-from data_access_pb2 import JobReviewRequestWithTitleAndCity, DeleteReviewRequest, CreateReviewRequest, Review, JobReviewsRequest, UpdateJobReviewRequest
+from data_access_pb2 import DeleteReviewRequest, CreateReviewRequest, Review, UpdateJobReviewRequest, CompanyRatingAggregatesRequest, BestCitiesRequest, JobReviewRatingsRequest, TitleAndCity
 from data_access_pb2_grpc import DataAccessServiceStub
+from rating_aggregation import COMPANY_RATING_COLUMNS, GroupTotals, best_cities, best_companies, rounded_ratings
+from review_snapshot import ReviewSnapshot
 from jobreviews_pb2 import (
     JobReview,
     JobWithRating,
@@ -16,316 +20,379 @@ from jobreviews_pb2 import (
     UpdateJobReviewResponse,
     BestRatingCity,
     BestCityResponse,
-    DeleteReviewResponse
+    DeleteReviewResponse,
+    BulkBatchResult,
+    BulkIngestResponse
 )
 
+telemetry.set_service("job_reviews")
+
 data_access_host = os.getenv("DATA_ACCESS_HOST", "data-access-service")
-job_reviews_channel = grpc.insecure_channel(f"{data_access_host}:50051", options=[
-    ('grpc.max_send_message_length', 10 * 1024 * 1024),
-    ('grpc.max_receive_message_length', 10 * 1024 * 1024)
-])
+# Only aggregates come back from data_access now, so the default 4 MB
+# message limit is enough; bulk reads use the streaming RPCs. The channel
+# passes the trace id on and times its calls.
+job_reviews_channel = telemetry.intercept_channel(grpc.insecure_channel(f"{data_access_host}:50051"))
 data_access_client = DataAccessServiceStub(job_reviews_channel)
+# data_access serves SubscribeInvalidations on a port of its own.
+data_access_invalidation_port = os.getenv("DATA_ACCESS_INVALIDATION_PORT", "50052")
+
+# GRPC_ASYNC=1 serves with grpc.aio instead of a thread pool. In-flight
+# requests are then capped by a semaphore of GRPC_MAX_CONCURRENCY.
+GRPC_ASYNC = os.getenv("GRPC_ASYNC", "").lower() in ("1", "true", "yes")
+GRPC_MAX_CONCURRENCY = int(os.getenv("GRPC_MAX_CONCURRENCY", 100))
+
+# REVIEW_SNAPSHOT=1 answers GetBestCompanies and BestCity from an
+# in-memory copy of the review ratings (see review_snapshot), falling back
+# to data_access while it is more than REVIEW_SNAPSHOT_MAX_STALENESS
+# seconds behind.
+REVIEW_SNAPSHOT = os.getenv("REVIEW_SNAPSHOT", "").lower() in ("1", "true", "yes")
+REVIEW_SNAPSHOT_MAX_STALENESS = float(os.getenv("REVIEW_SNAPSHOT_MAX_STALENESS", 30))
+# REVIEW_SNAPSHOT_PATH points at a columnar export of the reviews table
+# (datasets/export_columnar.py) to serve from while the first scan runs.
+REVIEW_SNAPSHOT_PATH = os.getenv("REVIEW_SNAPSHOT_PATH")
+
+def review_from_job_review(jobReview):
+    # Convert jobreviews_pb2.ReviewinJob to data_access_pb2.Review
+    return Review(
+        firm=jobReview.firm if jobReview.firm else "",  # Default to empty string if not provided
+        job_title=jobReview.job_title if jobReview.job_title else "",
+        current=jobReview.current if jobReview.current else "",
+        location=jobReview.location if jobReview.location else "",
+        overall_rating=jobReview.overall_rating if jobReview.overall_rating != 0 else 0,
+        work_life_balance=jobReview.work_life_balance if jobReview.work_life_balance != 0 else 0.0,
+        culture_values=jobReview.culture_values if jobReview.culture_values != 0 else 0.0,
+        diversity_inclusion=jobReview.diversity_inclusion if jobReview.diversity_inclusion != 0 else 0.0,
+        career_opp=jobReview.career_opp if jobReview.career_opp != 0 else 0.0,
+        comp_benefits=jobReview.comp_benefits if jobReview.comp_benefits != 0 else 0.0,
+        senior_mgmt=jobReview.senior_mgmt if jobReview.senior_mgmt != 0 else 0.0,
+        recommend=jobReview.recommend if jobReview.recommend else "",
+        ceo_approv=jobReview.ceo_approv if jobReview.ceo_approv else "",
+        outlook=jobReview.outlook if jobReview.outlook else "",
+        headline=jobReview.headline if jobReview.headline else "",
+        pros=jobReview.pros if jobReview.pros else "",
+        cons=jobReview.cons if jobReview.cons else ""
+    )
+
+def forwarded_metadata(context, keys=("batch-size",)):
+    return [(key, value) for key, value in context.invocation_metadata() if key in keys]
+
+def write_metadata(snapshot):
+    # Writes the snapshot applies itself are tagged so it skips their events.
+    return snapshot.write_metadata() if snapshot is not None else []
+
+# The helpers below build this service's responses from data_access
+# responses. Both servicers use them; they only differ in how they call
+# data_access.
+
+def ratings_request_for_jobs(jobs):
+    # Look up every distinct (title, city) pair in one batched call
+    # instead of one call per job. None if there is nothing to look up.
+    pairs = list(dict.fromkeys((job.title, job.location) for job in jobs))
+    if not pairs:
+        return None
+    return JobReviewRatingsRequest(
+        pair=[TitleAndCity(title=title, city=city) for title, city in pairs]
+    )
+
+def calculate_rating_response(jobs, ratingsResponse):
+    jobsWithRating = []
+    ratings = {}
+    if ratingsResponse is not None:
+        ratings = {(r.title, r.city): r for r in ratingsResponse.rating}
+
+    matched = [ratings.get((job.title, job.location)) for job in jobs]
+    overall_ratings = rounded_ratings(
+        [rating.rating_sum if rating else 0.0 for rating in matched],
+        [rating.review_count if rating else 0 for rating in matched]
+    )
+
+    for job, overall_rating in zip(jobs, overall_ratings):
+        jobWithRating = JobWithRating(
+            rating=int(overall_rating),
+            job= JobReview (
+                id=str(job.id),
+                title=str(job.title),
+                company_name=str(job.company_name),
+                description=str(job.description),
+                location=str(job.location),
+                views=int(job.views),
+                salary=int(job.salary)
+            )
+        )
+
+        jobsWithRating.append(jobWithRating)
+
+    return CalculateRatingResponse(rating=jobsWithRating)
+
+def best_companies_response(totals):
+    # Debug 1: No reviews found.
+    if not totals.keys:
+        debug_company = jobreviews_pb2.CompanyReview(
+            firm="DEBUG: NO REVIEWS FOUND",
+            overall_rating=-100,
+            work_life_balance=0.0,
+            culture_values=0.0,
+            diversity_inclusion=0.0,
+            career_opp=0.0
+        )
+        return BestCompaniesResponse(companyReview=[debug_company])
+
+    # Average each of the five ratings per firm (missing ratings count as
+    # 0) and keep the 5 firms with the highest mean of the five, all as
+    # array operations over every firm at once.
+    top_companies = [
+        jobreviews_pb2.CompanyReview(
+            firm=firm,
+            overall_rating=int(round(means["overall_rating"])),
+            work_life_balance=means["work_life_balance"],
+            culture_values=means["culture_values"],
+            diversity_inclusion=means["diversity_inclusion"],
+            career_opp=means["career_opp"]
+        )
+        for firm, means in best_companies(totals, limit=5)
+    ]
+
+    return BestCompaniesResponse(companyReview=top_companies)
+
+def company_totals(aggregatesResponse):
+    return GroupTotals.from_aggregates(aggregatesResponse.company, "firm", COMPANY_RATING_COLUMNS)
+
+def update_request_from(request):
+    # Create the update request message from the incoming request.
+    return UpdateJobReviewRequest(
+        id=request.id,
+        current_status=request.current_status,
+        rating=request.rating,
+        headline=request.headline
+    )
+
+def best_city_response(bestCitiesResponse):
+    top_10_cities = [
+        BestRatingCity(
+            city=city.city,
+            average_rating=city.average_rating
+        )
+        for city in bestCitiesResponse.city
+    ]
+
+    return BestCityResponse(city=top_10_cities)
+
+def snapshot_best_city_response(totals):
+    return BestCityResponse(city=[
+        BestRatingCity(city=city, average_rating=average_rating)
+        for city, average_rating, _ in best_cities(totals, limit=10)
+    ])
+
+def review_snapshot():
+    if not REVIEW_SNAPSHOT:
+        return None
+    # The snapshot loads and follows changes from its own threads with the
+    # synchronous stub, in either server mode.
+    invalidations = DataAccessServiceStub(grpc.insecure_channel(f"{data_access_host}:{data_access_invalidation_port}"))
+    snapshot = ReviewSnapshot(data_access_client, invalidations, max_staleness=REVIEW_SNAPSHOT_MAX_STALENESS)
+    if REVIEW_SNAPSHOT_PATH:
+        try:
+            snapshot.load_file(REVIEW_SNAPSHOT_PATH)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Error loading review snapshot file {REVIEW_SNAPSHOT_PATH}: {e}")
+    snapshot.start()
+    return snapshot
+
+def bulk_ingest_response(bulkResponse):
+    return BulkIngestResponse(
+        accepted=bulkResponse.accepted,
+        rejected=bulkResponse.rejected,
+        batch=[
+            BulkBatchResult(batch=b.batch, accepted=b.accepted, rejected=b.rejected, error=b.error)
+            for b in bulkResponse.batch
+        ]
+    )
 
 class JobReviewService(jobreviews_pb2_grpc.JobReviewServiceServicer):
+    def __init__(self, snapshot=None):
+        self.snapshot = snapshot
+
     def CalculateRating(self, request, context):
-        
-        jobsWithRating = []
-        
-        for job in request.jobs:
-            jobReviewRequest = JobReviewRequestWithTitleAndCity(title=job.title, city=job.location)
-            jobReviewResponse = data_access_client.GetJobReviewsWithTitleAndCity(jobReviewRequest)
-            
-            jobRatingTotal = 0.0
-            count = 0
-            for jobReview in jobReviewResponse.review:
-                total = 0
-                howMany = 0
-                if(jobReview.work_life_balance != 0):
-                    total += int(jobReview.work_life_balance)
-                    howMany += 1
-                if(jobReview.culture_values != 0):
-                    total += int(jobReview.culture_values)
-                    howMany += 1                    
-                if(jobReview.diversity_inclusion != 0):
-                    total += int(jobReview.diversity_inclusion)
-                    howMany += 1
-                if(jobReview.career_opp != 0):
-                    total += int(jobReview.career_opp)
-                    howMany += 1
-                if(jobReview.comp_benefits != 0):
-                    total += int(jobReview.comp_benefits)
-                    howMany += 1
-                if(jobReview.senior_mgmt != 0):
-                    total += int(jobReview.senior_mgmt)
-                    howMany += 1
-                if(howMany > 0):
-                    jobRatingTotal += (total/howMany)
-                    count +=1
-            overall_rating = jobRatingTotal / count if count > 0 else 0
-            
-            jobWithRating = JobWithRating(
-                rating=int(round(overall_rating)),  # Assuming the rating is an integer
-                job= JobReview (
-                    id=str(job.id), 
-                    title=str(job.title),
-                    company_name=str(job.company_name),
-                    description=str(job.description),
-                    location=str(job.location),
-                    views=int(job.views),
-                    salary=int(job.salary)
-                )
-            )
-            
-            jobsWithRating.append(jobWithRating)
-            
-        return CalculateRatingResponse(rating=jobsWithRating)
-    
+        ratingsRequest = ratings_request_for_jobs(request.jobs)
+        ratingsResponse = None
+        if ratingsRequest is not None:
+            ratingsResponse = data_access_client.GetJobReviewRatingsForTitlesAndCities(ratingsRequest)
+
+        return calculate_rating_response(request.jobs, ratingsResponse)
+
     def CreateReview(self, request, context):
-        
-        review =  Review(
-            firm=request.review.firm if request.review.firm else "",  # Default to empty string if not provided
-            job_title=request.review.job_title if request.review.job_title else "",
-            current=request.review.current if request.review.current else "",
-            location=request.review.location if request.review.location else "",
-            overall_rating=request.review.overall_rating if request.review.overall_rating != 0 else 0,
-            work_life_balance=request.review.work_life_balance if request.review.work_life_balance != 0 else 0.0,
-            culture_values=request.review.culture_values if request.review.culture_values != 0 else 0.0,
-            diversity_inclusion=request.review.diversity_inclusion if request.review.diversity_inclusion != 0 else 0.0,
-            career_opp=request.review.career_opp if request.review.career_opp != 0 else 0.0,
-            comp_benefits=request.review.comp_benefits if request.review.comp_benefits != 0 else 0.0,
-            senior_mgmt=request.review.senior_mgmt if request.review.senior_mgmt != 0 else 0.0,
-            recommend=request.review.recommend if request.review.recommend else "",
-            ceo_approv=request.review.ceo_approv if request.review.ceo_approv else "",
-            outlook=request.review.outlook if request.review.outlook else "",
-            headline=request.review.headline if request.review.headline else "",
-            pros=request.review.pros if request.review.pros else "",
-            cons=request.review.cons if request.review.cons else ""
-        )
-        
+
+        review = review_from_job_review(request.review)
+
         createReviewRequest = CreateReviewRequest(review=review)
-        createReviewResponse = data_access_client.CreateReview(createReviewRequest)
-        
+        createReviewResponse = data_access_client.CreateReview(createReviewRequest, metadata=write_metadata(self.snapshot))
+        if self.snapshot is not None and createReviewResponse.review_id:
+            self.snapshot.apply_create(createReviewResponse.review_id, review)
+
         return CreateReviewResponse(success=createReviewResponse.success)
-        
-        
+
+
     def GetBestCompanies(self, request, context):
-        # Retrieve reviews in batches.
-        all_reviews = []
-        offset = 0
-        limit = 42000  # Adjust this limit as needed.
-        while True:
-            paginatedRequest = JobReviewsRequest(
-                limit=limit,
-                offset=offset
-            )
-            jobReviewsResponse = data_access_client.GetJobReviewsForCompanyReview(paginatedRequest)
-            batch_reviews = jobReviewsResponse.review
-            if not batch_reviews:
-                break
-            all_reviews.extend(batch_reviews)
-            if len(batch_reviews) < limit:
-                break
-            offset += limit
-
-        # Debug 1: No reviews found.
-        if not all_reviews:
-            debug_company = jobreviews_pb2.CompanyReview(
-                firm="DEBUG: NO REVIEWS FOUND",
-                overall_rating=-100,
-                work_life_balance=0.0,
-                culture_values=0.0,
-                diversity_inclusion=0.0,
-                career_opp=0.0
-            )
-            return BestCompaniesResponse(companyReview=[debug_company])
-
-        # Group reviews by firm.
-        firm_reviews = {}
-        for r in all_reviews:
-            firm = r.firm
-            if firm not in firm_reviews:
-                firm_reviews[firm] = []
-            firm_reviews[firm].append(r)
-
-        # Debug 2: No firm grouping occurred.
-        if not firm_reviews:
-            debug_company = jobreviews_pb2.CompanyReview(
-                firm="DEBUG: NO FIRM GROUPING",
-                overall_rating=-101,
-                work_life_balance=0.0,
-                culture_values=0.0,
-                diversity_inclusion=0.0,
-                career_opp=0.0
-            )
-            return BestCompaniesResponse(companyReview=[debug_company])
-
-        # For each firm, compute the average for each rating type.
-        # The five ratings are: overall_rating, work_life_balance, culture_values, diversity_inclusion, career_opp.
-        company_reviews = []  # Will store tuples of (overall_avg, CompanyReview)
-        for firm, reviews_list in firm_reviews.items():
-            count = len(reviews_list)
-            total_overall = 0
-            total_wlb = 0.0
-            total_culture = 0.0
-            total_diversity = 0.0
-            total_career = 0.0
-
-            for r in reviews_list:
-                total_overall += r.overall_rating
-                total_wlb += r.work_life_balance
-                total_culture += r.culture_values
-                total_diversity += r.diversity_inclusion
-                total_career += r.career_opp
-
-            avg_overall = total_overall / count
-            avg_wlb = total_wlb / count
-            avg_culture = total_culture / count
-            avg_diversity = total_diversity / count
-            avg_career = total_career / count
-
-            # Compute an overall average across all five ratings (for sorting).
-            overall_avg = (avg_overall + avg_wlb + avg_culture + avg_diversity + avg_career) / 5.0
-
-            # Create a CompanyReview message.
-            company_review = jobreviews_pb2.CompanyReview(
-                firm=firm,
-                overall_rating=int(round(avg_overall)),
-                work_life_balance=avg_wlb,
-                culture_values=avg_culture,
-                diversity_inclusion=avg_diversity,
-                career_opp=avg_career
-            )
-            company_reviews.append((overall_avg, company_review))
-
-        # Debug 3: No companies computed.
-        if not company_reviews:
-            debug_company = jobreviews_pb2.CompanyReview(
-                firm="DEBUG: NO COMPANY REVIEWS COMPUTED",
-                overall_rating=-102,
-                work_life_balance=0.0,
-                culture_values=0.0,
-                diversity_inclusion=0.0,
-                career_opp=0.0
-            )
-            return BestCompaniesResponse(companyReview=[debug_company])
-
-        # Sort the companies by overall average (descending) and pick the top 5.
-        company_reviews.sort(key=lambda x: (x[0], x[1].firm), reverse=True)
-        top_companies = [cr for _, cr in company_reviews[:5]]
-
-        # Debug 4: Top companies list is empty.
-        if not top_companies:
-            debug_company = jobreviews_pb2.CompanyReview(
-                firm="DEBUG: TOP COMPANIES EMPTY",
-                overall_rating=-103,
-                work_life_balance=0.0,
-                culture_values=0.0,
-                diversity_inclusion=0.0,
-                career_opp=0.0
-            )
-            return BestCompaniesResponse(companyReview=[debug_company])
+        totals = self.snapshot.company_totals() if self.snapshot is not None else None
+        if totals is None:
+            # Per-firm rating totals are maintained by data_access, so only one
+            # small row per firm crosses the wire instead of the whole table.
+            totals = company_totals(data_access_client.GetCompanyRatingAggregates(CompanyRatingAggregatesRequest()))
 
-        return BestCompaniesResponse(companyReview=top_companies)
+        return best_companies_response(totals)
 
     def UpdateJobReview(self, request, context):
-        # Create the update request message from the incoming request.
-        update_req = UpdateJobReviewRequest(
-            id=request.id,
-            current_status=request.current_status,
-            rating=request.rating,
-            headline=request.headline
-        )
-        
         # Delegate the update to the data access client.
-        update_resp = data_access_client.UpdateJobReview(update_req)
-        
+        update_resp = data_access_client.UpdateJobReview(update_request_from(request), metadata=write_metadata(self.snapshot))
+        if self.snapshot is not None and update_resp.success:
+            self.snapshot.apply_update(request.id, request.rating)
+
         return update_resp
     def BestCity(self, request, context):
-        
-        all_reviews = []
-        offset = 0
-        limit = 7000
-        
-        while True:
-            paginatedRequest = JobReviewsRequest(
-                limit=limit,
-                offset=offset
-            )
-            jobReviewsResponse = data_access_client.GetJobReviewsForLocationReview(paginatedRequest)
-            batch_reviews = jobReviewsResponse.review
-            if not batch_reviews:
-                break
-            all_reviews.extend(batch_reviews)
-            if len(batch_reviews) < limit:
-                break
-            offset += limit
-
-        if all_reviews:
-            # Create a dictionary to store the sum of ratings by city
-            city_reviews = {}
-
-            for review in all_reviews:
-                city = review.location
-
-                # Initialize the city in the dictionary if it doesn't exist
-                if city not in city_reviews:
-                    city_reviews[city] = {
-                        "total_rating": 0,
-                        "count": 0
-                    }
-
-                # Sum the ratings for each city
-                city_reviews[city]["total_rating"] += (
-                    review.overall_rating +
-                    review.work_life_balance +
-                    review.culture_values +
-                    review.diversity_inclusion +
-                    review.career_opp +
-                    review.comp_benefits +
-                    review.senior_mgmt
-                )
-                city_reviews[city]["count"] += 7 
-
-            # Calculate the average for each city
-            cities_with_avg = []
-            for city, data in city_reviews.items():
-                average_rating = data["total_rating"] / data["count"] if data["count"] > 0 else 0.0
-                bestRatingCity = BestRatingCity(
-                    city=city,
-                    average_rating=average_rating
-                )
-                cities_with_avg.append(bestRatingCity)
-
-            # Sort the cities by average rating (in descending order) and take the top 10
-            top_10_cities = sorted(cities_with_avg, key=lambda x: x.average_rating, reverse=True)[:10]
-
-            
-            return BestCityResponse(city=top_10_cities)
-        else:
-            
-            return BestCityResponse(city=[])
-        
+        totals = self.snapshot.location_totals() if self.snapshot is not None else None
+        if totals is not None:
+            return snapshot_best_city_response(totals)
+
+        # Ranking and averaging happen in data_access over the per-location
+        # rating summary, so only the top 10 cities come back.
+        bestCitiesResponse = data_access_client.GetBestCities(BestCitiesRequest(limit=10))
+
+        return best_city_response(bestCitiesResponse)
 
     def DeleteReview(self, request, context):
         delete_request = DeleteReviewRequest(review_id=request.review_id)
 
         try:
-            delete_response = data_access_client.DeleteReview(delete_request)
+            delete_response = data_access_client.DeleteReview(delete_request, metadata=write_metadata(self.snapshot))
+            if self.snapshot is not None and delete_response.success:
+                self.snapshot.apply_delete(int(request.review_id))
+            return DeleteReviewResponse(success=delete_response.success, message=delete_response.message)
+        except grpc.RpcError as e:
+            context.set_code(grpc.StatusCode.INTERNAL)
+            context.set_details(f"Error deleting review: {e}")
+            return DeleteReviewResponse(success=False, message="Error deleting review")
+
+    def BulkCreateReviews(self, request_iterator, context):
+        # Reviews are forwarded as they arrive; data_access does the batching.
+        bulkResponse = data_access_client.BulkCreateReviews(
+            (review_from_job_review(review) for review in request_iterator),
+            metadata=forwarded_metadata(context)
+        )
+
+        return bulk_ingest_response(bulkResponse)
+
+def bounded(method):
+    # Run an async handler under the servicer's concurrency semaphore.
+    @wraps(method)
+    async def wrapper(self, request, context):
+        async with self.semaphore:
+            return await method(self, request, context)
+    return wrapper
+
+class AsyncJobReviewService(jobreviews_pb2_grpc.JobReviewServiceServicer):
+    """JobReviewService for grpc.aio; same behaviour, awaited data_access calls."""
+
+    def __init__(self, data_access, max_concurrency, snapshot=None):
+        self.data_access = data_access
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.snapshot = snapshot
+
+    @bounded
+    async def CalculateRating(self, request, context):
+        ratingsRequest = ratings_request_for_jobs(request.jobs)
+        ratingsResponse = None
+        if ratingsRequest is not None:
+            ratingsResponse = await self.data_access.GetJobReviewRatingsForTitlesAndCities(ratingsRequest)
+
+        return calculate_rating_response(request.jobs, ratingsResponse)
+
+    @bounded
+    async def CreateReview(self, request, context):
+        review = review_from_job_review(request.review)
+        createReviewResponse = await self.data_access.CreateReview(CreateReviewRequest(review=review), metadata=write_metadata(self.snapshot))
+        if self.snapshot is not None and createReviewResponse.review_id:
+            self.snapshot.apply_create(createReviewResponse.review_id, review)
+
+        return CreateReviewResponse(success=createReviewResponse.success)
+
+    @bounded
+    async def GetBestCompanies(self, request, context):
+        totals = self.snapshot.company_totals() if self.snapshot is not None else None
+        if totals is None:
+            totals = company_totals(await self.data_access.GetCompanyRatingAggregates(CompanyRatingAggregatesRequest()))
+
+        return best_companies_response(totals)
+
+    @bounded
+    async def UpdateJobReview(self, request, context):
+        update_resp = await self.data_access.UpdateJobReview(update_request_from(request), metadata=write_metadata(self.snapshot))
+        if self.snapshot is not None and update_resp.success:
+            self.snapshot.apply_update(request.id, request.rating)
+
+        return update_resp
+
+    @bounded
+    async def BestCity(self, request, context):
+        totals = self.snapshot.location_totals() if self.snapshot is not None else None
+        if totals is not None:
+            return snapshot_best_city_response(totals)
+
+        bestCitiesResponse = await self.data_access.GetBestCities(BestCitiesRequest(limit=10))
+
+        return best_city_response(bestCitiesResponse)
+
+    @bounded
+    async def DeleteReview(self, request, context):
+        delete_request = DeleteReviewRequest(review_id=request.review_id)
+
+        try:
+            delete_response = await self.data_access.DeleteReview(delete_request, metadata=write_metadata(self.snapshot))
+            if self.snapshot is not None and delete_response.success:
+                self.snapshot.apply_delete(int(request.review_id))
             return DeleteReviewResponse(success=delete_response.success, message=delete_response.message)
         except grpc.RpcError as e:
             context.set_code(grpc.StatusCode.INTERNAL)
             context.set_details(f"Error deleting review: {e}")
             return DeleteReviewResponse(success=False, message="Error deleting review")
 
-        
+    @bounded
+    async def BulkCreateReviews(self, request_iterator, context):
+        async def reviews():
+            async for review in request_iterator:
+                yield review_from_job_review(review)
+
+        bulkResponse = await self.data_access.BulkCreateReviews(
+            reviews(), metadata=forwarded_metadata(context)
+        )
+
+        return bulk_ingest_response(bulkResponse)
+
+async def serve_async():
+    # aio channels must be created inside the running event loop.
+    data_access_channel = grpc.aio.insecure_channel(f"{data_access_host}:50051", interceptors=telemetry.async_client_interceptors())
+    server = grpc.aio.server(interceptors=[telemetry.AsyncServerMetricsInterceptor(), AsyncExceptionToStatusInterceptor()])
+    jobreviews_pb2_grpc.add_JobReviewServiceServicer_to_server(
+        AsyncJobReviewService(DataAccessServiceStub(data_access_channel), GRPC_MAX_CONCURRENCY, review_snapshot()),
+        server
+    )
+    telemetry.start_metrics_server()
+    server.add_insecure_port("[::]:50051")
+    await server.start()
+    await server.wait_for_termination()
+
 def serve():
-    interceptors = [ExceptionToStatusInterceptor()]
+    if GRPC_ASYNC:
+        asyncio.run(serve_async())
+        return
+
+    interceptors = [telemetry.ServerMetricsInterceptor(), ExceptionToStatusInterceptor()]
     server = grpc.server(
         futures.ThreadPoolExecutor(max_workers=10), interceptors=interceptors
     )
     jobreviews_pb2_grpc.add_JobReviewServiceServicer_to_server(
-        JobReviewService(), server
+        JobReviewService(review_snapshot()), server
     )
+    telemetry.start_metrics_server()
     server.add_insecure_port("[::]:50051")
     server.start()
     server.wait_for_termination()
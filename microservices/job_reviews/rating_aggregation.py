@@ -0,0 +1,117 @@
+"""Vectorised rating aggregation for job_reviews.
+
+GroupTotals comes either from data_access's summary rows or, in the
+review snapshot, from reviews held column-wise: one array per rating, NaN
+where the rating is missing, and dictionary-encoded group keys. There a
+group-by is one np.bincount per rating column, so the work per review is
+a handful of array operations rather than attribute lookups and dict
+updates.
+
+The formulas are the ones data_access uses for its rating summaries:
+GetBestCompanies and BestCity average each rating over every review of
+the group, so a missing rating counts as 0. A rating of 0 is treated as
+missing, since that is what an unset proto field holds.
+"""
+import numpy as np
+
+COMPANY_RATING_COLUMNS = (
+    "overall_rating",
+    "work_life_balance",
+    "culture_values",
+    "diversity_inclusion",
+    "career_opp",
+)
+LOCATION_RATING_COLUMNS = COMPANY_RATING_COLUMNS + ("comp_benefits", "senior_mgmt")
+
+def present(values):
+    """Mask of the ratings that are set (neither NaN nor 0)."""
+    return ~np.isnan(values) & (values != 0)
+
+def top(scores, keys, limit, descending_keys=False):
+    """Indices of the `limit` highest scores, ties broken by key."""
+    key_rank = np.unique(np.asarray(keys, dtype=str), return_inverse=True)[1].reshape(-1)
+    if descending_keys:
+        key_rank = -key_rank
+    return np.lexsort((key_rank, -scores))[:limit]
+
+class GroupTotals:
+    """Per-group review counts and rating sums and counts.
+
+    Laid out like the rating summary tables in data_access: review_count
+    counts every review of a group, sums[c] and counts[c] only those where
+    rating c is set.
+    """
+
+    def __init__(self, keys, review_count, sums, counts):
+        self.keys = keys
+        self.review_count = review_count
+        self.sums = sums
+        self.counts = counts
+
+    @classmethod
+    def from_codes(cls, codes, keys, ratings, columns):
+        n = len(keys)
+        sums, counts = {}, {}
+        for column in columns:
+            values = ratings[column]
+            mask = present(values)
+            sums[column] = np.bincount(codes, weights=np.where(mask, values, 0.0), minlength=n)
+            counts[column] = np.bincount(codes, weights=mask, minlength=n).astype(np.int64)
+        return cls(keys, np.bincount(codes, minlength=n), sums, counts)
+
+    @classmethod
+    def from_aggregates(cls, aggregates, key, columns):
+        """From summary rows with `key`, review_count and {column}_sum/_count."""
+        aggregates = list(aggregates)
+        return cls(
+            [getattr(a, key) for a in aggregates],
+            np.array([a.review_count for a in aggregates], dtype=np.int64),
+            {c: np.array([getattr(a, f"{c}_sum") for a in aggregates], dtype=np.float64) for c in columns},
+            {c: np.array([getattr(a, f"{c}_count") for a in aggregates], dtype=np.int64) for c in columns},
+        )
+
+    def nonempty(self):
+        """The groups that still have reviews."""
+        keep = self.review_count > 0
+        return GroupTotals(
+            [key for key, kept in zip(self.keys, keep) if kept],
+            self.review_count[keep],
+            {column: total[keep] for column, total in self.sums.items()},
+            {column: count[keep] for column, count in self.counts.items()},
+        )
+
+    def means(self):
+        """{column: per-group mean}, missing ratings counting as 0."""
+        return {column: total / self.review_count for column, total in self.sums.items()}
+
+def best_companies(totals, limit=5):
+    """[(firm, {column: mean})] for the firms with the highest mean of the five ratings.
+
+    Ties are broken by firm name, descending, as GetBestCompanies always has.
+    """
+    means = totals.means()
+    overall = (
+        means["overall_rating"] + means["work_life_balance"] + means["culture_values"]
+        + means["diversity_inclusion"] + means["career_opp"]
+    ) / 5.0
+    return [
+        (totals.keys[i], {column: float(means[column][i]) for column in COMPANY_RATING_COLUMNS})
+        for i in top(overall, totals.keys, limit, descending_keys=True)
+    ]
+
+def best_cities(totals, limit=10):
+    """[(location, average_rating, review_count)] like data_access's GetBestCities."""
+    total = sum(totals.sums[column] for column in LOCATION_RATING_COLUMNS)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        average = total / (7.0 * totals.review_count)
+    average = np.where(totals.review_count > 0, average, -np.inf)
+    order = [i for i in top(average, totals.keys, limit) if totals.review_count[i] > 0]
+    return [(totals.keys[i], float(average[i]), int(totals.review_count[i])) for i in order]
+
+def rounded_ratings(rating_sums, review_counts):
+    """int(round(sum / count)) per entry, 0 where the count is 0."""
+    rating_sums = np.asarray(rating_sums, dtype=np.float64)
+    review_counts = np.asarray(review_counts, dtype=np.int64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        means = np.where(review_counts > 0, rating_sums / review_counts, 0.0)
+    return np.rint(means).astype(np.int64)
@@ -0,0 +1,361 @@
+"""In-process columnar snapshot of the review ratings.
+
+Holds the numeric review columns in RAM so GetBestCompanies and BestCity
+can be answered without a data_access round trip:
+- ids (int64),
+- firm and location as dictionary-encoded int32 codes,
+- one float32 array per rating,
+- a live mask for deleted rows.
+
+The snapshot is loaded with one StreamJobReviews scan of just those
+columns. Writes made through this service are applied as deltas straight
+away; they carry this snapshot's origin, so the invalidation events they
+cause are skipped. Other single-review writes (other replicas) arrive as
+data_access invalidation events naming the review ids, and only those
+reviews are fetched again. Events without ids (bulk imports, resets)
+trigger a rescan. While such a change is not yet reflected the snapshot is
+stale; once it has been stale for longer than `max_staleness` seconds,
+readers get None and fall back to data_access.
+
+load_file() gives a warm start from a columnar export of the reviews table
+(see columnar): the snapshot serves the exported data at once and is
+treated as stale from that moment, so the first rescan has `max_staleness`
+seconds to catch up before requests fall back to data_access.
+"""
+import math, sys, threading, time, uuid
+
+import grpc
+import numpy as np
+from columnar import ColumnarTable
+from data_access_pb2 import InvalidationRequest, JobReviewsRequest
+from rating_aggregation import COMPANY_RATING_COLUMNS, LOCATION_RATING_COLUMNS, GroupTotals
+
+STREAM_CHUNK_SIZE = 5000
+# The review fields the snapshot keeps; the scans select only these.
+SNAPSHOT_FIELDS = ["id", "firm", "location", *LOCATION_RATING_COLUMNS]
+
+def pg_int(value):
+    # overall_rating is an INT column; Postgres rounds half away from zero.
+    return int(math.copysign(math.floor(abs(value) + 0.5), value))
+
+class Dictionary:
+    """Dictionary encoding of a string column."""
+
+    def __init__(self):
+        self.values = []
+        self.codes = {}
+
+    def code(self, value):
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def nbytes(self):
+        return (
+            sys.getsizeof(self.values) + sys.getsizeof(self.codes)
+            + sum(sys.getsizeof(value) for value in self.values)
+        )
+
+class SnapshotColumns:
+    """Appendable review columns, with rows looked up by review id.
+
+    Rows from the scan are ordered by id and found with a binary search;
+    only rows added afterwards need an entry in the `added` dict.
+    """
+
+    def __init__(self, capacity=1024):
+        self.firms = Dictionary()
+        self.locations = Dictionary()
+        self.size = 0
+        self.scanned = 0
+        self.added = {}
+        self.ids = np.zeros(capacity, np.int64)
+        self.firm = np.zeros(capacity, np.int32)
+        self.location = np.zeros(capacity, np.int32)
+        self.live = np.zeros(capacity, bool)
+        self.ratings = {column: np.zeros(capacity, np.float32) for column in LOCATION_RATING_COLUMNS}
+
+    def _reserve(self, n):
+        if self.size + n <= len(self.ids):
+            return
+        capacity = max(self.size + n, 2 * len(self.ids))
+
+        def grow(array):
+            grown = np.zeros(capacity, array.dtype)
+            grown[:self.size] = array[:self.size]
+            return grown
+
+        self.ids, self.firm, self.location, self.live = (
+            grow(self.ids), grow(self.firm), grow(self.location), grow(self.live)
+        )
+        self.ratings = {column: grow(values) for column, values in self.ratings.items()}
+
+    @classmethod
+    def from_table(cls, table):
+        """Columns from an exported reviews table (a columnar.ColumnarTable).
+
+        The file columns are copied, since the snapshot applies deltas in place.
+        """
+        ids = table.column("id")
+        order = np.argsort(ids, kind="stable")
+        columns = cls(capacity=max(len(ids), 1))
+        n = columns.size = columns.scanned = len(ids)
+        columns.ids[:n] = ids[order]
+        columns.firm[:n] = np.fromiter(map(columns.firms.code, table.column("firm")), np.int32, n)[order]
+        columns.location[:n] = np.fromiter(map(columns.locations.code, table.column("location")), np.int32, n)[order]
+        columns.live[:n] = True
+        for column, values in columns.ratings.items():
+            # NULL ratings were exported as 0 or NaN; both read as missing.
+            values[:n] = table.column(column)[order]
+        return columns
+
+    def extend_scanned(self, reviews):
+        """Append a chunk of the id-ordered scan."""
+        n = len(reviews)
+        self._reserve(n)
+        rows = slice(self.size, self.size + n)
+        self.ids[rows] = np.fromiter((r.id for r in reviews), np.int64, n)
+        self.firm[rows] = np.fromiter((self.firms.code(r.firm) for r in reviews), np.int32, n)
+        self.location[rows] = np.fromiter((self.locations.code(r.location) for r in reviews), np.int32, n)
+        self.live[rows] = True
+        for column, values in self.ratings.items():
+            values[rows] = np.fromiter((getattr(r, column) for r in reviews), np.float32, n)
+        self.size += n
+        self.scanned = self.size
+
+    def row(self, review_id):
+        i = int(np.searchsorted(self.ids[:self.scanned], review_id))
+        if i < self.scanned and self.ids[i] == review_id:
+            return i
+        return self.added.get(review_id)
+
+    def put(self, review_id, review):
+        row = self.row(review_id)
+        if row is None:
+            self._reserve(1)
+            row = self.added[review_id] = self.size
+            self.size += 1
+        self.ids[row] = review_id
+        self.firm[row] = self.firms.code(review.firm)
+        self.location[row] = self.locations.code(review.location)
+        self.live[row] = True
+        for column, values in self.ratings.items():
+            values[row] = getattr(review, column)
+
+    def set_rating(self, review_id, column, value):
+        row = self.row(review_id)
+        if row is not None:
+            self.ratings[column][row] = value
+
+    def remove(self, review_id):
+        row = self.row(review_id)
+        if row is not None:
+            self.live[row] = False
+
+    def totals(self, key, columns):
+        live = self.live[:self.size]
+        codes, dictionary = (self.firm, self.firms) if key == "firm" else (self.location, self.locations)
+        ratings = {column: self.ratings[column][:self.size][live] for column in columns}
+        return GroupTotals.from_codes(codes[:self.size][live], dictionary.values, ratings, columns).nonempty()
+
+    def live_count(self):
+        return int(self.live[:self.size].sum())
+
+    def nbytes(self):
+        arrays = [self.ids, self.firm, self.location, self.live, *self.ratings.values()]
+        return (
+            sum(array.nbytes for array in arrays) + self.firms.nbytes() + self.locations.nbytes()
+            + sys.getsizeof(self.added)
+        )
+
+def apply_delta(columns, delta):
+    kind, review_id, value = delta
+    if kind == "put":
+        columns.put(review_id, value)
+    elif kind == "rating":
+        columns.set_rating(review_id, "overall_rating", value)
+    else:
+        columns.remove(review_id)
+
+class ReviewSnapshot:
+    """Rating snapshot kept current by local deltas and rescans.
+
+    `data_access` is a synchronous DataAccessServiceStub, and
+    `invalidations` one for data_access's subscription port (default:
+    `data_access`). Call start() to begin loading and following changes in
+    background threads.
+    """
+
+    def __init__(self, data_access, invalidations=None, max_staleness=30.0, rebuild_delay=1.0, clock=time.monotonic):
+        self.data_access = data_access
+        self.invalidations = invalidations or data_access
+        self.max_staleness = max_staleness
+        self.rebuild_delay = rebuild_delay
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._columns = None
+        self._totals = {}
+        self._rebuilding = False
+        self._pending = []  # Deltas applied while a rescan is running.
+        self._dirty_since = clock()
+        self._last_change = clock()
+        self._rebuild_needed = threading.Event()
+        self._rebuild_needed.set()
+        # Sent as "origin" metadata with the writes this snapshot applies itself.
+        self.origin = uuid.uuid4().hex
+
+    def start(self):
+        threading.Thread(target=self._follow_invalidations, daemon=True).start()
+        threading.Thread(target=self._rebuild_loop, daemon=True).start()
+
+    def company_totals(self):
+        """Per-firm GroupTotals, or None if the snapshot is not usable."""
+        return self._fresh_totals("firm", COMPANY_RATING_COLUMNS)
+
+    def location_totals(self):
+        """Per-location GroupTotals, or None if the snapshot is not usable."""
+        return self._fresh_totals("location", LOCATION_RATING_COLUMNS)
+
+    def _fresh_totals(self, key, columns):
+        with self._lock:
+            if self._columns is None:
+                return None
+            if self._dirty_since is not None and self._clock() - self._dirty_since > self.max_staleness:
+                return None
+            # Totals are cached until the next change to the columns.
+            totals = self._totals.get(key)
+            if totals is None:
+                totals = self._totals[key] = self._columns.totals(key, columns)
+            return totals
+
+    def load_file(self, path):
+        """Serve the reviews exported to `path` until the first rescan replaces them."""
+        table = ColumnarTable(path)
+        columns = SnapshotColumns.from_table(table)
+        with self._lock:
+            if self._columns is not None:
+                return
+            self._columns = columns
+            self._totals.clear()
+            self._dirty_since = self._clock()
+        print(f"Review snapshot warm start: {len(table)} reviews exported at {table.exported_at}")
+
+    def apply_create(self, review_id, review):
+        self._apply(("put", review_id, review))
+
+    def apply_update(self, review_id, rating):
+        self._apply(("rating", review_id, pg_int(rating)))
+
+    def apply_delete(self, review_id):
+        self._apply(("delete", review_id, None))
+
+    def write_metadata(self):
+        """Metadata for the writes passed to apply_*; data_access tags their events with it."""
+        return [("origin", self.origin)]
+
+    def refresh(self, review_ids):
+        """Fetch the current state of some reviews and apply it; missing ones were deleted."""
+        request = JobReviewsRequest(limit=STREAM_CHUNK_SIZE, ids=review_ids, fields=SNAPSHOT_FIELDS)
+        found = {}
+        for chunk in self.data_access.StreamJobReviews(request):
+            for review in chunk.review:
+                found[review.id] = review
+        for review_id in review_ids:
+            review = found.get(review_id)
+            self._apply(("put", review_id, review) if review is not None else ("delete", review_id, None))
+
+    def _apply(self, delta):
+        with self._lock:
+            if self._rebuilding:
+                self._pending.append(delta)
+            if self._columns is not None:
+                apply_delta(self._columns, delta)
+                self._totals.clear()
+
+    def mark_changed(self):
+        """Record a change to the reviews that the snapshot may not reflect."""
+        with self._lock:
+            self._last_change = self._clock()
+            if self._dirty_since is None:
+                self._dirty_since = self._last_change
+        self._rebuild_needed.set()
+
+    def memory_usage(self):
+        with self._lock:
+            if self._columns is None:
+                return {"reviews": 0, "bytes": 0}
+            return {"reviews": self._columns.live_count(), "bytes": self._columns.nbytes()}
+
+    def rebuild(self):
+        """Rescan every review and swap the new columns in."""
+        with self._lock:
+            self._rebuilding = True
+            self._pending = []
+            started = self._clock()
+
+        try:
+            columns = SnapshotColumns()
+            request = JobReviewsRequest(limit=STREAM_CHUNK_SIZE, after_id=-1, fields=SNAPSHOT_FIELDS)
+            for chunk in self.data_access.StreamJobReviews(request):
+                columns.extend_scanned(chunk.review)
+        except Exception:
+            with self._lock:
+                self._rebuilding = False
+                self._pending = []
+            raise
+
+        with self._lock:
+            # Deltas are idempotent, so replaying one the scan already saw is harmless.
+            for delta in self._pending:
+                apply_delta(columns, delta)
+            self._rebuilding = False
+            self._pending = []
+            self._columns = columns
+            self._totals.clear()
+            # Changes after the scan started may be missing; another rescan
+            # is already pending for them.
+            self._dirty_since = None if self._last_change < started else started
+
+        usage = self.memory_usage()
+        print(f"Review snapshot loaded: {usage['reviews']} reviews, {usage['bytes'] / 2**20:.1f} MiB")
+
+    def _rebuild_loop(self, retry_interval=5):
+        while True:
+            self._rebuild_needed.wait()
+            # Let a burst of writes settle into a single rescan.
+            time.sleep(self.rebuild_delay)
+            self._rebuild_needed.clear()
+            try:
+                self.rebuild()
+            except Exception as e:
+                print(f"Error loading review snapshot: {e}")
+                time.sleep(retry_interval)
+                self._rebuild_needed.set()
+
+    def on_invalidation(self, event):
+        if event.reset:
+            self.mark_changed()
+        elif event.table != "reviews" or event.origin == self.origin:
+            # Our own writes were applied when they were made.
+            return
+        elif event.review_ids:
+            try:
+                self.refresh(list(event.review_ids))
+            except grpc.RpcError as e:
+                print(f"Error refreshing reviews {list(event.review_ids)}: {e}")
+                self.mark_changed()
+        else:
+            self.mark_changed()
+
+    def _follow_invalidations(self, retry_interval=5):
+        while True:
+            try:
+                for event in self.invalidations.SubscribeInvalidations(InvalidationRequest()):
+                    self.on_invalidation(event)
+            except grpc.RpcError as e:
+                print(f"Review snapshot lost the invalidation stream: {e}")
+            # Changes may be missed until we resubscribe.
+            self.mark_changed()
+            time.sleep(retry_interval)
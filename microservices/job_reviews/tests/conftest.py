@@ -0,0 +1,29 @@
+import os
+import sys
+import tempfile
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DATA_ACCESS_PROTOBUF = os.path.join(HERE, "..", "..", "data_access", "protobuf")
+
+
+def generate_stubs():
+    """Compile data-access.proto into a temp dir, as the Dockerfile does."""
+    out = tempfile.mkdtemp(prefix="job_reviews_stubs_")
+    status = protoc.main([
+        "protoc", f"-I{DATA_ACCESS_PROTOBUF}", f"--python_out={out}", f"--grpc_python_out={out}",
+        os.path.join(DATA_ACCESS_PROTOBUF, "data-access.proto"),
+    ])
+    if status != 0:
+        raise RuntimeError("protoc failed on data-access.proto")
+    return out
+
+
+try:
+    import grpc  # noqa: F401
+    import numpy  # noqa: F401
+    from grpc_tools import protoc
+except ImportError:
+    # review_snapshot needs the data_access stubs.
+    collect_ignore = ["test_review_snapshot.py"]
+else:
+    sys.path.insert(0, generate_stubs())
@@ -0,0 +1,93 @@
+import json
+import os
+import sys
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from columnar import ColumnarTable, StringColumn
+
+
+def write_table(path, table, columns):
+    """Write columns ({name: (type, values)}) the way datasets/export_columnar.py does."""
+    os.makedirs(path)
+    rows = None
+    specs = []
+    for name, (kind, values) in columns.items():
+        rows = len(values)
+        nulls = np.array([value is None for value in values], dtype=np.uint8)
+        if kind == "string":
+            encoded = [(value or "").encode("utf-8") for value in values]
+            offsets = np.concatenate([[0], np.cumsum([len(e) for e in encoded], dtype=np.int64)])
+            offsets.astype("<i8").tofile(os.path.join(path, f"{name}.offsets"))
+            with open(os.path.join(path, f"{name}.data"), "wb") as f:
+                f.write(b"".join(encoded))
+        else:
+            missing = np.nan if kind == "float64" else 0
+            dtype = {"int32": "<i4", "int64": "<i8", "float64": "<f8", "bool": "?"}[kind]
+            np.array([missing if v is None else v for v in values], dtype=dtype).tofile(
+                os.path.join(path, f"{name}.data"))
+        if nulls.any():
+            nulls.tofile(os.path.join(path, f"{name}.nulls"))
+        specs.append({"name": name, "type": kind, "nullable": bool(nulls.any())})
+    with open(os.path.join(path, "schema.json"), "w") as f:
+        json.dump({"format": "columnar-v1", "table": table, "rows": rows,
+                   "exported_at": "2024-01-01T00:00:00+00:00", "columns": specs}, f)
+
+
+def test_reads_numeric_string_and_null_columns(tmp_path):
+    path = str(tmp_path / "reviews")
+    write_table(path, "reviews", {
+        "id": ("int32", [3, 1, 2]),
+        "firm": ("string", ["Acme", None, "Café Ltd"]),
+        "overall_rating": ("int32", [5, None, 3]),
+        "career_opp": ("float64", [2.5, None, 4.0]),
+    })
+
+    table = ColumnarTable(path)
+
+    assert len(table) == 3
+    assert table.column("id").tolist() == [3, 1, 2]
+    firm = table.column("firm")
+    assert isinstance(firm, StringColumn)
+    assert firm.tolist() == ["Acme", "", "Café Ltd"]
+    assert firm[2] == "Café Ltd"
+    assert table.nulls("firm").tolist() == [False, True, False]
+    assert table.column("overall_rating").tolist() == [5, 0, 3]
+    career_opp = table.column("career_opp")
+    assert career_opp[0] == 2.5 and np.isnan(career_opp[1])
+    assert table.nulls("id").tolist() == [False, False, False]
+
+
+def test_numeric_columns_are_read_only_views_of_the_file(tmp_path):
+    path = str(tmp_path / "jobs")
+    write_table(path, "jobs", {"job_id": ("int64", [10, 20])})
+
+    column = ColumnarTable(path).column("job_id")
+
+    assert not column.flags.writeable
+    assert not column.flags.owndata
+
+
+def test_empty_table(tmp_path):
+    path = str(tmp_path / "employee")
+    write_table(path, "employee", {"name": ("string", []), "employee_count": ("int32", [])})
+
+    table = ColumnarTable(path)
+
+    assert len(table) == 0
+    assert table.column("name").tolist() == []
+    assert table.column("employee_count").tolist() == []
+
+
+def test_rejects_unknown_format(tmp_path):
+    path = tmp_path / "reviews"
+    path.mkdir()
+    (path / "schema.json").write_text(json.dumps({"format": "columnar-v0", "table": "reviews",
+                                                  "rows": 0, "columns": []}))
+
+    with pytest.raises(ValueError):
+        ColumnarTable(str(path))
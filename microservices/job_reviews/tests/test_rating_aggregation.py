@@ -0,0 +1,103 @@
+import math
+import os
+import random
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from rating_aggregation import (
+    COMPANY_RATING_COLUMNS,
+    LOCATION_RATING_COLUMNS,
+    GroupTotals,
+    best_cities,
+    best_companies,
+    rounded_ratings,
+)
+
+
+def make_reviews(n, seed=0):
+    rng = random.Random(seed)
+    reviews = []
+    for _ in range(n):
+        review = SimpleNamespace(
+            firm=rng.choice(["Acme", "Globex", "Initech", "Umbrella", "Hooli", "Stark"]),
+            location=rng.choice([" Lisbon", "Porto ", "London", "Leeds", ""]),
+        )
+        for column in LOCATION_RATING_COLUMNS:
+            setattr(review, column, rng.choice([None, 0, 1, 2, 3, 4, 5, 2.5, 3.7]))
+        reviews.append(review)
+    return reviews
+
+
+def group_totals(reviews, key, columns):
+    """GroupTotals from dictionary-encoded keys and NaN-for-None ratings, as the review snapshot builds them."""
+    index = {}
+    codes = np.array([index.setdefault(getattr(review, key), len(index)) for review in reviews], dtype=np.int64)
+    ratings = {
+        column: np.array([getattr(review, column) for review in reviews], dtype=np.float64)
+        for column in columns
+    }
+    return GroupTotals.from_codes(codes, list(index), ratings, columns)
+
+
+def reference_totals(reviews, key, columns):
+    totals = {}
+    for review in reviews:
+        entry = totals.setdefault(getattr(review, key), {"review_count": 0, **{c: 0.0 for c in columns}})
+        entry["review_count"] += 1
+        for column in columns:
+            entry[column] += getattr(review, column) or 0
+    return totals
+
+
+def test_best_companies_matches_scalar_formula():
+    reviews = make_reviews(500)
+    expected = []
+    for firm, entry in reference_totals(reviews, "firm", COMPANY_RATING_COLUMNS).items():
+        means = {c: entry[c] / entry["review_count"] for c in COMPANY_RATING_COLUMNS}
+        overall = sum(means[c] for c in COMPANY_RATING_COLUMNS) / 5.0
+        expected.append((overall, firm, means))
+    expected.sort(key=lambda x: (x[0], x[1]), reverse=True)
+
+    result = best_companies(group_totals(reviews, "firm", COMPANY_RATING_COLUMNS), limit=5)
+
+    assert [firm for firm, _ in result] == [firm for _, firm, _ in expected[:5]]
+    for (_, means), (_, _, expected_means) in zip(result, expected):
+        for column in COMPANY_RATING_COLUMNS:
+            assert math.isclose(means[column], expected_means[column])
+
+
+def test_best_companies_from_summary_rows_breaks_ties_by_firm():
+    rows = [
+        SimpleNamespace(firm=firm, review_count=2, **{f"{c}_sum": 6.0 for c in COMPANY_RATING_COLUMNS},
+                        **{f"{c}_count": 2 for c in COMPANY_RATING_COLUMNS})
+        for firm in ("B", "A", "C")
+    ]
+    totals = GroupTotals.from_aggregates(rows, "firm", COMPANY_RATING_COLUMNS)
+    assert [firm for firm, _ in best_companies(totals, limit=2)] == ["C", "B"]
+
+
+def test_best_cities_matches_scalar_formula():
+    reviews = make_reviews(300, seed=1)
+    expected = []
+    for location, entry in reference_totals(reviews, "location", LOCATION_RATING_COLUMNS).items():
+        average = sum(entry[c] for c in LOCATION_RATING_COLUMNS) / (7.0 * entry["review_count"])
+        expected.append((-average, location))
+    expected.sort()
+
+    result = best_cities(group_totals(reviews, "location", LOCATION_RATING_COLUMNS), limit=3)
+
+    assert [location for location, _, _ in result] == [location for _, location in expected[:3]]
+    for (_, average, _), (negated, _) in zip(result, expected):
+        assert math.isclose(average, -negated)
+
+
+def test_rounded_ratings_round_half_to_even_like_round():
+    sums = [5.0, 7.0, 2.0, 0.0]
+    counts = [2, 2, 0, 3]
+    assert rounded_ratings(sums, counts).tolist() == [int(round(5 / 2)), int(round(7 / 2)), 0, 0]
@@ -0,0 +1,90 @@
+import os
+import sys
+
+import pytest
+
+pytest.importorskip("numpy")
+grpc = pytest.importorskip("grpc")
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from data_access_pb2 import InvalidationEvent, JobReviewsResponse, Review
+from review_snapshot import SNAPSHOT_FIELDS, ReviewSnapshot
+
+
+class FakeDataAccess:
+    def __init__(self, reviews):
+        self.reviews = {review.id: review for review in reviews}
+        self.requests = []
+
+    def StreamJobReviews(self, request):
+        self.requests.append(request)
+        ids = set(request.ids) or set(self.reviews)
+        rows = [self.reviews[i] for i in sorted(ids) if i in self.reviews and i > request.after_id]
+        for start in range(0, len(rows), request.limit):
+            chunk = rows[start:start + request.limit]
+            yield JobReviewsResponse(review=chunk, next_cursor=chunk[-1].id)
+
+
+def review(review_id, firm="Acme", location="Lisbon", rating=4):
+    return Review(id=review_id, firm=firm, location=location, overall_rating=rating, work_life_balance=3.0)
+
+
+def loaded(reviews):
+    data_access = FakeDataAccess(reviews)
+    snapshot = ReviewSnapshot(data_access)
+    snapshot.rebuild()
+    data_access.requests.clear()
+    snapshot._rebuild_needed.clear()
+    return snapshot, data_access
+
+
+def firm_review_counts(snapshot):
+    totals = snapshot.company_totals()
+    return dict(zip(totals.keys, totals.review_count.tolist()))
+
+
+def test_scans_select_only_the_snapshot_columns():
+    data_access = FakeDataAccess([review(1), review(2)])
+    ReviewSnapshot(data_access).rebuild()
+
+    assert list(data_access.requests[0].fields) == SNAPSHOT_FIELDS
+    assert "pros" not in SNAPSHOT_FIELDS
+
+
+def test_events_from_other_writers_refresh_only_their_reviews():
+    snapshot, data_access = loaded([review(1), review(2, firm="Globex")])
+    data_access.reviews[3] = review(3, firm="Globex")
+    del data_access.reviews[1]
+
+    snapshot.on_invalidation(InvalidationEvent(table="reviews", review_ids=[1, 3], origin="other"))
+
+    assert [list(r.ids) for r in data_access.requests] == [[1, 3]]
+    assert firm_review_counts(snapshot) == {"Globex": 2}
+    assert not snapshot._rebuild_needed.is_set()
+
+
+def test_own_events_are_skipped():
+    snapshot, data_access = loaded([review(1)])
+    snapshot.apply_create(2, review(2))
+
+    snapshot.on_invalidation(InvalidationEvent(table="reviews", review_ids=[2], origin=snapshot.origin))
+
+    assert data_access.requests == []
+    assert firm_review_counts(snapshot) == {"Acme": 2}
+    assert snapshot.write_metadata() == [("origin", snapshot.origin)]
+
+
+def test_events_without_ids_and_resets_trigger_a_rescan():
+    snapshot, data_access = loaded([review(1)])
+
+    snapshot.on_invalidation(InvalidationEvent(table="jobs", titles=["Engineer"]))
+    assert not snapshot._rebuild_needed.is_set()
+
+    snapshot.on_invalidation(InvalidationEvent(table="reviews", firms=["Acme"]))
+    assert snapshot._rebuild_needed.is_set()
+
+    snapshot._rebuild_needed.clear()
+    snapshot.on_invalidation(InvalidationEvent(reset=True, origin=snapshot.origin))
+    assert snapshot._rebuild_needed.is_set()
+    assert data_access.requests == []